@@ -0,0 +1,96 @@
+"""
+Consultas de análisis de ventas para el dashboard y los reportes.
+
+Toda la agregación (GROUP BY / ORDER BY / LIMIT) la hace SQLite y solo vuelven las
+filas ya resumidas, así la memoria no crece con el historial. Las consultas leen los
+resúmenes diarios venta_diaria / venta_diaria_rubro (migraciones 009 y 013), que los
+triggers mantienen al día, en lugar del detalle completo.
+Las fechas son datetime.date o texto ('YYYY-MM-DD', 'DD/MM/YYYY' y los demás formatos de
+repository.FORMATOS_FECHA) y los rangos incluyen ambos extremos.
+"""
+from datetime import date
+from typing import NamedTuple, Optional, Union
+
+import repository as db
+
+Fecha = Optional[Union[str, date]]
+
+
+class ProductSales(NamedTuple):
+    id_producto: int
+    descripcion: str
+    unidades: int
+    importe: float
+
+
+class RubroSales(NamedTuple):
+    id_rubro: int
+    nombre_rubro: str
+    unidades: int
+    importe: float
+
+
+# Orden permitido para los rankings (columna del resultado agregado)
+METRICS = {"unidades": "unidades", "importe": "importe"}
+
+
+def _periodo(date_from, date_to):
+    """Condición sobre 'dia' (clave inicial de los resúmenes, AAAAMMDD) y sus parámetros."""
+    where, params = [], []
+    for condition, valor in (("dia >= ?", date_from), ("dia <= ?", date_to)):
+        dia = db._fecha_dia(valor)
+        if dia is not None:
+            where.append(condition)
+            params.append(dia)
+    if where:
+        # dia = 0: facturas sin fecha reconocida, afuera de cualquier período (como en get_invoices)
+        where.insert(0, "dia > 0")
+    return (f"WHERE {' AND '.join(where)}" if where else ""), params
+
+
+def _order(metric):
+    if metric not in METRICS:
+        raise ValueError(f"Métrica desconocida: {metric}")
+    return METRICS[metric]
+
+
+def top_products(n: int = 5, date_from: Fecha = None, date_to: Fecha = None,
+                 metric: str = "unidades") -> list[ProductSales]:
+    """Los n productos más vendidos del período (por unidades o por importe)."""
+    where, params = _periodo(date_from, date_to)
+    query = f"""
+        SELECT v.id_producto, p.descripcion, v.unidades, v.importe
+        FROM (
+            SELECT id_producto, SUM(unidades) AS unidades, SUM(importe) AS importe
+            FROM venta_diaria
+            {where}
+            GROUP BY id_producto
+        ) AS v
+        JOIN producto AS p ON p.id_producto = v.id_producto
+        ORDER BY v.{_order(metric)} DESC, v.id_producto
+        LIMIT ?
+    """
+    with db.read_only():
+        rows = db.execute_query(query, (*params, n), fetch="all") or []
+    return [ProductSales(*row) for row in rows]
+
+
+def top_rubros(n: int = 3, date_from: Fecha = None, date_to: Fecha = None,
+               metric: str = "unidades") -> list[RubroSales]:
+    """Los n rubros con más ventas del período."""
+    where, params = _periodo(date_from, date_to)
+    query = f"""
+        SELECT r.id_rubro, r.nombre_rubro, v.unidades, v.importe
+        FROM (
+            SELECT id_rubro, SUM(unidades) AS unidades, SUM(importe) AS importe
+            FROM venta_diaria_rubro
+            {where}
+            GROUP BY id_rubro
+        ) AS v
+        JOIN rubro AS r ON r.id_rubro = v.id_rubro
+        ORDER BY v.{_order(metric)} DESC, r.id_rubro
+        LIMIT ?
+    """
+    with db.read_only():
+        rows = db.execute_query(query, (*params, n), fetch="all") or []
+    return [RubroSales(*row) for row in rows]
@@ -0,0 +1,89 @@
+"""
+Benchmark: tamaño y velocidad de exportación/importación CSV vs. Parquet/Arrow.
+
+Crea una base temporal con datos sintéticos, exporta todas las tablas en cada
+formato y vuelve a importarlas, midiendo tiempo, filas/s y tamaño en disco.
+
+    python benchmarks/bench_columnar.py [--productos N] [--clientes N] [--facturas N]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import columnar  # noqa: E402
+import csv_loader  # noqa: E402
+import exporter  # noqa: E402
+import repository as db  # noqa: E402
+from bench_connections import poblar  # noqa: E402
+
+
+def tamano(folder):
+    return sum(os.path.getsize(os.path.join(folder, f)) for f in os.listdir(folder))
+
+
+def cronometrar(fn):
+    inicio = time.perf_counter()
+    resultado = fn()
+    return time.perf_counter() - inicio, resultado
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--productos", type=int, default=20_000)
+    parser.add_argument("--clientes", type=int, default=20_000)
+    parser.add_argument("--facturas", type=int, default=100_000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db.DB_NAME = os.path.join(tmp, "bench.db")
+        db.SQL_FILE = os.path.join(ROOT, "init.sql")
+        db.MIGRATIONS_FOLDER = os.path.join(ROOT, "migrations")
+        db.create_db()
+        poblar(args.productos, args.clientes, args.facturas)
+        filas = sum(n for n in db.execute_query(
+            "SELECT (SELECT COUNT(*) FROM producto) + (SELECT COUNT(*) FROM cliente)"
+            " + (SELECT COUNT(*) FROM factura) + (SELECT COUNT(*) FROM detalle_factura)", fetch="one"))
+
+        casos = {
+            "csv": (
+                lambda d: exporter.export_all("csv", d),
+                lambda d: csv_loader.load_csv_files(d),
+            ),
+            "csv.gz": (
+                lambda d: exporter.export_all("csv", d, "gzip"),
+                None,
+            ),
+            "parquet (zstd)": (
+                lambda d: columnar.export_all("parquet", d),
+                lambda d: columnar.import_all(d, "parquet"),
+            ),
+            "arrow (zstd)": (
+                lambda d: columnar.export_all("arrow", d),
+                lambda d: columnar.import_all(d, "arrow"),
+            ),
+        }
+
+        resultados = []
+        for nombre, (exportar, importar) in casos.items():
+            carpeta = os.path.join(tmp, nombre.split()[0])
+            t_exp, _ = cronometrar(lambda: exportar(carpeta))
+            t_imp = cronometrar(lambda: importar(carpeta))[0] if importar else None
+            resultados.append((nombre, tamano(carpeta), t_exp, t_imp))
+
+        print(f"\n{filas:,} filas de datos")
+        print(f"{'formato':<16}{'tamaño (MB)':>12}{'export (s)':>12}{'export filas/s':>16}"
+              f"{'import (s)':>12}{'import filas/s':>16}")
+        for nombre, size, t_exp, t_imp in resultados:
+            imp = f"{t_imp:>12.2f}{filas / t_imp:>16,.0f}" if t_imp else f"{'-':>12}{'-':>16}"
+            print(f"{nombre:<16}{size / 1e6:>12.2f}{t_exp:>12.2f}{filas / t_exp:>16,.0f}{imp}")
+
+        db.close_connections()
+
+
+if __name__ == "__main__":
+    main()
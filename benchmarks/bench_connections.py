@@ -0,0 +1,111 @@
+"""
+Benchmark: conexión nueva por llamada vs. pool de conexiones de repository.
+
+Crea una base temporal con datos sintéticos y mide las lecturas de productos,
+clientes y facturas con ambos esquemas.
+
+    python benchmarks/bench_connections.py [--productos N] [--facturas N] [--repeticiones N]
+"""
+import argparse
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+from unittest import mock
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import repository as db  # noqa: E402
+
+
+def legacy_execute_query(query, params=(), fetch=False, commit=True):
+    """Réplica del execute_query anterior: abre y cierra una conexión por llamada."""
+    connection = sqlite3.connect(db.DB_NAME)
+    cursor = connection.cursor()
+    try:
+        cursor.execute(query, params)
+        result = None
+        if fetch == "all":
+            result = cursor.fetchall()
+        elif fetch == "one":
+            result = cursor.fetchone()
+        if commit:
+            connection.commit()
+        return result
+    finally:
+        connection.close()
+
+
+def poblar(n_productos, n_clientes, n_facturas, seed=42):
+    rnd = random.Random(seed)
+    conn = sqlite3.connect(db.DB_NAME)
+    conn.executemany(
+        "INSERT INTO producto (descripcion, precio, id_rubro, stock) VALUES (?, ?, ?, ?)",
+        ((f"Producto {i}", rnd.randint(1000, 500000), rnd.randint(1, 5), rnd.randint(0, 100))
+         for i in range(n_productos)),
+    )
+    conn.executemany(
+        "INSERT INTO cliente (nombre, id_provincia, domicilio, telefono, email) VALUES (?, ?, ?, ?, ?)",
+        ((f"Cliente {i}", rnd.randint(1, 24), f"Calle {i}", "1100000000", f"c{i}@mail.com")
+         for i in range(n_clientes)),
+    )
+    conn.executemany(
+        "INSERT INTO factura (fecha, id_sucursal, id_cliente) VALUES (?, ?, ?)",
+        ((f"2025-{rnd.randint(1, 12):02d}-{rnd.randint(1, 28):02d}", rnd.randint(1, 3), rnd.randint(1, n_clientes))
+         for _ in range(n_facturas)),
+    )
+    conn.executemany(
+        "INSERT OR IGNORE INTO detalle_factura (id_factura, id_producto, cantidad, precio_unitario) VALUES (?, ?, ?, ?)",
+        ((f, rnd.randint(1, n_productos), rnd.randint(1, 5), rnd.randint(1000, 500000))
+         for f in range(1, n_facturas + 1) for _ in range(3)),
+    )
+    conn.commit()
+    conn.close()
+
+
+def medir(fn, repeticiones):
+    inicio = time.perf_counter()
+    for _ in range(repeticiones):
+        fn()
+    return (time.perf_counter() - inicio) / repeticiones
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--productos", type=int, default=2000)
+    parser.add_argument("--clientes", type=int, default=1000)
+    parser.add_argument("--facturas", type=int, default=2000)
+    parser.add_argument("--repeticiones", type=int, default=200)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db.DB_NAME = os.path.join(tmp, "bench.db")
+        db.SQL_FILE = os.path.join(ROOT, "init.sql")
+        db.MIGRATIONS_FOLDER = os.path.join(ROOT, "migrations")
+        db.create_db()
+        poblar(args.productos, args.clientes, args.facturas)
+
+        casos = {
+            "get_products": db.get_products,
+            "get_product_by_id": lambda: db.get_product_by_id(1),
+            "get_clients": db.get_clients,
+            "get_client_by_id": lambda: db.get_client_by_id(1),
+            "get_invoices": db.get_invoices,
+            "get_invoice_details": lambda: db.get_invoice_details(1),
+        }
+
+        print(f"{'caso':<22}{'por llamada (ms)':>18}{'pool (ms)':>12}{'speedup':>10}")
+        for nombre, fn in casos.items():
+            with mock.patch.object(db, "execute_query", legacy_execute_query):
+                t_legacy = medir(fn, args.repeticiones)
+            t_pool = medir(fn, args.repeticiones)
+            print(f"{nombre:<22}{t_legacy * 1000:>18.3f}{t_pool * 1000:>12.3f}{t_legacy / t_pool:>9.1f}x")
+
+        db.close_connections()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+"""
+Benchmark de arranque: mide con `python -X importtime` cuánto tarda en importarse cada
+punto de entrada y falla (exit 1) si supera su presupuesto o si carga módulos pesados
+que no le corresponden (por ejemplo matplotlib antes de abrir el dashboard).
+
+Cada medición corre en un proceso nuevo; se toma la mejor de varias repeticiones
+para no depender del ruido de la máquina.
+
+    python benchmarks/bench_import_time.py [--repeticiones N] [--factor F] [--detalle N]
+"""
+import argparse
+import os
+import re
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# módulo: (presupuesto en ms, módulos que no debe importar)
+PRESUPUESTOS = {
+    # el menú de main.py: solo sqlite3 y la biblioteca estándar
+    "main": (150, {"ui", "exporter", "columnar", "dashboard", "customtkinter", "PIL", "matplotlib", "pandas", "pyarrow"}),
+    "repository": (120, {"pandas", "matplotlib", "customtkinter"}),
+    # la ventana principal: customtkinter y PIL sí, el dashboard y pandas no
+    "ui": (600, {"dashboard", "matplotlib", "pandas", "pyarrow"}),
+    "exporter": (150, {"pandas", "matplotlib", "customtkinter"}),
+    # el dashboard carga matplotlib (sin pyplot) pero no pandas
+    "dashboard": (1500, {"matplotlib.pyplot", "pandas"}),
+}
+
+LINEA = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)")
+
+
+def medir(modulo):
+    """Devuelve ([(self_us, cumulative_us, profundidad, nombre), ...], cumulative_us del módulo)."""
+    resultado = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {modulo}"],
+        cwd=ROOT, capture_output=True, text=True,
+    )
+    if resultado.returncode != 0:
+        raise RuntimeError(f"No se pudo importar {modulo}:\n{resultado.stderr.strip()[-2000:]}")
+
+    filas = []
+    for linea in resultado.stderr.splitlines():
+        m = LINEA.match(linea)
+        if m:
+            filas.append((int(m.group(1)), int(m.group(2)), len(m.group(3)) // 2, m.group(4)))
+    total = next((acum for _, acum, prof, nombre in reversed(filas) if nombre == modulo and prof == 0), 0)
+    return filas, total
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeticiones", type=int, default=5)
+    parser.add_argument("--factor", type=float, default=1.0,
+                        help="multiplica todos los presupuestos (máquinas lentas / CI)")
+    parser.add_argument("--detalle", type=int, default=5,
+                        help="cuántos imports más pesados mostrar por módulo")
+    args = parser.parse_args()
+
+    errores = 0
+    print(f"{'módulo':<12} {'mejor':>9} {'presupuesto':>12}")
+    for modulo, (presupuesto, prohibidos) in PRESUPUESTOS.items():
+        mediciones = [medir(modulo) for _ in range(args.repeticiones)]
+        filas, mejor = min(mediciones, key=lambda m: m[1])
+        limite = presupuesto * args.factor
+        ms = mejor / 1000
+
+        cargados = {nombre for _, _, _, nombre in filas}
+        indebidos = sorted(
+            nombre for nombre in cargados
+            if any(nombre == p or nombre.startswith(p + ".") for p in prohibidos)
+        )
+        # solo la raíz de cada paquete prohibido (matplotlib y no sus 200 submódulos)
+        indebidos = [n for n in indebidos if not any(n.startswith(o + ".") for o in indebidos)]
+
+        estado = "OK " if ms <= limite and not indebidos else "FAIL"
+        print(f"[{estado}] {modulo:<12} {ms:>7.1f} ms {limite:>9.0f} ms")
+        if ms > limite:
+            errores += 1
+            print(f"        supera el presupuesto por {ms - limite:.1f} ms")
+        if indebidos:
+            errores += 1
+            print(f"        importa módulos que debería cargar recién al usarlos: {', '.join(indebidos)}")
+        if estado == "FAIL" or args.detalle and ms > limite / 2:
+            pesados = sorted((f for f in filas if f[2] == 1), key=lambda f: f[1], reverse=True)
+            for _, acum, _, nombre in pesados[:args.detalle]:
+                print(f"        {acum / 1000:>8.1f} ms  {nombre}")
+
+    if errores:
+        print(f"\n❌ {errores} problema(s) de tiempo de arranque.")
+        sys.exit(1)
+    print("\n✅ Todos los imports están dentro del presupuesto.")
+
+
+if __name__ == "__main__":
+    main()
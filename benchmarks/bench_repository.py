@@ -0,0 +1,218 @@
+"""
+Micro-benchmarks de repository a varias escalas de datos, con resultados en JSON y
+comparación contra una línea base guardada.
+
+Cada escala se mide sobre una base temporal nueva (todas las migraciones aplicadas)
+poblada con datos sintéticos con semilla fija, así dos corridas miden lo mismo.
+Cada caso se repite hasta juntar al menos --minimo segundos (y --repeticiones mínimas);
+se guardan la mediana, el mínimo y el p95 de cada caso.
+
+    python benchmarks/bench_repository.py run [--escalas chica,mediana] [--salida resultados.json]
+    python benchmarks/bench_repository.py compare base.json resultados.json [--umbral 0.25] [--piso 0.5]
+
+compare termina con exit 1 si algún caso es más lento que la base en más de --umbral
+(proporción) y --piso (ms absolutos, para que el ruido de los casos rápidos no cuente).
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import shutil
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import exporter  # noqa: E402
+import repository as db  # noqa: E402
+from bench_connections import poblar  # noqa: E402
+
+# escala: (productos, clientes, facturas); cada factura tiene hasta 3 líneas
+ESCALAS = {
+    "chica": (500, 500, 2_000),
+    "mediana": (5_000, 5_000, 20_000),
+    "grande": (20_000, 20_000, 100_000),
+}
+
+SEMILLA = 42
+
+
+def preparar(tmp, escala):
+    """Crea la base temporal de la escala y devuelve {tabla: filas}."""
+    productos, clientes, facturas = ESCALAS[escala]
+    db.close_connections()
+    db.DB_NAME = os.path.join(tmp, f"{escala}.db")
+    db.SQL_FILE = os.path.join(ROOT, "init.sql")
+    db.MIGRATIONS_FOLDER = os.path.join(ROOT, "migrations")
+    db.invalidate_lookups()
+    with contextlib.redirect_stdout(io.StringIO()):
+        db.create_db()
+        poblar(productos, clientes, facturas, seed=SEMILLA)
+        # stock de sobra: las facturas que crea el benchmark no deben quedarse sin stock
+        db.execute_query("UPDATE producto SET stock = 1000000000")
+        db.rebuild_sales_rollup()
+        db.execute_query("ANALYZE")
+    return {tabla: db.execute_query(f"SELECT COUNT(*) FROM {tabla}", fetch="one")[0]
+            for tabla in db.get_table_names()}
+
+
+def casos(tmp, filas):
+    """{nombre: función sin argumentos} con los caminos a medir."""
+    n_facturas = filas["factura"]
+    carpeta_csv = os.path.join(tmp, "csv")
+    # CSV de la propia escala para medir la recarga completa
+    exporter.export_all("csv", carpeta_csv)
+    siguiente = iter(range(10**9))
+
+    def guardar_factura():
+        # el mismo camino que FacturaForm.guardar al crear: id del cliente por nombre y create_invoice
+        i = next(siguiente)
+        id_cliente = db.get_client_id_by_name(f"Cliente {i % filas['cliente']}")
+        lineas = [((i * 7 + k) % filas["producto"] + 1, 1 + k, 1000.0) for k in range(3)]
+        db.create_invoice(id_cliente, "2025-06-15", lineas)
+
+    def exportar(fmt):
+        destino = os.path.join(tmp, f"export_{fmt}")
+        exporter.export_all(fmt, destino)
+        shutil.rmtree(destino)
+
+    def recargar_csv():
+        db.CSV_FOLDER = carpeta_csv
+        with contextlib.redirect_stdout(io.StringIO()):
+            db.load_csv_data()
+
+    return {
+        "get_products": db.get_products,
+        "get_clients": db.get_clients,
+        "get_invoices": db.get_invoices,
+        "get_invoice_details": lambda: db.get_invoice_details(next(siguiente) % n_facturas + 1),
+        "get_all_detalle_factura": db.get_all_detalle_factura,
+        "get_client_id_by_name": lambda: db.get_client_id_by_name(f"Cliente {next(siguiente) % filas['cliente']}"),
+        "get_provincia_id_by_name": lambda: db.get_provincia_id_by_name("Córdoba"),
+        "get_rubro_id_by_name": lambda: db.get_rubro_id_by_name("Redes"),
+        "guardar_factura": guardar_factura,
+        "export_csv": lambda: exportar("csv"),
+        "export_json": lambda: exportar("json"),
+        "load_csv_data": recargar_csv,
+    }
+
+
+def medir(fn, minimo, repeticiones, tope):
+    """Repite fn hasta juntar 'minimo' segundos y 'repeticiones' corridas; tiempos en ms."""
+    fn()  # calentamiento: caches de SQLite, lookups, conexiones del pool
+    tiempos = []
+    total = 0.0
+    while len(tiempos) < tope and (len(tiempos) < repeticiones or total < minimo):
+        inicio = time.perf_counter()
+        fn()
+        t = time.perf_counter() - inicio
+        tiempos.append(t * 1000)
+        total += t
+    tiempos.sort()
+    return {
+        "mediana_ms": round(statistics.median(tiempos), 4),
+        "min_ms": round(tiempos[0], 4),
+        "p95_ms": round(tiempos[min(len(tiempos) - 1, int(len(tiempos) * 0.95))], 4),
+        "repeticiones": len(tiempos),
+    }
+
+
+def run(args):
+    escalas = [e.strip() for e in args.escalas.split(",") if e.strip()]
+    desconocidas = [e for e in escalas if e not in ESCALAS]
+    if desconocidas:
+        sys.exit(f"❌ Escala(s) desconocida(s): {', '.join(desconocidas)} (opciones: {', '.join(ESCALAS)})")
+
+    resultado = {
+        "fecha": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "sqlite": sqlite3.sqlite_version,
+        "plataforma": platform.platform(),
+        "escalas": {},
+    }
+    with tempfile.TemporaryDirectory() as tmp:
+        for escala in escalas:
+            print(f"\n📦 Escala '{escala}': {ESCALAS[escala][0]} productos, {ESCALAS[escala][1]} clientes, "
+                  f"{ESCALAS[escala][2]} facturas")
+            filas = preparar(tmp, escala)
+            medidos = {}
+            for nombre, fn in casos(tmp, filas).items():
+                if args.casos and nombre not in args.casos:
+                    continue
+                medidos[nombre] = m = medir(fn, args.minimo, args.repeticiones, args.tope)
+                print(f"   {nombre:<26}{m['mediana_ms']:>11.3f} ms  (min {m['min_ms']:.3f}, "
+                      f"p95 {m['p95_ms']:.3f}, n={m['repeticiones']})")
+            resultado["escalas"][escala] = {"filas": filas, "casos": medidos}
+        db.close_connections()
+
+    with open(args.salida, "w", encoding="utf-8") as f:
+        json.dump(resultado, f, ensure_ascii=False, indent=2)
+    print(f"\n📁 Resultados guardados en {args.salida}")
+
+
+def compare(args):
+    with open(args.base, encoding="utf-8") as f:
+        base = json.load(f)
+    with open(args.actual, encoding="utf-8") as f:
+        actual = json.load(f)
+
+    if (base.get("python"), base.get("sqlite")) != (actual.get("python"), actual.get("sqlite")):
+        print(f"⚠️  Versiones distintas: base Python {base.get('python')} / SQLite {base.get('sqlite')}, "
+              f"actual Python {actual.get('python')} / SQLite {actual.get('sqlite')}")
+
+    regresiones = 0
+    print(f"{'':<6}{'escala':<9}{'caso':<26}{'base (ms)':>12}{'actual (ms)':>13}{'cambio':>8}")
+    for escala, datos in actual["escalas"].items():
+        casos_base = base["escalas"].get(escala, {}).get("casos", {})
+        for nombre, m in datos["casos"].items():
+            if nombre not in casos_base:
+                print(f"[NEW] {escala:<9}{nombre:<26}{'—':>12}{m['mediana_ms']:>13.3f}")
+                continue
+            antes, ahora = casos_base[nombre]["mediana_ms"], m["mediana_ms"]
+            cambio = ahora / antes - 1 if antes else 0.0
+            regresion = cambio > args.umbral and ahora - antes > args.piso
+            mejora = cambio < -args.umbral and antes - ahora > args.piso
+            estado = "FAIL" if regresion else "OK "
+            nota = "  ⬆ más lento" if regresion else "  ⬇ más rápido" if mejora else ""
+            print(f"[{estado}] {escala:<9}{nombre:<26}{antes:>12.3f}{ahora:>13.3f}{cambio:>+8.0%}{nota}")
+            regresiones += regresion
+
+    if regresiones:
+        print(f"\n❌ {regresiones} caso(s) más lentos que la base (umbral {args.umbral:.0%}, piso {args.piso} ms).")
+        sys.exit(1)
+    print("\n✅ Sin regresiones respecto de la base.")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    sub = parser.add_subparsers(dest="comando", required=True)
+
+    p_run = sub.add_parser("run", help="medir y guardar los resultados en JSON")
+    p_run.add_argument("--escalas", default="chica,mediana", help=f"separadas por coma: {', '.join(ESCALAS)}")
+    p_run.add_argument("--casos", nargs="*", help="medir solo estos casos")
+    p_run.add_argument("--salida", default="bench_repository.json")
+    p_run.add_argument("--minimo", type=float, default=1.0, help="segundos mínimos medidos por caso")
+    p_run.add_argument("--repeticiones", type=int, default=5, help="corridas mínimas por caso")
+    p_run.add_argument("--tope", type=int, default=2000, help="corridas máximas por caso")
+    p_run.set_defaults(func=run)
+
+    p_cmp = sub.add_parser("compare", help="comparar resultados contra una línea base")
+    p_cmp.add_argument("base")
+    p_cmp.add_argument("actual")
+    p_cmp.add_argument("--umbral", type=float, default=0.25, help="regresión relativa tolerada (0.25 = 25%%)")
+    p_cmp.add_argument("--piso", type=float, default=0.5, help="diferencia mínima en ms para contar como regresión")
+    p_cmp.set_defaults(func=compare)
+
+    args = parser.parse_args()
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,360 @@
+"""
+Generador de datos sintéticos para el esquema de coral_tech, por factor de escala (estilo TPC).
+
+Con --sf 1 genera 10.000 clientes, 2.000 productos y 100.000 facturas con ~300.000
+líneas de detalle; todo escala en proporción (--sf 0.01 para una base chica, --sf 33
+para ~10 millones de líneas). Los datos tienen la asimetría de una tienda real:
+
+  - popularidad de productos con distribución de Zipf (pocos productos venden mucho);
+  - clientes recurrentes (también Zipf, más suave) repartidos en las 24 provincias
+    según su población, con todas las provincias presentes;
+  - fechas estacionales (Hot Sale, Día del Niño, Black Friday, Navidad; menos ventas
+    los domingos y en el verano) y crecimiento interanual, en orden de id_factura;
+  - varias sucursales con volúmenes distintos.
+
+La salida es la misma para la misma semilla sin importar la cantidad de procesos: cada
+bloque de facturas tiene su propio generador aleatorio derivado de la semilla. Las
+facturas se generan por bloques en procesos worker y se escriben en orden a medida que
+llegan, así la memoria no depende del tamaño.
+
+    python benchmarks/generar_datos.py --sf 1 [--salida carpeta] [--semilla 42] [--workers N]
+    python benchmarks/generar_datos.py --sf 1 --db base.db
+
+Con --salida escribe rubro/cliente/producto/factura/detalle_factura.csv (el formato de
+data/, listos para db.load_csv_data); con --db los carga directo en esa base (la crea si
+no existe) con la misma sesión de carga masiva que la recarga desde CSV.
+"""
+import argparse
+import bisect
+import csv
+import math
+import os
+import random
+import sys
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date, timedelta
+from itertools import accumulate
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import csv_loader  # noqa: E402
+import repository as db  # noqa: E402
+
+# Cantidades por unidad de escala
+CLIENTES_POR_SF = 10_000
+PRODUCTOS_POR_SF = 2_000
+FACTURAS_POR_SF = 100_000
+
+BLOQUE = 20_000  # facturas por tarea de worker
+
+# Exponentes de Zipf: productos muy concentrados, clientes más repartidos
+ZIPF_PRODUCTOS = 1.1
+ZIPF_CLIENTES = 0.6
+
+# Líneas por factura (1 a 8), promedio ~2.9
+LINEAS_PESOS = [30, 22, 16, 11, 8, 6, 4, 3]
+CANTIDAD_PESOS = [75, 15, 5, 3, 2]  # 1 a 5 unidades por línea
+
+# Peso de cada mes (1 = enero): vuelta a clases, Hot Sale, vacaciones de invierno,
+# Día del Niño, Black Friday / Cyber Monday, Navidad
+ESTACIONALIDAD = [0.75, 0.8, 1.05, 0.9, 1.15, 1.0, 1.05, 1.0, 0.9, 1.0, 1.3, 1.5]
+DIA_SEMANA = [1.0, 1.0, 1.0, 1.0, 1.1, 1.2, 0.5]  # lunes a domingo
+CRECIMIENTO_ANUAL = 0.10
+
+# Participación aproximada de cada provincia (id de init.sql) en la población
+PESO_PROVINCIA = {
+    1: 38.0, 2: 0.9, 3: 2.5, 4: 1.3, 5: 8.3, 6: 2.6, 7: 3.1, 8: 1.3, 9: 1.7, 10: 0.8,
+    11: 0.8, 12: 4.4, 13: 2.8, 14: 1.5, 15: 1.6, 16: 3.1, 17: 1.8, 18: 1.1, 19: 0.8,
+    20: 7.8, 21: 2.2, 22: 0.4, 23: 3.7, 24: 6.8,
+}
+CARACTERISTICA = {1: "221", 5: "351", 12: "261", 20: "341", 23: "381", 24: "11"}
+
+# id_rubro (rubro.Rubro): (nombre, tipos de producto, marcas, precio mínimo, precio máximo)
+RUBROS = {
+    1: ("Computadoras", ["Notebook", "PC de escritorio", "All in One", "Mini PC", "Tablet"],
+        ["Lenovo", "HP", "Dell", "Asus", "Acer", "Apple", "MSI"], 250_000, 2_500_000),
+    2: ("Periféricos", ["Mouse", "Teclado", "Monitor", "Auriculares", "Webcam", "Impresora"],
+        ["Logitech", "Redragon", "Genius", "Samsung", "LG", "HyperX", "Epson"], 8_000, 450_000),
+    3: ("Redes", ["Router", "Switch", "Access Point", "Placa de red", "Repetidor Wi-Fi"],
+        ["TP-Link", "Mercusys", "Ubiquiti", "Cisco", "D-Link", "Mikrotik"], 12_000, 400_000),
+    4: ("Almacenamiento", ["SSD", "Disco rígido", "Pendrive", "Disco externo", "Tarjeta microSD"],
+        ["Kingston", "WD", "Seagate", "Samsung", "SanDisk", "Crucial"], 6_000, 600_000),
+    5: ("Accesorios", ["Cable HDMI", "Mochila", "Base refrigerante", "Hub USB", "Mouse pad", "Cargador"],
+        ["Noga", "Netmak", "Kolke", "Trust", "Genérico"], 2_500, 90_000),
+}
+PESO_RUBRO = {1: 15, 2: 30, 3: 15, 4: 20, 5: 20}
+
+NOMBRES = ["Ana", "Luis", "María", "Juan", "Sofía", "Carlos", "Lucía", "Diego", "Valentina", "Martín",
+           "Camila", "Pablo", "Julieta", "Federico", "Agustina", "Nicolás", "Florencia", "Javier",
+           "Paula", "Matías", "Carolina", "Santiago", "Romina", "Gonzalo", "Natalia", "Hernán"]
+APELLIDOS = ["Gómez", "Martínez", "Rodríguez", "Fernández", "López", "Díaz", "Pérez", "García",
+             "Sánchez", "Romero", "Sosa", "Torres", "Álvarez", "Ruiz", "Ramírez", "Flores", "Benítez",
+             "Acosta", "Medina", "Herrera", "Suárez", "Aguirre", "Giménez", "Molina", "Castro", "Ortiz"]
+CALLES = ["San Martín", "Belgrano", "Rivadavia", "Sarmiento", "Mitre", "Moreno", "Av. Corrientes",
+          "Av. Colón", "Urquiza", "9 de Julio", "25 de Mayo", "Av. Libertador", "Roca", "Alem"]
+DOMINIOS = ["gmail.com", "hotmail.com", "yahoo.com", "outlook.com"]
+
+
+# --------------- Catálogos (deterministas: los reconstruye cada worker) ---------------
+
+def _cantidades(sf):
+    return (max(24, round(CLIENTES_POR_SF * sf)), max(len(RUBROS), round(PRODUCTOS_POR_SF * sf)),
+            max(1, round(FACTURAS_POR_SF * sf)))
+
+
+def _zipf(n, s, rng):
+    """Pesos acumulados de Zipf para los ids 1..n, con el ranking de popularidad mezclado."""
+    rango = list(range(1, n + 1))
+    rng.shuffle(rango)
+    return list(accumulate(1 / r ** s for r in rango))
+
+
+def _productos(semilla, n):
+    """Genera [(id, descripcion, precio, id_rubro, stock)]."""
+    rng = random.Random(f"{semilla}:producto")
+    rubros, pesos = list(PESO_RUBRO), list(PESO_RUBRO.values())
+    filas = []
+    for id_producto in range(1, n + 1):
+        id_rubro = id_producto if id_producto <= len(RUBROS) else rng.choices(rubros, pesos)[0]
+        _, tipos, marcas, minimo, maximo = RUBROS[id_rubro]
+        # precio log-uniforme dentro del rango del rubro, redondeado a $100
+        precio = round(math.exp(rng.uniform(math.log(minimo), math.log(maximo))), -2)
+        descripcion = f"{rng.choice(tipos)} {rng.choice(marcas)} {rng.choice('ABCDEFGHKMPRSTXZ')}{rng.randint(10, 999)}"
+        filas.append((id_producto, descripcion, precio, id_rubro, rng.randint(0, 500)))
+    return filas
+
+
+def _clientes(semilla, n):
+    """Genera [(id, nombre, id_provincia, domicilio, telefono, email)]."""
+    rng = random.Random(f"{semilla}:cliente")
+    provincias, pesos = list(PESO_PROVINCIA), list(PESO_PROVINCIA.values())
+    filas = []
+    for id_cliente in range(1, n + 1):
+        # los primeros 24 cubren todas las provincias; el resto según la población
+        id_provincia = id_cliente if id_cliente <= len(provincias) else rng.choices(provincias, pesos)[0]
+        nombre, apellido = rng.choice(NOMBRES), rng.choice(APELLIDOS)
+        telefono = CARACTERISTICA.get(id_provincia, "3" + str(rng.randint(10, 99)))
+        telefono += str(rng.randint(10**(9 - len(telefono)), 10**(10 - len(telefono)) - 1))
+        usuario = f"{nombre}.{apellido}".lower().translate(str.maketrans("áéíóú", "aeiou"))
+        filas.append((
+            id_cliente, f"{nombre} {apellido}", id_provincia,
+            f"{rng.choice(CALLES)} {rng.randint(1, 9000)}", telefono,
+            f"{usuario}{id_cliente}@{rng.choice(DOMINIOS)}",
+        ))
+    return filas
+
+
+def _calendario(desde, hasta):
+    """(días, pesos acumulados) con estacionalidad mensual, semanal y crecimiento anual."""
+    dias, pesos = [], []
+    dia = desde
+    while dia <= hasta:
+        dias.append(dia.isoformat())
+        pesos.append(ESTACIONALIDAD[dia.month - 1] * DIA_SEMANA[dia.weekday()]
+                     * (1 + CRECIMIENTO_ANUAL) ** (dia.year - desde.year))
+        dia += timedelta(days=1)
+    return dias, list(accumulate(pesos))
+
+
+_estado = {}
+
+
+def _iniciar(config):
+    """Initializer de cada worker: arma los catálogos una vez por proceso."""
+    semilla = config["semilla"]
+    n_clientes, n_productos, n_facturas = _cantidades(config["sf"])
+    rng = random.Random(f"{semilla}:popularidad")
+    dias, acumulado = _calendario(config["desde"], config["hasta"])
+    sucursales = range(1, config["sucursales"] + 1)
+    _estado.update(
+        config=config,
+        n_facturas=n_facturas,
+        precios=[p[2] for p in _productos(semilla, n_productos)],
+        productos=range(1, n_productos + 1),
+        peso_productos=_zipf(n_productos, ZIPF_PRODUCTOS, rng),
+        clientes=range(1, n_clientes + 1),
+        peso_clientes=_zipf(n_clientes, ZIPF_CLIENTES, rng),
+        dias=dias,
+        peso_dias=acumulado,
+        sucursales=sucursales,
+        # la sucursal 1 (casa central) vende más; el resto decrece
+        peso_sucursales=list(accumulate(1 / s ** 0.8 for s in sucursales)),
+    )
+
+
+def _bloque(indice):
+    """
+    Genera las facturas del bloque 'indice' con su propio generador aleatorio.
+    Devuelve (facturas, líneas): texto CSV o listas de tuplas según config["csv"].
+    """
+    e = _estado
+    rng = random.Random(f"{e['config']['semilla']}:factura:{indice}")
+    primero = indice * BLOQUE + 1
+    ids = range(primero, min(primero + BLOQUE, e["n_facturas"] + 1))
+    escala = e["peso_dias"][-1] / e["n_facturas"]
+    precios, dias, peso_dias = e["precios"], e["dias"], e["peso_dias"]
+
+    # todos los sorteos del bloque de una vez (choices con k es mucho más rápido que de a uno)
+    clientes = rng.choices(e["clientes"], cum_weights=e["peso_clientes"], k=len(ids))
+    sucursales = rng.choices(e["sucursales"], cum_weights=e["peso_sucursales"], k=len(ids))
+    por_factura = rng.choices(range(1, len(LINEAS_PESOS) + 1), LINEAS_PESOS, k=len(ids))
+    total = sum(por_factura)
+    productos = rng.choices(e["productos"], cum_weights=e["peso_productos"], k=total)
+    cantidades = rng.choices(range(1, len(CANTIDAD_PESOS) + 1), CANTIDAD_PESOS, k=total)
+    cuantiles = [rng.random() for _ in ids]
+
+    facturas, lineas = [], []
+    pos = 0
+    for id_factura, id_cliente, id_sucursal, k, u in zip(ids, clientes, sucursales, por_factura, cuantiles):
+        # fecha por cuantil: id creciente => fecha creciente, con la densidad del calendario
+        dia = dias[bisect.bisect(peso_dias, (id_factura - 1 + u) * escala)]
+        items = {}
+        for id_producto, cantidad in zip(productos[pos:pos + k], cantidades[pos:pos + k]):
+            # el mismo producto dos veces se suma en una línea (PK id_factura, id_producto)
+            items[id_producto] = items.get(id_producto, 0) + cantidad
+        pos += k
+        monto = 0.0
+        for id_producto, cantidad in items.items():
+            precio = precios[id_producto - 1]
+            monto += cantidad * precio
+            lineas.append((id_factura, id_producto, cantidad, precio))
+        facturas.append((id_factura, dia, id_sucursal, id_cliente, monto))
+
+    if not e["config"]["csv"]:
+        return facturas, lineas
+    # los campos son números y fechas ISO: no hace falta el escape del módulo csv
+    return ("".join(f"{f[0]},{f[1]},{f[2]},{f[3]},{f[4]:.0f}\n" for f in facturas),
+            "".join(f"{d[0]},{d[1]},{d[2]},{d[3]:.0f}\n" for d in lineas))
+
+
+def _bloques(config, workers):
+    """Genera los bloques en orden, con a lo sumo 2 × workers en vuelo."""
+    cantidad = math.ceil(_cantidades(config["sf"])[2] / BLOQUE)
+    if not workers:
+        _iniciar(config)
+        yield from map(_bloque, range(cantidad))
+        return
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=_iniciar, initargs=(config,)) as executor:
+        pending = deque()
+        for indice in range(cantidad):
+            pending.append(executor.submit(_bloque, indice))
+            if len(pending) >= workers * 2:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+
+# --------------- Salidas ---------------
+
+COLUMNAS = {
+    "rubro": ["id_rubro", "nombre_rubro"],
+    "cliente": ["id_cliente", "nombre", "id_provincia", "domicilio", "telefono", "email"],
+    "producto": ["id_producto", "descripcion", "precio", "id_rubro", "stock"],
+    "factura": ["id_factura", "fecha", "id_sucursal", "id_cliente", "monto"],
+    "detalle_factura": ["id_factura", "id_producto", "cantidad", "precio_unitario"],
+}
+
+
+def _catalogos(config):
+    n_clientes, n_productos, _ = _cantidades(config["sf"])
+    return {
+        "rubro": [(id_rubro, nombre) for id_rubro, (nombre, *_) in RUBROS.items()],
+        "cliente": _clientes(config["semilla"], n_clientes),
+        # precios enteros, como en data/producto.csv
+        "producto": [(i, d, int(p), r, s) for i, d, p, r, s in _productos(config["semilla"], n_productos)],
+    }
+
+
+def generar_csv(config, carpeta, workers):
+    os.makedirs(carpeta, exist_ok=True)
+    for tabla, filas in _catalogos(config).items():
+        with open(os.path.join(carpeta, f"{tabla}.csv"), "w", encoding="utf-8", newline="") as f:
+            writer = csv.writer(f, lineterminator="\n")
+            writer.writerow(COLUMNAS[tabla])
+            writer.writerows(filas)
+        print(f"  ✔ {tabla}: {len(filas):,} filas")
+
+    abrir = lambda tabla: open(os.path.join(carpeta, f"{tabla}.csv"), "w", encoding="utf-8", newline="")  # noqa: E731
+    with abrir("factura") as f_factura, abrir("detalle_factura") as f_detalle:
+        f_factura.write(",".join(COLUMNAS["factura"]) + "\n")
+        f_detalle.write(",".join(COLUMNAS["detalle_factura"]) + "\n")
+        progreso = csv_loader.Progress("detalle_factura")
+        facturas = 0
+        for texto_facturas, texto_lineas in _bloques(dict(config, csv=True), workers):
+            f_factura.write(texto_facturas)
+            f_detalle.write(texto_lineas)
+            facturas += texto_facturas.count("\n")
+            progreso.add(texto_lineas.count("\n"))
+        print(f"  ✔ factura: {facturas:,} filas")
+        progreso.done()
+
+
+def generar_db(config, ruta, workers):
+    db.DB_NAME = ruta
+    db.SQL_FILE = os.path.join(ROOT, "init.sql")
+    db.MIGRATIONS_FOLDER = os.path.join(ROOT, "migrations")
+    db.create_db()
+
+    sql = {tabla: f"INSERT INTO {tabla} ({', '.join(cols)}) VALUES ({', '.join('?' * len(cols))})"
+           for tabla, cols in COLUMNAS.items()}
+    with csv_loader.bulk_replace("generador") as tx:
+        for tabla, filas in _catalogos(config).items():
+            tx.executemany(sql[tabla], filas)
+            print(f"  ✔ {tabla}: {len(filas):,} filas")
+        progreso = csv_loader.Progress("detalle_factura")
+        facturas = 0
+        for filas_facturas, filas_lineas in _bloques(dict(config, csv=False), workers):
+            tx.executemany(sql["factura"], filas_facturas)
+            tx.executemany(sql["detalle_factura"], filas_lineas)
+            facturas += len(filas_facturas)
+            progreso.add(len(filas_lineas))
+        print(f"  ✔ factura: {facturas:,} filas")
+        progreso.done()
+    # como en load_csv_data (no debería corregir nada: el monto ya viene calculado)
+    db.reconcile_invoice_totals()
+    db.close_connections()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sf", type=float, default=1.0, help="factor de escala (1 = 100.000 facturas)")
+    parser.add_argument("--semilla", type=int, default=42)
+    destino = parser.add_mutually_exclusive_group()
+    destino.add_argument("--salida", help="carpeta de los CSV (por defecto data_sf<sf>)")
+    destino.add_argument("--db", help="cargar directo en esta base SQLite")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1,
+                        help="procesos que generan facturas (0 = en el proceso principal)")
+    parser.add_argument("--desde", type=date.fromisoformat, default=date(2023, 1, 1))
+    parser.add_argument("--hasta", type=date.fromisoformat, default=date(2025, 12, 31))
+    parser.add_argument("--sucursales", type=int, default=5)
+    args = parser.parse_args()
+
+    if args.sf <= 0:
+        parser.error("--sf debe ser mayor que 0")
+    if args.desde > args.hasta:
+        parser.error("--desde no puede ser posterior a --hasta")
+    if args.sucursales < 1:
+        parser.error("--sucursales debe ser al menos 1")
+
+    config = {"sf": args.sf, "semilla": args.semilla, "desde": args.desde, "hasta": args.hasta,
+              "sucursales": args.sucursales}
+    n_clientes, n_productos, n_facturas = _cantidades(args.sf)
+    print(f"🏭 SF {args.sf:g}: {n_clientes:,} clientes, {n_productos:,} productos, {n_facturas:,} facturas "
+          f"(~{n_facturas * 2.9:,.0f} líneas), semilla {args.semilla}, {args.workers} worker(s)")
+
+    inicio = time.perf_counter()
+    if args.db:
+        generar_db(config, args.db, args.workers)
+        destino = args.db
+    else:
+        destino = args.salida or f"data_sf{args.sf:g}"
+        generar_csv(config, destino, args.workers)
+    print(f"\n✅ Datos generados en {destino} en {time.perf_counter() - inicio:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
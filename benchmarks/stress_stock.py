@@ -0,0 +1,173 @@
+"""
+Prueba de estrés de la reserva de stock: varios procesos facturan a la vez los mismos
+productos (pocos, con poco stock) contra una base temporal y al final se verifica que:
+
+  - hubo ventas rechazadas por stock (si no, las reservas no llegaron a competir);
+  - ningún producto quedó con stock negativo;
+  - stock inicial - unidades facturadas = stock final, para cada producto.
+
+Termina con exit 1 si algo de eso no se cumple. Con --legacy usa la versión anterior
+(leer el stock y descontarlo después con otra sentencia) para mostrar la sobreventa.
+tests/test_stress_stock.py corre una versión chica con pytest.
+
+    python benchmarks/stress_stock.py [--procesos N] [--facturas N] [--productos N] [--stock N] [--legacy]
+"""
+import argparse
+import multiprocessing
+import os
+import random
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import repository as db  # noqa: E402
+
+
+def legacy_create_invoice(cliente_id, fecha, items):
+    """Réplica del flujo anterior: verifica el stock con una lectura y lo descuenta más tarde."""
+    items = db._agrupar_items(items)
+    for id_producto, cantidad, _ in items:
+        stock = db.execute_query("SELECT stock FROM producto WHERE id_producto = ?", (id_producto,), fetch="one")
+        if stock is None or cantidad > stock[0]:
+            raise db.StockInsuficiente([(id_producto, "?", cantidad, stock[0] if stock else 0)])
+    time.sleep(0.001)  # la ventana entre la lectura y la escritura (UI, red, otro proceso)
+    with db.transaction() as cur:
+        cur.execute("INSERT INTO factura (id_cliente, fecha) VALUES (?, ?) RETURNING id_factura", (cliente_id, fecha))
+        id_factura = cur.fetchone()[0]
+        for id_producto, cantidad, precio in items:
+            cur.execute(
+                "INSERT INTO detalle_factura (id_factura, id_producto, cantidad, precio_unitario) VALUES (?, ?, ?, ?)",
+                (id_factura, id_producto, cantidad, precio)
+            )
+            cur.execute("UPDATE producto SET stock = stock - ? WHERE id_producto = ?", (cantidad, id_producto))
+    return id_factura
+
+
+def vender(args):
+    """Proceso worker: intenta 'facturas' ventas de 1 a 3 líneas; devuelve (ok, sin_stock, errores)."""
+    path, semilla, facturas, productos, legacy = args
+    db.DB_NAME = path
+    db.close_connections()
+    rng = random.Random(semilla)
+    crear = legacy_create_invoice if legacy else db.create_invoice
+
+    ok = sin_stock = errores = 0
+    for i in range(facturas):
+        items = [(rng.randint(1, productos), rng.randint(1, 3), 10.0) for _ in range(rng.randint(1, 3))]
+        try:
+            if not legacy and rng.random() < 0.2:
+                # también el camino de a una línea (agregar a una factura existente)
+                if db.add_invoice_product(rng.randint(1, 5), items[0][0], items[0][1], 10.0):
+                    ok += 1
+                else:
+                    sin_stock += 1
+                continue
+            crear(1, f"2025-01-{i % 28 + 1:02d}", items)
+            ok += 1
+        except db.StockInsuficiente:
+            sin_stock += 1
+        except Exception as e:
+            errores += 1
+            print(f"[WORKER {semilla}] {type(e).__name__}: {e}")
+    db.close_connections()
+    return ok, sin_stock, errores
+
+
+def preparar(path, productos, stock):
+    db.DB_NAME = path
+    db.SQL_FILE = os.path.join(ROOT, "init.sql")
+    db.MIGRATIONS_FOLDER = os.path.join(ROOT, "migrations")
+    db.create_db()
+    conn = db.get_connection()
+    conn.execute(
+        "INSERT INTO cliente (nombre, id_provincia, domicilio, telefono, email) VALUES ('Mostrador', 1, '-', '-', '-')"
+    )
+    conn.executemany(
+        "INSERT INTO producto (descripcion, precio, id_rubro, stock) VALUES (?, 10.0, 1, ?)",
+        [(f"Producto {i}", stock) for i in range(1, productos + 1)]
+    )
+    # facturas vacías para el camino add_invoice_product
+    conn.executemany("INSERT INTO factura (id_cliente, fecha) VALUES (1, '2025-01-01')", [()] * 5)
+    conn.commit()
+    db.close_connections()
+
+
+def verificar(path, stock):
+    db.DB_NAME = path
+    filas = db.execute_query("""
+        SELECT p.id_producto, p.stock, COALESCE(SUM(df.cantidad), 0)
+        FROM producto AS p
+        LEFT JOIN detalle_factura AS df ON df.id_producto = p.id_producto
+        GROUP BY p.id_producto
+    """, fetch="all")
+    negativos = [(id_producto, actual) for id_producto, actual, _ in filas if actual < 0]
+    descuadrados = [(id_producto, actual, vendido) for id_producto, actual, vendido in filas
+                    if stock - vendido != actual]
+    vendidos = sum(vendido for _, _, vendido in filas)
+    db.close_connections()
+    return negativos, descuadrados, vendidos
+
+
+def correr(path, procesos, facturas, productos, stock, legacy=False):
+    """
+    Prepara la base en 'path', lanza los procesos y verifica el resultado.
+    Devuelve un dict con ventas, rechazadas, errores, vendidos, negativos, descuadrados y segundos.
+    """
+    preparar(path, productos, stock)
+    inicio = time.perf_counter()
+    tareas = [(path, semilla, facturas, productos, legacy) for semilla in range(procesos)]
+    with multiprocessing.Pool(procesos) as pool:
+        resultados = pool.map(vender, tareas)
+    segundos = time.perf_counter() - inicio
+
+    ventas, rechazadas, errores = (sum(r[i] for r in resultados) for i in range(3))
+    negativos, descuadrados, vendidos = verificar(path, stock)
+    return {"ventas": ventas, "rechazadas": rechazadas, "errores": errores, "vendidos": vendidos,
+            "negativos": negativos, "descuadrados": descuadrados, "segundos": segundos}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--procesos", type=int, default=8)
+    parser.add_argument("--facturas", type=int, default=300, help="intentos de venta por proceso")
+    parser.add_argument("--productos", type=int, default=5)
+    parser.add_argument("--stock", type=int, default=100,
+                        help="stock inicial de cada producto (bajo, para que las reservas compitan)")
+    parser.add_argument("--legacy", action="store_true", help="usar la verificación anterior (con carrera)")
+    args = parser.parse_args()
+
+    modo = "legacy (leer y después descontar)" if args.legacy else "reserva atómica"
+    print(f"🏁 {args.procesos} procesos × {args.facturas} ventas sobre {args.productos} productos "
+          f"con stock {args.stock} — {modo}")
+    with tempfile.TemporaryDirectory() as tmp:
+        r = correr(os.path.join(tmp, "stress.db"), args.procesos, args.facturas, args.productos, args.stock,
+                   args.legacy)
+
+    print(f"   {r['ventas']} ventas, {r['rechazadas']} rechazadas por stock, {r['errores']} errores "
+          f"en {r['segundos']:.1f}s")
+    print(f"   unidades vendidas: {r['vendidos']} de {args.stock * args.productos} disponibles")
+
+    fallas = 0
+    if not r["rechazadas"]:
+        fallas += 1
+        print("❌ Ninguna venta se rechazó por stock: las reservas no compitieron (bajar --stock "
+              "o subir --procesos / --facturas).")
+    if r["negativos"]:
+        fallas += 1
+        print(f"❌ Stock negativo: {r['negativos']}")
+    if r["descuadrados"]:
+        fallas += 1
+        print(f"❌ Stock que no cuadra con lo facturado (producto, stock, vendido): {r['descuadrados']}")
+    if r["errores"]:
+        fallas += 1
+        print(f"❌ {r['errores']} venta(s) fallaron con un error inesperado.")
+    if fallas:
+        sys.exit(1)
+    print("✅ El stock nunca quedó negativo y cuadra con lo facturado.")
+
+
+if __name__ == "__main__":
+    main()
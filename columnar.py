@@ -0,0 +1,173 @@
+"""
+Exportación e importación columnar (Parquet o Arrow IPC) de todas las tablas.
+
+A diferencia de CSV/JSON, los archivos conservan los tipos (precio como float64,
+fecha como date32, ids como int64) y van comprimidos. Requiere el paquete opcional
+'pyarrow' (pip install pyarrow).
+"""
+import os
+from datetime import date
+
+import csv_loader
+import repository as db
+
+BATCH_SIZE = 50_000
+
+FORMATS = {"parquet": ".parquet", "arrow": ".arrow"}
+
+# Columnas TEXT que en realidad son fechas, con la columna que tiene su día normalizado
+# (AAAAMMDD, ver migración 010: ISO, DD/MM/AAAA y variantes)
+DATE_COLUMNS = {("factura", "fecha"): "fecha_dia"}
+
+
+def _pyarrow():
+    try:
+        import pyarrow
+        import pyarrow.ipc
+        import pyarrow.parquet
+    except ImportError:
+        raise RuntimeError("La exportación Parquet/Arrow requiere el paquete 'pyarrow' (pip install pyarrow).")
+    return pyarrow
+
+
+def _schema(pa, table, cursor, dates):
+    fields = []
+    for _, name, declared, notnull, _, pk in cursor.execute(f"PRAGMA table_info({table})"):
+        declared = (declared or "TEXT").upper()
+        if name in dates:
+            kind = pa.date32()
+        elif "INT" in declared:
+            kind = pa.int64()
+        elif declared in ("REAL", "FLOAT", "DOUBLE"):
+            kind = pa.float64()
+        else:
+            kind = pa.string()
+        fields.append(pa.field(name, kind, nullable=not (notnull or pk)))
+    return pa.schema(fields)
+
+
+def _date(dia):
+    """Entero AAAAMMDD -> date (ValueError si no es un día válido)."""
+    return date(dia // 10000, dia // 100 % 100, dia % 100)
+
+
+def _date_columns(table, cursor):
+    """
+    {columna: columna con su día normalizado} de las fechas de la tabla que se exportan
+    como date32. Si algún valor no se reconoce como fecha, esa columna se exporta como
+    texto tal cual, así no se pierde ningún valor.
+    """
+    dates = {}
+    for (date_table, column), dia in DATE_COLUMNS.items():
+        if date_table != table:
+            continue
+        invalid = 0
+        for (value,) in cursor.execute(f"SELECT {dia} FROM {table} WHERE trim({column}) <> ''"):
+            try:
+                _date(value)
+            except (TypeError, ValueError):
+                invalid += 1
+        if invalid:
+            print(f"⚠️  {table}.{column}: {invalid} fecha(s) con formato no reconocido; se exporta como texto.")
+        else:
+            dates[column] = dia
+    return dates
+
+
+def export_table(table, fmt, export_dir, compression="zstd", batch_size=BATCH_SIZE):
+    pa = _pyarrow()
+    path = os.path.join(export_dir, f"{table}{FORMATS[fmt]}")
+
+    try:
+        with db.read_only():
+            cursor = db.get_connection().cursor()
+            dates = _date_columns(table, cursor)
+            schema = _schema(pa, table, cursor, dates)
+            date_idx = [i for i, f in enumerate(schema) if pa.types.is_date32(f.type)]
+
+            if fmt == "parquet":
+                writer = pa.parquet.ParquetWriter(path, schema, compression=compression)
+            else:
+                options = pa.ipc.IpcWriteOptions(compression=compression)
+                writer = pa.ipc.new_file(path, schema, options=options)
+
+            count = 0
+            try:
+                # las fechas se leen ya normalizadas (DD/MM/AAAA y AAAA-MM-DD dan el mismo día)
+                cursor.execute(f"SELECT {', '.join(dates.get(name, name) for name in schema.names)} FROM {table}")
+                while True:
+                    rows = cursor.fetchmany(batch_size)
+                    if not rows:
+                        break
+                    columns = [list(col) for col in zip(*rows)]
+                    for i in date_idx:
+                        columns[i] = [_date(v) if v is not None else None for v in columns[i]]
+                    writer.write_batch(pa.record_batch(columns, schema=schema))
+                    count += len(rows)
+            finally:
+                writer.close()
+                cursor.close()
+    finally:
+        db.release_connections()
+
+    return path, count
+
+
+def export_all(fmt="parquet", export_dir=None, compression="zstd", batch_size=BATCH_SIZE):
+    """Exporta todas las tablas de datos a Parquet o Arrow. Devuelve {tabla: (ruta, filas)}."""
+    if fmt not in FORMATS:
+        raise ValueError(f"Formato no soportado: {fmt}")
+    _pyarrow()
+    export_dir = export_dir or f"export_{fmt}"
+    os.makedirs(export_dir, exist_ok=True)
+    return {table: export_table(table, fmt, export_dir, compression, batch_size) for table in db.get_table_names()}
+
+
+def _batches(pa, path, fmt, batch_size):
+    if fmt == "parquet":
+        yield from pa.parquet.ParquetFile(path).iter_batches(batch_size=batch_size)
+    else:
+        with pa.memory_map(path) as source:
+            reader = pa.ipc.open_file(source)
+            for i in range(reader.num_record_batches):
+                yield reader.get_batch(i)
+
+
+def import_all(folder=None, fmt="parquet", batch_size=BATCH_SIZE):
+    """
+    Reemplaza el contenido de las tablas con los archivos <tabla>.parquet / <tabla>.arrow
+    de la carpeta, en orden de claves foráneas y en una única transacción.
+    Devuelve {tabla: filas cargadas}.
+    """
+    pa = _pyarrow()
+    folder = folder or f"export_{fmt}"
+    loaded = {}
+
+    with csv_loader.bulk_replace(fmt.capitalize()) as tx:
+        for table in csv_loader.LOAD_ORDER:
+            path = os.path.join(folder, f"{table}{FORMATS[fmt]}")
+            if not os.path.exists(path):
+                print(f"⚠️  No se encontró el archivo para '{table}': {path}")
+                continue
+
+            print(f"Loading '{os.path.basename(path)}' into table '{table}'...")
+            progress = csv_loader.Progress(table)
+            for batch in _batches(pa, path, fmt, batch_size):
+                names = batch.schema.names
+                columns = []
+                for i, name in enumerate(names):
+                    values = batch.column(i).to_pylist()
+                    if pa.types.is_date32(batch.schema.field(i).type):
+                        values = [v.isoformat() if v is not None else None for v in values]
+                    elif (table, name) in DATE_COLUMNS:
+                        # fecha exportada como texto (algún valor no se reconocía): se normaliza al guardar
+                        values = [db._fecha_iso(v) for v in values]
+                    columns.append(values)
+                sql = f"INSERT INTO {table} ({', '.join(names)}) VALUES ({', '.join('?' * len(names))})"
+                tx.executemany(sql, zip(*columns))
+                progress.add(batch.num_rows)
+            progress.done()
+            loaded[table] = progress.rows
+
+    db.reconcile_invoice_totals()
+    return loaded
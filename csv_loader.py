@@ -0,0 +1,401 @@
+"""
+Carga masiva de los CSV de CSV_FOLDER en la base.
+
+Los archivos se leen por bloques de tamaño acotado (opcionalmente parseados en
+procesos worker) y un único escritor los inserta con executemany dentro de una
+sola transacción, así la memoria no depende del tamaño del archivo.
+
+Dos modos:
+- load_csv_files: recarga completa (vacía las tablas y vuelve a insertar todo).
+- sync_csv_files: sincronización incremental; aplica solo las filas que cambiaron
+  en el CSV desde la última sincronización y conserva las ediciones locales del resto.
+"""
+import csv
+import hashlib
+import io
+import os
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+
+import repository as db
+
+# Orden de carga según las claves foráneas (provincia viene de init.sql)
+LOAD_ORDER = ["rubro", "cliente", "producto", "factura", "detalle_factura"]
+
+CHUNK_SIZE = 50_000
+
+# Pragmas que se aplican solo durante la carga; al terminar se restauran los valores previos
+BULK_PRAGMAS = {
+    "synchronous": "OFF",
+    "cache_size": "-200000",  # ~200 MB
+    "foreign_keys": "OFF",
+}
+
+PROGRESS_EVERY = 2.0  # segundos entre reportes de progreso
+
+# Columnas de fecha: se guardan como 'YYYY-MM-DD' (repository._fecha_iso) para que
+# factura.fecha_dia las reconozca aunque el CSV traiga '4/1/2025' o '2025-1-4'
+DATE_COLUMNS = {"factura": {"fecha"}}
+
+
+def _convert(value, kind):
+    if value == "":
+        return None
+    if kind == "INTEGER":
+        try:
+            return int(value)
+        except ValueError:
+            return int(float(value))
+    if kind == "REAL":
+        return float(value)
+    if kind == "FECHA":
+        return db._fecha_iso(value)
+    return value
+
+
+def _parse_chunk(text, kinds):
+    """Parsea un bloque de líneas CSV (sin encabezado) y convierte cada columna a su tipo."""
+    return [
+        tuple(_convert(value, kind) for value, kind in zip(row, kinds))
+        for row in csv.reader(io.StringIO(text))
+        if row
+    ]
+
+
+def _read_chunks(path, chunk_size):
+    """Devuelve (encabezado, generador de bloques de texto con chunk_size líneas cada uno)."""
+    f = open(path, "r", encoding="utf-8-sig", newline="")
+    header = next(csv.reader([f.readline()]))
+
+    def chunks():
+        try:
+            lines = []
+            for line in f:
+                lines.append(line)
+                if len(lines) >= chunk_size:
+                    yield "".join(lines)
+                    lines = []
+            if lines:
+                yield "".join(lines)
+        finally:
+            f.close()
+
+    return header, chunks()
+
+
+def _column_kinds(cursor, table, columns):
+    """Tipo de cada columna de la tabla: el declarado (INTEGER/REAL/TEXT) o FECHA (DATE_COLUMNS)."""
+    declared = {row[1]: (row[2] or "TEXT").upper() for row in cursor.execute(f"PRAGMA table_info({table})")}
+    dates = DATE_COLUMNS.get(table, set())
+    kinds = []
+    for col in columns:
+        kind = declared.get(col, "TEXT")
+        kinds.append("FECHA" if col in dates else "INTEGER" if "INT" in kind
+                     else "REAL" if kind in ("REAL", "FLOAT", "DOUBLE") else "TEXT")
+    return kinds
+
+
+def _parsed_chunks(chunks, kinds, executor, max_pending):
+    """Parsea los bloques en el pool de procesos (si hay) con a lo sumo max_pending en vuelo."""
+    if executor is None:
+        for text in chunks:
+            yield _parse_chunk(text, kinds)
+        return
+
+    pending = deque()
+    for text in chunks:
+        pending.append(executor.submit(_parse_chunk, text, kinds))
+        if len(pending) >= max_pending:
+            yield pending.popleft().result()
+    while pending:
+        yield pending.popleft().result()
+
+
+class Progress:
+    def __init__(self, table):
+        self.table = table
+        self.rows = 0
+        self.start = time.perf_counter()
+        self.last = self.start
+
+    def add(self, n):
+        self.rows += n
+        now = time.perf_counter()
+        if now - self.last >= PROGRESS_EVERY:
+            self.last = now
+            print(f"  … {self.table}: {self.rows:,} filas ({self.rows / (now - self.start):,.0f} filas/s)")
+
+    def done(self):
+        elapsed = max(time.perf_counter() - self.start, 1e-9)
+        print(f"  ✔ {self.table}: {self.rows:,} filas en {elapsed:.2f}s ({self.rows / elapsed:,.0f} filas/s)")
+
+
+def _load_table(cursor, table, path, chunk_size, executor, max_pending):
+    header, chunks = _read_chunks(path, chunk_size)
+    table_columns = {row[1] for row in cursor.execute(f"PRAGMA table_info({table})")}
+    unknown = [c for c in header if c not in table_columns]
+    if unknown:
+        raise ValueError(f"Columnas del CSV '{path}' que no existen en '{table}': {unknown}")
+
+    kinds = _column_kinds(cursor, table, header)
+    sql = f"INSERT INTO {table} ({', '.join(header)}) VALUES ({', '.join('?' * len(header))})"
+
+    progress = Progress(table)
+    for rows in _parsed_chunks(chunks, kinds, executor, max_pending):
+        cursor.executemany(sql, rows)
+        progress.add(len(rows))
+    progress.done()
+    return progress.rows
+
+
+@contextmanager
+def bulk_replace(origen="CSV"):
+    """
+    Sesión de carga masiva: aplica las migraciones pendientes y BULK_PRAGMAS, abre una
+    única transacción y vacía las tablas (hijos primero). Al salir hace commit, o rollback
+    si hubo un error, y restaura los pragmas previos. Entrega el cursor de la transacción.
+    """
+    # la carga usa tablas de las migraciones (csv_sync_*, cambios_pausa): antes de vaciar nada
+    db.migrate()
+    conn = db.get_connection()
+    cursor = conn.cursor()
+
+    previous = {name: cursor.execute(f"PRAGMA {name}").fetchone()[0] for name in BULK_PRAGMAS}
+    for name, value in BULK_PRAGMAS.items():
+        cursor.execute(f"PRAGMA {name} = {value}")
+
+    try:
+        with db.transaction() as tx:
+            print(f"🧹 Limpiando tablas antes de cargar datos {origen}...")
+            for table in reversed(LOAD_ORDER):
+                tx.execute(f"DELETE FROM {table};")
+                print(f"  → Tabla '{table}' vaciada.")
+            # la próxima sincronización incremental toma como base el contenido recién cargado
+            tx.execute("DELETE FROM csv_sync_rows")
+            tx.execute("DELETE FROM csv_sync_files")
+            # sin registro de cambios fila por fila: al terminar se marca cada tabla como recargada
+            tx.execute("INSERT OR IGNORE INTO cambios_pausa (id) VALUES (1)")
+
+            print(f"\n📂 Cargando datos desde {origen}...\n")
+            yield tx
+
+            db.rebuild_sales_rollup()
+            tx.execute("DELETE FROM cambios_pausa")
+            for index in db.SEARCH_INDEXES:
+                tx.execute(f"INSERT INTO {index} ({index}) VALUES ('rebuild')")
+            for table in LOAD_ORDER:
+                tx.execute("DELETE FROM cambios WHERE tabla = ?", (table,))
+                tx.execute("INSERT INTO cambios (tabla, clave) VALUES (?, NULL)", (table,))
+        db.invalidate_lookups()
+    finally:
+        for name, value in previous.items():
+            cursor.execute(f"PRAGMA {name} = {value}")
+        cursor.close()
+
+
+def load_csv_files(folder=None, chunk_size=CHUNK_SIZE, workers=0, tables=None):
+    """
+    Vacía las tablas y carga los CSV de la carpeta (<tabla>.csv) en orden de claves foráneas.
+    Todo ocurre en una única transacción: si algo falla, la base queda como estaba.
+
+    workers > 0 parsea los bloques en ese número de procesos; la escritura sigue siendo
+    de un solo hilo (SQLite admite un único escritor).
+    Devuelve {tabla: filas cargadas}.
+    """
+    folder = folder or db.CSV_FOLDER
+    tables = tables or LOAD_ORDER
+
+    executor = ProcessPoolExecutor(max_workers=workers) if workers > 0 else None
+    loaded = {}
+    try:
+        with bulk_replace("CSV") as tx:
+            for table in tables:
+                path = os.path.join(folder, f"{table}.csv")
+                if not os.path.exists(path):
+                    print(f"⚠️  No se encontró el archivo CSV para '{table}': {path}")
+                    continue
+                print(f"Loading '{os.path.basename(path)}' into table '{table}'...")
+                loaded[table] = _load_table(tx, table, path, chunk_size, executor, max(2, workers * 2))
+    finally:
+        if executor is not None:
+            executor.shutdown(cancel_futures=True)
+
+    return loaded
+
+
+# --------------- Sincronización incremental ---------------
+
+SYNC_LOOKUP_BATCH = 500
+
+# Columnas que mantiene la propia base (triggers) y que la sincronización no compara ni pisa
+DERIVED_COLUMNS = {"factura": {"monto"}}
+
+
+def file_hash(path):
+    """SHA-256 del archivo, leído por bloques."""
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+def _row_hash(row):
+    return hashlib.blake2b(repr(row).encode("utf-8"), digest_size=16).digest()
+
+
+def _primary_key(cursor, table):
+    info = [row for row in cursor.execute(f"PRAGMA table_info({table})") if row[5] > 0]
+    return [row[1] for row in sorted(info, key=lambda r: r[5])]
+
+
+def _key_text(values):
+    return "|".join("" if v is None else str(v) for v in values)
+
+
+def _baseline_from_table(cursor, table, header, pk, sync_id):
+    """Primera sincronización de la tabla: toma como referencia las filas actuales de la base."""
+    pk_idx = [header.index(c) for c in pk]
+    select = cursor.connection.execute(f"SELECT {', '.join(header)} FROM {table}")
+    while True:
+        rows = select.fetchmany(CHUNK_SIZE)
+        if not rows:
+            break
+        cursor.executemany(
+            "INSERT OR REPLACE INTO csv_sync_rows (tabla, clave, row_hash, sync_id) VALUES (?, ?, ?, ?)",
+            [(table, _key_text([r[i] for i in pk_idx]), _row_hash(tuple(r)), sync_id) for r in rows]
+        )
+
+
+def _stored_hashes(cursor, table, keys):
+    stored = {}
+    for i in range(0, len(keys), SYNC_LOOKUP_BATCH):
+        batch = keys[i:i + SYNC_LOOKUP_BATCH]
+        cursor.execute(
+            f"SELECT clave, row_hash FROM csv_sync_rows WHERE tabla = ? AND clave IN ({', '.join('?' * len(batch))})",
+            [table, *batch]
+        )
+        stored.update(cursor.fetchall())
+    return stored
+
+
+def _sync_table(cursor, table, path, chunk_size, sync_id):
+    csv_header, chunks = _read_chunks(path, chunk_size)
+    derived = DERIVED_COLUMNS.get(table, set())
+    keep = [i for i, c in enumerate(csv_header) if c not in derived]
+    header = [csv_header[i] for i in keep]
+    pk = _primary_key(cursor, table)
+    missing = [c for c in pk if c not in header]
+    if missing:
+        raise ValueError(f"El CSV '{path}' no trae la clave primaria de '{table}': {missing}")
+
+    csv_kinds = _column_kinds(cursor, table, csv_header)
+    kinds = [csv_kinds[i] for i in keep]
+    pk_idx = [header.index(c) for c in pk]
+    non_pk = [c for c in header if c not in pk]
+    upsert = (
+        f"INSERT INTO {table} ({', '.join(header)}) VALUES ({', '.join('?' * len(header))}) "
+        f"ON CONFLICT ({', '.join(pk)}) DO "
+        + (f"UPDATE SET {', '.join(f'{c} = excluded.{c}' for c in non_pk)}" if non_pk else "NOTHING")
+    )
+
+    cursor.execute("SELECT 1 FROM csv_sync_rows WHERE tabla = ? LIMIT 1", (table,))
+    if cursor.fetchone() is None:
+        _baseline_from_table(cursor, table, header, pk, sync_id - 1)
+
+    summary = {"insertadas": 0, "actualizadas": 0, "eliminadas": 0, "sin_cambios": 0}
+    for text in chunks:
+        rows = [tuple(r[i] for i in keep) for r in _parse_chunk(text, csv_kinds)]
+        keyed = [(_key_text([r[i] for i in pk_idx]), _row_hash(r), r) for r in rows]
+        stored = _stored_hashes(cursor, table, [k for k, _, _ in keyed])
+
+        changed = []
+        for key, h, row in keyed:
+            previous = stored.get(key)
+            if previous is None:
+                summary["insertadas"] += 1
+                changed.append(row)
+            elif previous != h:
+                summary["actualizadas"] += 1
+                changed.append(row)
+            else:
+                summary["sin_cambios"] += 1
+
+        if changed:
+            cursor.executemany(upsert, changed)
+        cursor.executemany(
+            "INSERT INTO csv_sync_rows (tabla, clave, row_hash, sync_id) VALUES (?, ?, ?, ?) "
+            "ON CONFLICT (tabla, clave) DO UPDATE SET row_hash = excluded.row_hash, sync_id = excluded.sync_id",
+            [(table, key, h, sync_id) for key, h, _ in keyed]
+        )
+    return summary, pk, [kinds[i] for i in pk_idx]
+
+
+def _delete_unseen(cursor, table, pk, pk_kinds, sync_id):
+    """Borra de la tabla las filas que estaban en el CSV anterior y ya no están."""
+    deleted = cursor.connection.execute(
+        "SELECT clave FROM csv_sync_rows WHERE tabla = ? AND sync_id <> ?", (table, sync_id)
+    ).fetchall()
+    where = " AND ".join(f"{c} = ?" for c in pk)
+    cursor.executemany(
+        f"DELETE FROM {table} WHERE {where}",
+        [tuple(_convert(v, k) for v, k in zip(clave.split("|"), pk_kinds)) for (clave,) in deleted]
+    )
+    cursor.execute("DELETE FROM csv_sync_rows WHERE tabla = ? AND sync_id <> ?", (table, sync_id))
+    return len(deleted)
+
+
+def sync_csv_files(folder=None, chunk_size=CHUNK_SIZE, tables=None):
+    """
+    Sincroniza las tablas con los CSV de la carpeta aplicando solo las diferencias
+    (INSERT ... ON CONFLICT DO UPDATE para altas/cambios y DELETE para bajas).
+
+    Los archivos que no cambiaron desde la última sincronización se saltean por su hash.
+    Las filas que no cambiaron en el CSV no se tocan, así se conservan las ediciones locales.
+    Todo ocurre en una única transacción. Devuelve {tabla: resumen de cambios}.
+    """
+    db.migrate()  # csv_sync_files / csv_sync_rows vienen de la migración 004
+    folder = folder or db.CSV_FOLDER
+    tables = tables or LOAD_ORDER
+    sync_id = time.time_ns()
+    summaries = {}
+    pending_deletes = []
+
+    with db.transaction() as tx:
+        # altas y cambios en orden de claves foráneas (padres primero)
+        for table in tables:
+            path = os.path.join(folder, f"{table}.csv")
+            if not os.path.exists(path):
+                print(f"⚠️  No se encontró el archivo CSV para '{table}': {path}")
+                continue
+
+            digest = file_hash(path)
+            tx.execute("SELECT file_hash FROM csv_sync_files WHERE tabla = ?", (table,))
+            row = tx.fetchone()
+            if row and row[0] == digest:
+                summaries[table] = None
+                continue
+
+            summary, pk, pk_kinds = _sync_table(tx, table, path, chunk_size, sync_id)
+            summaries[table] = summary
+            pending_deletes.append((table, pk, pk_kinds))
+            tx.execute(
+                "INSERT INTO csv_sync_files (tabla, file_hash) VALUES (?, ?) "
+                "ON CONFLICT (tabla) DO UPDATE SET file_hash = excluded.file_hash, synced_at = CURRENT_TIMESTAMP",
+                (table, digest)
+            )
+
+        # bajas en orden inverso (hijos primero)
+        for table, pk, pk_kinds in reversed(pending_deletes):
+            summaries[table]["eliminadas"] = _delete_unseen(tx, table, pk, pk_kinds, sync_id)
+
+    print("\n📋 Resumen de la sincronización:")
+    for table, summary in summaries.items():
+        if summary is None:
+            print(f"  {table:<16} sin cambios (mismo archivo)")
+        else:
+            print(f"  {table:<16} +{summary['insertadas']:,}  ~{summary['actualizadas']:,}  "
+                  f"-{summary['eliminadas']:,}  ={summary['sin_cambios']:,}")
+    return summaries
@@ -0,0 +1,127 @@
+"""
+Exportación de todas las tablas a CSV, JSON o NDJSON.
+
+Cada tabla se lee desde una conexión de solo lectura en lotes de BATCH_SIZE filas
+y se escribe a medida que llega, así la memoria depende del lote y no del tamaño
+de la tabla. Las tablas se exportan en paralelo (un hilo por tabla) y la salida
+puede comprimirse con gzip o zstd.
+"""
+import csv
+import gzip
+import io
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import repository as db
+
+BATCH_SIZE = 5_000
+
+FORMATS = {"csv": ".csv", "json": ".json", "ndjson": ".ndjson"}
+COMPRESSIONS = {None: "", "gzip": ".gz", "zstd": ".zst"}
+
+
+def _open_output(path, compression, encoding):
+    """Abre el archivo de salida en modo texto, comprimido si corresponde."""
+    if compression is None:
+        return open(path, "w", encoding=encoding, newline="")
+    if compression == "gzip":
+        return gzip.open(path, "wt", encoding=encoding, newline="")
+    if compression == "zstd":
+        try:
+            import zstandard
+        except ImportError:
+            raise RuntimeError("La compresión zstd requiere el paquete 'zstandard' (pip install zstandard).")
+        raw = zstandard.ZstdCompressor().stream_writer(open(path, "wb"), closefd=True)
+        return io.TextIOWrapper(raw, encoding=encoding, newline="")
+    raise ValueError(f"Compresión no soportada: {compression}")
+
+
+def _batches(cursor, batch_size):
+    while True:
+        rows = cursor.fetchmany(batch_size)
+        if not rows:
+            return
+        yield rows
+
+
+def _write_csv(out, columns, batches):
+    writer = csv.writer(out, lineterminator="\n")
+    writer.writerow(columns)
+    count = 0
+    for rows in batches:
+        writer.writerows(rows)
+        count += len(rows)
+    return count
+
+
+def _write_json(out, columns, batches):
+    """Arreglo JSON indentado (mismo formato que el export anterior), escrito por partes."""
+    out.write("[")
+    count = 0
+    for rows in batches:
+        for row in rows:
+            record = json.dumps(dict(zip(columns, row)), indent=4, ensure_ascii=False)
+            out.write(("," if count else "") + "\n    " + record.replace("\n", "\n    "))
+            count += 1
+    out.write("\n]" if count else "]")
+    return count
+
+
+def _write_ndjson(out, columns, batches):
+    count = 0
+    for rows in batches:
+        out.writelines(json.dumps(dict(zip(columns, row)), ensure_ascii=False) + "\n" for row in rows)
+        count += len(rows)
+    return count
+
+
+WRITERS = {"csv": _write_csv, "json": _write_json, "ndjson": _write_ndjson}
+
+
+def export_table(table, fmt, export_dir, compression=None, batch_size=BATCH_SIZE):
+    """Exporta una tabla; corre en su propio hilo con su propia conexión de solo lectura."""
+    path = os.path.join(export_dir, f"{table}{FORMATS[fmt]}{COMPRESSIONS[compression]}")
+    # utf-8-sig para que Excel reconozca los acentos en los CSV sin comprimir
+    encoding = "utf-8-sig" if fmt == "csv" and compression is None else "utf-8"
+
+    try:
+        with db.read_only():
+            cursor = db.get_connection().cursor()
+            try:
+                # table_info no incluye las columnas generadas (factura.fecha_dia): se
+                # exportan solo las guardadas, que son las que aceptan los importadores
+                columns = [row[1] for row in cursor.execute(f"PRAGMA table_info({table})")]
+                cursor.execute(f"SELECT {', '.join(columns)} FROM {table}")
+                with _open_output(path, compression, encoding) as out:
+                    count = WRITERS[fmt](out, columns, _batches(cursor, batch_size))
+            finally:
+                cursor.close()
+    finally:
+        db.release_connections()
+    return path, count
+
+
+def export_all(fmt="csv", export_dir=None, compression=None, batch_size=BATCH_SIZE, workers=None):
+    """
+    Exporta todas las tablas de datos en paralelo.
+    Devuelve {tabla: (ruta, filas)}.
+    """
+    if fmt not in FORMATS:
+        raise ValueError(f"Formato no soportado: {fmt}")
+    if compression not in COMPRESSIONS:
+        raise ValueError(f"Compresión no soportada: {compression}")
+
+    export_dir = export_dir or f"export_{fmt}"
+    os.makedirs(export_dir, exist_ok=True)
+    tables = db.get_table_names()
+
+    results = {}
+    with ThreadPoolExecutor(max_workers=workers or min(len(tables), os.cpu_count() or 1) or 1) as pool:
+        futures = {
+            table: pool.submit(export_table, table, fmt, export_dir, compression, batch_size)
+            for table in tables
+        }
+        for table, future in futures.items():
+            results[table] = future.result()
+    return results
@@ -1,6 +1,10 @@
+import sqlite3
 import customtkinter as ctk
 from tkinter import ttk, messagebox
 import repository as db
+from loader import BackgroundLoader
+from tab import TreeSync
+import ui_profiler
 from datetime import datetime
 
 
@@ -24,6 +28,13 @@ class FacturaTab:
         self.tree_facturas.heading("fecha", text="Fecha")
         self.tree_facturas.heading("total", text="Total")
         self.tree_facturas.pack(fill="x", pady=5)
+        self.facturas = TreeSync(
+            self.tree_facturas,
+            key=lambda f: f["id"],
+            values=lambda f: (f["id"], f["cliente"], f["fecha"], f["total"]),
+            striped=False,
+        )
+        self._version = None  # versión de datos mostrada (ver db.get_changes_since)
 
         self.tree_facturas.bind("<<TreeviewSelect>>", self.on_factura_select)
 
@@ -34,6 +45,25 @@ class FacturaTab:
         ctk.CTkButton(btn_frame, text="➕ Nueva Factura", command=self.agregar_factura).grid(row=0, column=0, padx=5)
         ctk.CTkButton(btn_frame, text="🔄 Actualizar", command=self.cargar_facturas).grid(row=0, column=1, padx=5)
 
+        self.loading_label = ctk.CTkLabel(btn_frame, text="", width=110)
+        self.loading_label.grid(row=0, column=2, padx=5)
+
+        # --- Filtro por período (YYYY-MM-DD, cualquiera de los dos puede quedar vacío) ---
+        filtro_frame = ctk.CTkFrame(self.frame)
+        filtro_frame.pack(pady=(0, 10))
+
+        ctk.CTkLabel(filtro_frame, text="Desde:").grid(row=0, column=0, padx=(8, 2))
+        self.desde_entry = ctk.CTkEntry(filtro_frame, width=110, placeholder_text="YYYY-MM-DD")
+        self.desde_entry.grid(row=0, column=1, padx=2)
+        ctk.CTkLabel(filtro_frame, text="Hasta:").grid(row=0, column=2, padx=(8, 2))
+        self.hasta_entry = ctk.CTkEntry(filtro_frame, width=110, placeholder_text="YYYY-MM-DD")
+        self.hasta_entry.grid(row=0, column=3, padx=2)
+        ctk.CTkButton(filtro_frame, text="Filtrar", width=80, command=self.filtrar_por_fecha).grid(row=0, column=4, padx=5)
+        ctk.CTkButton(filtro_frame, text="Limpiar", width=80, command=self.limpiar_filtro).grid(row=0, column=5, padx=5)
+        for entry in (self.desde_entry, self.hasta_entry):
+            entry.bind("<Return>", lambda _e: self.filtrar_por_fecha())
+        self._periodo = None  # (desde, hasta) del filtro activo
+
         # --- Detalle de factura ---
         ttk.Label(
             self.frame,
@@ -53,6 +83,9 @@ class FacturaTab:
             self.tree_detalle.heading(col, text=text)
         self.tree_detalle.pack(fill="x", pady=5)
 
+        # Las consultas corren en segundo plano; los resultados se dibujan en el hilo de Tk
+        self.loader = BackgroundLoader(self.frame, on_busy=self._set_loading)
+
         # Cargar los datos al iniciar
         self.cargar_facturas()
 
@@ -60,17 +93,65 @@ class FacturaTab:
     # FUNCIONES PRINCIPALES
     # =====================
 
+    def _set_loading(self, busy):
+        self.loading_label.configure(text="⏳ Cargando..." if busy else "")
+
+    @ui_profiler.profiled("FacturaTab.cargar_facturas")
     def cargar_facturas(self):
-        """Recarga las facturas desde la base de datos."""
-        for row in self.tree_facturas.get_children():
-            self.tree_facturas.delete(row)
+        """Trae (en segundo plano) solo las facturas que cambiaron desde la última carga."""
+        if self._periodo is not None:
+            # con filtro se relee el período completo (búsqueda por rango en idx_factura_fecha_dia)
+            desde, hasta = self._periodo
+            self.loader.submit("facturas", lambda: (None, db.get_invoices(desde, hasta), None),
+                               self._mostrar_facturas)
+            return
+        version = self._version
+        self.loader.submit("facturas", lambda: self._leer_cambios(version), self._mostrar_facturas)
+
+    def filtrar_por_fecha(self):
+        periodo = []
+        for entry in (self.desde_entry, self.hasta_entry):
+            texto = entry.get().strip()
+            if texto:
+                try:
+                    datetime.strptime(texto, "%Y-%m-%d")
+                except ValueError:
+                    messagebox.showwarning("Error", "La fecha debe tener formato YYYY-MM-DD (ej: 2025-10-04).")
+                    return
+            periodo.append(texto or None)
+
+        self._periodo = tuple(periodo) if any(periodo) else None
+        self._version = None  # al quitar el filtro hay que volver a leer todo
+        self.cargar_facturas()
 
-        facturas = db.get_invoices()
-        for f in facturas:
-            self.tree_facturas.insert("", "end", values=(f["id"], f["cliente"], f["fecha"], f["total"]))
+    def limpiar_filtro(self):
+        self.desde_entry.delete(0, "end")
+        self.hasta_entry.delete(0, "end")
+        self.filtrar_por_fecha()
+
+    @staticmethod
+    def _leer_cambios(version):
+        # corre en el worker: delta desde version, o todas las facturas si no se puede calcular
+        nueva_version, facturas, borradas = db.get_changes_since("factura", version)
+        if facturas is None:
+            return nueva_version, db.get_invoices(), None
+        return nueva_version, facturas, borradas
+
+    def _mostrar_facturas(self, resultado):
+        version, facturas, borradas = resultado
+        if borradas is None:
+            self.facturas.replace(facturas)
+        else:
+            self.facturas.apply(facturas, borradas)
+        self._version = version
 
-        for row in self.tree_detalle.get_children():
-            self.tree_detalle.delete(row)
+        # la selección se conserva; su detalle se relee solo si esa factura cambió
+        selected = self.tree_facturas.selection()
+        if not selected:
+            for row in self.tree_detalle.get_children():
+                self.tree_detalle.delete(row)
+        elif borradas is None or int(selected[0]) in {f["id"] for f in facturas}:
+            self.on_factura_select(None)
 
     def on_factura_select(self, event):
         """Cuando seleccionás una factura, se carga su detalle."""
@@ -79,12 +160,14 @@ class FacturaTab:
             return
         factura_id = self.tree_facturas.item(selected[0])["values"][0]
 
-        detalles = db.get_invoice_details(factura_id)
+        # si se cambia de selección antes de que llegue el detalle, el pedido anterior se descarta
+        self.loader.submit("detalle", lambda: db.get_invoice_details(factura_id), self._mostrar_detalle)
 
+    def _mostrar_detalle(self, detalles):
         for row in self.tree_detalle.get_children():
             self.tree_detalle.delete(row)
 
-        for d in detalles:
+        for d in detalles or []:
             self.tree_detalle.insert("", "end", values=(d["producto"], d["cantidad"], d["precio_unitario"], d["subtotal"]))
 
     # =====================
@@ -132,11 +215,13 @@ class FacturaTab:
 # =============================
 
 class FacturaForm:
+    @ui_profiler.profiled("FacturaForm.__init__")
     def __init__(self, parent, modo="crear", factura_id=None, callback=None):
         self.modo = modo
         self.factura_id = factura_id
         self.callback = callback
         self.items = []  # (id_prod, nombre, cantidad, precio, subtotal)
+        self._reservado = {}  # id_prod -> unidades que ya descontó esta factura (modo editar)
 
         self.top = ctk.CTkToplevel(parent)
         self.top.title("Factura")
@@ -144,7 +229,9 @@ class FacturaForm:
 
         # --- Cliente y fecha ---
         ctk.CTkLabel(self.top, text="Cliente:").pack(pady=5)
-        self.cliente_cb = ctk.CTkComboBox(self.top, values=[c[1] for c in db.get_clients()])
+        with ui_profiler.phase("db"):
+            clientes = db.get_clients()
+        self.cliente_cb = ctk.CTkComboBox(self.top, values=[c[1] for c in clientes])
         self.cliente_cb.pack(pady=5)
 
         ctk.CTkLabel(self.top, text="Fecha (YYYY-MM-DD):").pack(pady=5)
@@ -153,9 +240,11 @@ class FacturaForm:
 
         # --- Sección productos ---
         ctk.CTkLabel(self.top, text="Agregar productos:").pack(pady=(15, 5))
-        productos = db.get_products()
+        with ui_profiler.phase("db"):
+            productos = db.get_products()
         # productos: (id_producto, descripcion, precio, stock, nombre_rubro)
-        self.productos_dict = {p[1]: (p[0], p[3], p[2]) for p in productos}  # nombre -> (id, stock, precio)
+        with ui_profiler.phase("armado"):
+            self.productos_dict = {p[1]: (p[0], p[3], p[2]) for p in productos}  # nombre -> (id, stock, precio)
 
         prod_frame = ctk.CTkFrame(self.top)
         prod_frame.pack(pady=5)
@@ -199,11 +288,8 @@ class FacturaForm:
     # -----------------------
     def cargar_datos_factura(self):
         """Carga cabecera y detalle en modo editar."""
-        factura = db.execute_query(
-            "SELECT f.fecha, c.nombre FROM factura f "
-            "JOIN cliente c ON f.id_cliente = c.id_cliente "
-            "WHERE f.id_factura = ?", (self.factura_id,), fetch="one"
-        )
+        with ui_profiler.phase("db"):
+            factura = db.get_invoice_by_id(self.factura_id)
         if not factura:
             messagebox.showerror("Error", "No se encontró la factura.")
             return
@@ -213,7 +299,8 @@ class FacturaForm:
         self.fecha_entry.insert(0, fecha)
 
         # Cargar detalle desde repository (asegurate de tener get_detalles_por_factura correcto)
-        detalles = db.get_detalles_por_factura(self.factura_id)
+        with ui_profiler.phase("db"):
+            detalles = db.get_detalles_por_factura(self.factura_id)
         for d in detalles:
             # d debe contener: id_producto, producto_nombre, cantidad, precio_unitario
             id_prod = d.get("id_producto")
@@ -222,6 +309,7 @@ class FacturaForm:
             precio_unit = d.get("precio_unitario")
             subtotal = cantidad * precio_unit
             self.items.append((id_prod, nombre, cantidad, precio_unit, subtotal))
+            self._reservado[id_prod] = self._reservado.get(id_prod, 0) + cantidad
             self.tree_items.insert("", "end", values=(nombre, cantidad, f"{precio_unit:.2f}", f"{subtotal:.2f}", "🗑"))
         self.actualizar_total()
 
@@ -240,10 +328,15 @@ class FacturaForm:
             return
 
         cantidad = int(cantidad_str)
-        id_prod, stock, precio = self.productos_dict[nombre]
-
-        if cantidad > stock:
-            messagebox.showwarning("Error", f"No hay stock suficiente ({stock} disponibles).")
+        id_prod, _, precio = self.productos_dict[nombre]
+
+        # aviso temprano con el stock actual (no el del momento en que se abrió el formulario);
+        # la reserva real la hace guardar() de forma atómica
+        producto = db.get_product_by_id(id_prod)
+        stock = producto[3] if producto else 0
+        disponible = stock + self._reservado.get(id_prod, 0) - sum(i[2] for i in self.items if i[0] == id_prod)
+        if cantidad > disponible:
+            messagebox.showwarning("Error", f"No hay stock suficiente ({max(disponible, 0)} disponibles).")
             return
 
         subtotal = precio * cantidad
@@ -265,8 +358,8 @@ class FacturaForm:
         # --- validar fecha ---
         fecha_text = self.fecha_entry.get().strip()
         try:
-            # permite solo YYYY-MM-DD
-            datetime.strptime(fecha_text, "%Y-%m-%d")
+            # permite solo YYYY-MM-DD; se guarda siempre con día y mes de dos dígitos
+            fecha_text = datetime.strptime(fecha_text, "%Y-%m-%d").date().isoformat()
         except Exception:
             messagebox.showwarning("Error", "La fecha debe tener formato YYYY-MM-DD (ej: 2025-10-04).")
             return
@@ -281,54 +374,31 @@ class FacturaForm:
             return
 
         # obtener id_cliente
-        id_cliente_row = db.execute_query(
-            "SELECT id_cliente FROM cliente WHERE nombre = ?", (cliente_nombre,), fetch="one"
-        )
-        if not id_cliente_row:
+        id_cliente = db.get_client_id_by_name(cliente_nombre)
+        if id_cliente is None:
             messagebox.showerror("Error", "Cliente no encontrado.")
             return
-        id_cliente = id_cliente_row[0]
-
-        if self.modo == "editar":
-            factura_id = self.factura_id
-
-            # 1) restaurar stock antiguo (sumar atrás las cantidades antiguas)
-            prev_detalles = db.get_detalles_por_factura(factura_id)  # devuelve id_producto, producto_nombre, cantidad, precio_unitario
-            for pd in prev_detalles:
-                id_prod_prev = pd["id_producto"]
-                cant_prev = pd["cantidad"] or 0
-                # devolver stock (sumar la cantidad anterior)
-                db.execute_query("UPDATE producto SET stock = stock + ? WHERE id_producto = ?", (cant_prev, id_prod_prev), commit=True)
-
-            # 2) actualizar cabecera
-            db.execute_query(
-                "UPDATE factura SET id_cliente = ?, fecha = ? WHERE id_factura = ?",
-                (id_cliente, fecha_text, factura_id),
-                commit=True
-            )
-            # 3) borrar detalles previos (vamos a insertar los nuevos abajo)
-            db.execute_query("DELETE FROM detalle_factura WHERE id_factura = ?", (factura_id,), commit=True)
 
-        else:
-            # crear nueva factura
-            db.execute_query("INSERT INTO factura (id_cliente, fecha) VALUES (?, ?)", (id_cliente, fecha_text), commit=True)
-            factura_row = db.execute_query("SELECT MAX(id_factura) FROM factura", fetch="one")
-            factura_id = factura_row[0]
-
-        # --- insertar nuevos detalles y actualizar stock (restar) ---
-        for id_prod, _, cantidad, precio, _ in self.items:
-            db.execute_query(
-                "INSERT INTO detalle_factura (id_factura, id_producto, cantidad, precio_unitario) VALUES (?, ?, ?, ?)",
-                (factura_id, id_prod, cantidad, precio),
-                commit=True
+        lineas = [(id_prod, cantidad, precio) for id_prod, _, cantidad, precio, _ in self.items]
+        try:
+            if self.modo == "editar":
+                # restaura stock anterior, actualiza cabecera y reemplaza el detalle en una sola transacción
+                db.update_invoice(self.factura_id, id_cliente, fecha_text, lineas)
+            else:
+                db.create_invoice(id_cliente, fecha_text, lineas)
+        except db.StockInsuficiente as e:
+            faltantes = "\n".join(
+                f"• {descripcion}: pedido {pedido}, disponible {disponible}" if descripcion is not None
+                else f"• Producto {id_prod}: ya no existe"
+                for id_prod, descripcion, pedido, disponible in e.faltantes
             )
-            # restar stock
-            db.execute_query("UPDATE producto SET stock = stock - ? WHERE id_producto = ?", (cantidad, id_prod), commit=True)
+            messagebox.showwarning("Stock insuficiente", f"No se guardó la factura. Falta stock de:\n{faltantes}")
+            return
+        except sqlite3.Error as e:
+            messagebox.showerror("Error", f"No se pudo guardar la factura: {e}")
+            return
 
-        # opcional: podrías actualizar un campo 'monto' en tabla factura si lo deseas:
-        total = sum(item[4] for item in self.items)
-        # si querés guardar el total en la tabla factura (si existe columna 'monto'), descomentá:
-        # db.execute_query("UPDATE factura SET monto = ? WHERE id_factura = ?", (total, factura_id), commit=True)
+        # factura.monto lo mantienen los triggers de detalle_factura (migración 003)
 
         messagebox.showinfo("Éxito", "Factura actualizada correctamente." if self.modo == "editar" else "Factura guardada correctamente.")
         self.top.destroy()
@@ -0,0 +1,123 @@
+"""
+Carga de datos en segundo plano para las pestañas de la UI.
+
+Las consultas corren en un pool de hilos (cada hilo usa su propia conexión del pool
+de repository) y los resultados vuelven al hilo de Tk por una cola que se lee con
+after(), así el loop de eventos nunca queda bloqueado esperando a SQLite.
+"""
+import queue
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+from tkinter import TclError
+
+import ui_profiler
+
+
+class BackgroundLoader:
+    """
+    Ejecuta funciones en hilos worker y entrega el resultado en el hilo de Tk.
+
+    Cada pedido tiene una clave: si se pide de nuevo la misma clave antes de que termine
+    el anterior, el anterior se cancela (si no empezó) o su resultado se descarta.
+
+        loader = BackgroundLoader(frame, on_busy=mostrar_spinner)
+        loader.submit("facturas", db.get_invoices, self._mostrar_facturas)
+    """
+    POLL_MS = 16  # ~60 fps mientras hay pedidos pendientes
+
+    def __init__(self, widget, workers=2, on_busy=None):
+        self.widget = widget
+        self.on_busy = on_busy
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="loader")
+        self._results = queue.Queue()
+        self._generations = {}
+        self._pending = {}
+        self._polling = False
+
+    def submit(self, key, fn, on_done, on_error=None):
+        """Programa fn() en un worker; on_done(resultado) se llama luego en el hilo de Tk."""
+        generation = self._generations.get(key, 0) + 1
+        self._generations[key] = generation
+
+        previous = self._pending.get(key)
+        if previous is not None:
+            previous.cancel()
+
+        # con el perfilado activo el pedido se suma a la operación que lo originó (ver ui_profiler)
+        op = ui_profiler.current()
+        future = self._executor.submit(self._run, key, generation, fn, on_done, on_error, op)
+        if op is not None:
+            ui_profiler.attach(future, op)
+        self._pending[key] = future
+        self._notify_busy()
+        self._start_polling()
+
+    def cancel(self, key):
+        """Descarta el pedido pendiente de esa clave (su resultado se ignora si ya está corriendo)."""
+        self._generations[key] = self._generations.get(key, 0) + 1
+        future = self._pending.pop(key, None)
+        if future is not None:
+            future.cancel()
+        self._notify_busy()
+
+    def is_busy(self, key=None):
+        return key in self._pending if key is not None else bool(self._pending)
+
+    def shutdown(self):
+        self._pending.clear()
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    # --- hilo worker ---
+
+    def _run(self, key, generation, fn, on_done, on_error, op=None):
+        try:
+            with ui_profiler.phase("db", op):
+                result = fn()
+        except Exception as e:
+            traceback.print_exc()
+            self._results.put((key, generation, on_error, e, op))
+        else:
+            self._results.put((key, generation, on_done, result, op))
+
+    # --- hilo de Tk ---
+
+    def _start_polling(self):
+        if not self._polling:
+            self._polling = True
+            self._schedule_poll()
+
+    def _schedule_poll(self):
+        try:
+            self.widget.after(self.POLL_MS, self._poll)
+        except TclError:
+            # el widget fue destruido (se cerró la ventana)
+            self._polling = False
+
+    def _poll(self):
+        while True:
+            try:
+                key, generation, callback, value, op = self._results.get_nowait()
+            except queue.Empty:
+                break
+            try:
+                if self._generations.get(key) != generation:
+                    continue  # resultado de un pedido reemplazado por uno más nuevo
+                self._pending.pop(key, None)
+                self._notify_busy()
+                with ui_profiler.resume(op):
+                    if callback is not None:
+                        callback(value)
+                    elif isinstance(value, Exception):
+                        print(f"[LOADER ERROR] {key}: {value}")
+            finally:
+                if op is not None:
+                    op.release()
+
+        if self._pending:
+            self._schedule_poll()
+        else:
+            self._polling = False
+
+    def _notify_busy(self):
+        if self.on_busy is not None:
+            self.on_busy(bool(self._pending))
@@ -1,48 +1,105 @@
 import repository as db
-import ui
 import os
-import pandas as pd
-import json
+from importlib.util import find_spec
 
-def export_all_to_csv():
-    """Exporta todas las tablas de la base de datos a archivos CSV en una carpeta 'export_csv'."""
-    export_dir = "export_csv"
-    os.makedirs(export_dir, exist_ok=True)
+# exporter, columnar y ui (customtkinter, PIL) se importan dentro de cada opción del menú,
+# así el menú aparece sin cargar la interfaz gráfica ni los formatos de exportación.
+
+def _exportar(fmt, compression=None):
+    """Exporta todas las tablas en el formato indicado a la carpeta 'export_<fmt>'."""
+    export_dir = f"export_{fmt}"
+    etiqueta = fmt.upper()
 
     try:
-        tables = db.get_all_data(return_data=True)
-        if not tables or all(df.empty for df in tables.values()):
+        import exporter
+
+        if not db.has_data():
             print("⚠️ No hay datos en la base de datos para exportar.")
             return
 
-        for name, df in tables.items():
-            path = os.path.join(export_dir, f"{name}.csv")
-            df.to_csv(path, index=False, encoding="utf-8-sig")
-            print(f"✅ Exportado: {path}")
+        for name, (path, filas) in exporter.export_all(fmt, export_dir, compression).items():
+            print(f"✅ Exportado: {path} ({filas} filas)")
 
-        print("\n📁 Todos los datos fueron exportados correctamente en formato CSV (carpeta 'export_csv').")
+        print(f"\n📁 Todos los datos fueron exportados correctamente en formato {etiqueta} (carpeta '{export_dir}').")
     except Exception as e:
-        print(f"❌ Error al exportar los datos a CSV: {e}")
+        print(f"❌ Error al exportar los datos a {etiqueta}: {e}")
 
-def export_all_to_json():
+def export_all_to_csv(compression=None):
+    """Exporta todas las tablas de la base de datos a archivos CSV en una carpeta 'export_csv'."""
+    _exportar("csv", compression)
+
+def export_all_to_json(compression=None):
     """Exporta todas las tablas de la base de datos a archivos JSON individuales en una carpeta 'export_json'."""
-    export_dir = "export_json"
-    os.makedirs(export_dir, exist_ok=True)
+    _exportar("json", compression)
+
+def export_all_to_ndjson(compression=None):
+    """Exporta todas las tablas a NDJSON (un registro por línea) en una carpeta 'export_ndjson'."""
+    _exportar("ndjson", compression)
 
+def export_all_to_columnar(fmt="parquet"):
+    """Exporta todas las tablas a archivos Parquet o Arrow tipados y comprimidos en 'export_<fmt>'."""
     try:
-        tables = db.get_all_data(return_data=True)
-        if not tables or all(df.empty for df in tables.values()):
+        import columnar
+
+        if not db.has_data():
             print("⚠️ No hay datos en la base de datos para exportar.")
             return
 
-        for name, df in tables.items():
-            path = os.path.join(export_dir, f"{name}.json")
-            df.to_json(path, orient="records", indent=4, force_ascii=False)
-            print(f"✅ Exportado: {path}")
+        for name, (path, filas) in columnar.export_all(fmt).items():
+            print(f"✅ Exportado: {path} ({filas} filas)")
 
-        print("\n📁 Todos los datos fueron exportados correctamente en formato JSON (carpeta 'export_json').")
+        print(f"\n📁 Todos los datos fueron exportados correctamente en formato {fmt.capitalize()} (carpeta 'export_{fmt}').")
     except Exception as e:
-        print(f"❌ Error al exportar los datos a JSON: {e}")
+        print(f"❌ Error al exportar los datos a {fmt.capitalize()}: {e}")
+
+def import_from_columnar(fmt="parquet"):
+    """Reemplaza los datos de la base con los archivos Parquet o Arrow de 'export_<fmt>'."""
+    try:
+        import columnar
+
+        columnar.import_all(f"export_{fmt}", fmt)
+        print(f"\n✅ Datos {fmt.capitalize()} cargados correctamente.")
+    except Exception as e:
+        print(f"❌ Error al importar los datos desde {fmt.capitalize()}: {e}")
+
+def estadisticas_consultas():
+    """Submenú de estadísticas de consultas: activar/desactivar, ver, exportar a JSON y reiniciar."""
+    import query_stats
+
+    estado = "activas" if query_stats.is_enabled() else "desactivadas"
+    print(f"\n🔍 Estadísticas de consultas ({estado}, umbral lento {query_stats.slow_threshold_ms():g} ms)")
+    print("1️⃣  Activar (o cambiar el umbral de consultas lentas)")
+    print("2️⃣  Desactivar")
+    print("3️⃣  Ver resumen y consultas lentas")
+    print("4️⃣  Exportar a JSON ('query_stats.json')")
+    print("5️⃣  Reiniciar contadores")
+    modo = input("👉 Elige una opción (1 a 5): ").strip()
+
+    if modo == "1":
+        umbral = input(f"👉 Umbral de consulta lenta en ms [{query_stats.slow_threshold_ms():g}]: ").strip()
+        try:
+            umbral = float(umbral) if umbral else None
+        except ValueError:
+            print("❌ Umbral inválido. Volviendo al menú principal...")
+            return
+        registro = input("👉 Archivo para registrar las lentas (vacío = solo en memoria): ").strip()
+        db.enable_query_stats(umbral, registro or None)
+        print("✅ Estadísticas activadas: se registran las consultas de la interfaz y del menú.")
+    elif modo == "2":
+        db.disable_query_stats()
+        print("✅ Estadísticas desactivadas (lo acumulado se conserva hasta reiniciar).")
+    elif modo == "3":
+        query_stats.print_summary()
+    elif modo == "4":
+        try:
+            print(f"📁 Estadísticas exportadas a {query_stats.dump_json('query_stats.json')}")
+        except OSError as e:
+            print(f"❌ Error al exportar las estadísticas: {e}")
+    elif modo == "5":
+        query_stats.reset()
+        print("✅ Contadores reiniciados.")
+    else:
+        print("❌ Opción inválida. Volviendo al menú principal...")
 
 def verificar_base_creada():
     """Verifica si la base de datos existe."""
@@ -51,10 +108,7 @@ def verificar_base_creada():
 def verificar_datos_cargados():
     """Verifica si hay datos en la base."""
     try:
-        tablas = db.get_all_data(return_data=True)
-        if tablas and any(not df.empty for df in tablas.values()):
-            return True
-        return False
+        return db.has_data()
     except Exception:
         return False
 
@@ -68,7 +122,10 @@ def main():
         print("3️⃣  Mostrar todos los datos")
         print("4️⃣  Eliminar base de datos")
         print("5️⃣  Ejecutar interfaz gráfica (UI)")
-        print("6️⃣  Exportar todos los datos (CSV o JSON) 📤")
+        print("6️⃣  Exportar todos los datos (CSV, JSON, NDJSON o Parquet/Arrow; con compresión opcional) 📤")
+        print("7️⃣  Recalcular totales de facturas 🧮")
+        print("8️⃣  Verificar / reconstruir resúmenes de ventas 📈")
+        print("9️⃣  Estadísticas de consultas (tiempos y consultas lentas) 🔍")
         print("0️⃣  Salir")
         print("=" * 60)
 
@@ -83,8 +140,26 @@ def main():
                 if not verificar_base_creada():
                     print("❌ Error: No existe una base de datos. Crea una antes de cargar datos (opción 1).")
                 else:
-                    print("📂 Cargando datos desde CSV...")
-                    db.load_csv_data()
+                    print("\n📂 ¿Cómo querés cargar los datos?")
+                    print("1️⃣  Recarga completa (vacía las tablas y carga todo de nuevo)")
+                    print("2️⃣  Sincronización incremental (solo los cambios, conserva ediciones locales)")
+                    print("3️⃣  Importar desde Parquet/Arrow (carpeta 'export_parquet' o 'export_arrow')")
+                    modo = input("👉 Elige una opción (1, 2 o 3): ").strip()
+
+                    if modo == "1":
+                        print("📂 Cargando datos desde CSV...")
+                        db.load_csv_data()
+                    elif modo == "2":
+                        print("🔁 Sincronizando datos desde CSV...")
+                        db.sync_csv_data()
+                    elif modo == "3":
+                        fmt = input("👉 Formato (parquet/arrow) [parquet]: ").strip().lower() or "parquet"
+                        if fmt not in ("parquet", "arrow"):
+                            print("❌ Formato inválido. Volviendo al menú principal...")
+                        else:
+                            import_from_columnar(fmt)
+                    else:
+                        print("❌ Opción inválida. Volviendo al menú principal...")
 
             case "3":
                 if not verificar_base_creada():
@@ -107,6 +182,7 @@ def main():
                     print("❌ Error: No hay base de datos creada. Crea una antes de ejecutar la interfaz.")
                 else:
                     print("🖥️  Abriendo interfaz gráfica...")
+                    import ui
                     ui.run_ui()
 
             case "6":
@@ -116,15 +192,63 @@ def main():
                     print("\n📤 ¿En qué formato querés exportar los datos?")
                     print("1️⃣  Exportar como CSV (archivos separados en 'export_csv')")
                     print("2️⃣  Exportar como JSON (archivos separados en 'export_json')")
-                    formato = input("👉 Elige una opción (1 o 2): ").strip()
+                    print("3️⃣  Exportar como NDJSON (un registro por línea, en 'export_ndjson')")
+                    print("4️⃣  Exportar como Parquet/Arrow (tipado y comprimido, en 'export_parquet' / 'export_arrow')")
+                    formato = input("👉 Elige una opción (1, 2, 3 o 4): ").strip()
+                    exportar = {"1": export_all_to_csv, "2": export_all_to_json, "3": export_all_to_ndjson}.get(formato)
+
+                    if formato == "4":
+                        fmt = input("👉 Formato (parquet/arrow) [parquet]: ").strip().lower() or "parquet"
+                        if fmt not in ("parquet", "arrow"):
+                            print("❌ Formato inválido. Volviendo al menú principal...")
+                        else:
+                            export_all_to_columnar(fmt)
+                    elif exportar is None:
+                        print("❌ Opción inválida. Volviendo al menú principal...")
+                    else:
+                        # zstd solo si el paquete opcional 'zstandard' está instalado
+                        compresiones = {"0": None, "1": "gzip"}
+                        if find_spec("zstandard"):
+                            compresiones["2"] = "zstd"
+                        print("🗜️  Compresión: 0️⃣  ninguna  1️⃣  gzip" + ("  2️⃣  zstd" if "2" in compresiones else ""))
+                        compresion = input(f"👉 Elige una opción ({', '.join(compresiones)}) [0]: ").strip() or "0"
+                        if compresion not in compresiones:
+                            print("❌ Opción inválida. Volviendo al menú principal...")
+                        else:
+                            exportar(compresiones[compresion])
+
+            case "7":
+                if not verificar_base_creada():
+                    print("❌ Error: No hay base de datos creada. Crea una antes de recalcular totales.")
+                else:
+                    print("🧮 Recalculando totales de facturas...")
+                    db.migrate()
+                    db.reconcile_invoice_totals()
 
-                    if formato == "1":
-                        export_all_to_csv()
-                    elif formato == "2":
-                        export_all_to_json()
+            case "8":
+                if not verificar_base_creada():
+                    print("❌ Error: No hay base de datos creada. Crea una antes de verificar los resúmenes.")
+                else:
+                    db.migrate()
+                    print("\n📈 Resúmenes de ventas:")
+                    print("1️⃣  Verificar contra el detalle de facturas")
+                    print("2️⃣  Reconstruir desde el detalle de facturas")
+                    modo = input("👉 Elige una opción (1 o 2): ").strip()
+                    if modo == "1":
+                        diferencias = db.check_sales_rollup()
+                        if any(diferencias.values()):
+                            print("⚠️ Hay diferencias: usá la opción 2 para reconstruir los resúmenes.")
+                        else:
+                            print("✅ Los resúmenes coinciden con el detalle.")
+                    elif modo == "2":
+                        print("🔧 Reconstruyendo resúmenes de ventas...")
+                        db.rebuild_sales_rollup()
                     else:
                         print("❌ Opción inválida. Volviendo al menú principal...")
 
+            case "9":
+                estadisticas_consultas()
+
             case "0":
                 print("👋 Cerrando el sistema Coral Tech... ¡Hasta luego!")
                 break
@@ -0,0 +1,17 @@
+-- Índices para los JOIN y filtros de repository.py
+
+-- JOIN factura -> cliente (get_invoices, get_all_facturas) y búsquedas por cliente
+CREATE INDEX IF NOT EXISTS idx_factura_cliente ON factura (id_cliente);
+
+-- get_all_facturas ordena por fecha
+CREATE INDEX IF NOT EXISTS idx_factura_fecha ON factura (fecha);
+
+-- detalle por producto (la PK ya cubre id_factura, id_producto)
+CREATE INDEX IF NOT EXISTS idx_detalle_producto ON detalle_factura (id_producto);
+
+-- claves foráneas de los catálogos
+CREATE INDEX IF NOT EXISTS idx_producto_rubro ON producto (id_rubro);
+CREATE INDEX IF NOT EXISTS idx_cliente_provincia ON cliente (id_provincia);
+
+-- FacturaForm.guardar: SELECT id_cliente FROM cliente WHERE nombre = ?
+CREATE INDEX IF NOT EXISTS idx_cliente_nombre ON cliente (nombre);
@@ -0,0 +1,6 @@
+-- Índices de expresión para las búsquedas insensibles a mayúsculas/espacios
+-- (get_rubro_id_by_name, get_provincia_id_by_name). La expresión debe coincidir
+-- exactamente con la usada en la consulta.
+
+CREATE INDEX IF NOT EXISTS idx_rubro_nombre_norm ON rubro (LOWER(TRIM(nombre_rubro)));
+CREATE INDEX IF NOT EXISTS idx_provincia_nombre_norm ON provincia (LOWER(TRIM(nombre_provincia)));
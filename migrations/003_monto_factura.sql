@@ -0,0 +1,38 @@
+-- factura.monto pasa a ser el total mantenido de la factura (SUM(cantidad * precio_unitario)
+-- de sus líneas). Los triggers lo actualizan en cada alta, cambio o baja de detalle_factura,
+-- así los listados leen el total guardado en lugar de agrupar todo el detalle.
+
+-- Backfill de las facturas existentes
+UPDATE factura
+SET monto = (
+    SELECT COALESCE(SUM(df.cantidad * df.precio_unitario), 0)
+    FROM detalle_factura AS df
+    WHERE df.id_factura = factura.id_factura
+);
+
+CREATE TRIGGER IF NOT EXISTS trg_detalle_monto_insert
+AFTER INSERT ON detalle_factura
+BEGIN
+    UPDATE factura
+    SET monto = COALESCE(monto, 0) + NEW.cantidad * NEW.precio_unitario
+    WHERE id_factura = NEW.id_factura;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_detalle_monto_update
+AFTER UPDATE OF id_factura, cantidad, precio_unitario ON detalle_factura
+BEGIN
+    UPDATE factura
+    SET monto = COALESCE(monto, 0) - OLD.cantidad * OLD.precio_unitario
+    WHERE id_factura = OLD.id_factura;
+    UPDATE factura
+    SET monto = COALESCE(monto, 0) + NEW.cantidad * NEW.precio_unitario
+    WHERE id_factura = NEW.id_factura;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_detalle_monto_delete
+AFTER DELETE ON detalle_factura
+BEGIN
+    UPDATE factura
+    SET monto = COALESCE(monto, 0) - OLD.cantidad * OLD.precio_unitario
+    WHERE id_factura = OLD.id_factura;
+END;
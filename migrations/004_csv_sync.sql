@@ -0,0 +1,18 @@
+-- Estado de la sincronización incremental de CSV (csv_loader.sync_csv_files)
+
+-- Huella del archivo CSV aplicado por última vez a cada tabla
+CREATE TABLE IF NOT EXISTS csv_sync_files (
+    tabla TEXT PRIMARY KEY,
+    file_hash TEXT NOT NULL,
+    synced_at TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
+
+-- Huella de cada fila del último CSV aplicado, por clave primaria.
+-- sync_id marca en qué sincronización se vio la fila por última vez.
+CREATE TABLE IF NOT EXISTS csv_sync_rows (
+    tabla TEXT NOT NULL,
+    clave TEXT NOT NULL,
+    row_hash BLOB NOT NULL,
+    sync_id INTEGER NOT NULL,
+    PRIMARY KEY (tabla, clave)
+) WITHOUT ROWID;
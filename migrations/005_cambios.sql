@@ -0,0 +1,116 @@
+-- Registro de cambios por fila para que la UI refresque solo lo que cambió.
+-- Cada alta, modificación o baja de producto, cliente, rubro o factura deja en 'cambios'
+-- una fila (tabla, clave) con una versión nueva; se guarda solo el último cambio de cada clave.
+-- clave NULL significa "la tabla completa cambió" (recarga masiva, ver csv_loader.bulk_replace),
+-- que mientras carga pone una fila en cambios_pausa para no registrar fila por fila.
+
+CREATE TABLE IF NOT EXISTS cambios (
+    version INTEGER PRIMARY KEY AUTOINCREMENT,
+    tabla TEXT NOT NULL,
+    clave INTEGER,
+    borrado INTEGER NOT NULL DEFAULT 0
+);
+
+CREATE UNIQUE INDEX IF NOT EXISTS idx_cambios_tabla_clave ON cambios(tabla, clave);
+-- "qué cambió en esta tabla desde la versión N" recorre solo los cambios nuevos
+CREATE INDEX IF NOT EXISTS idx_cambios_tabla_version ON cambios(tabla, version, borrado, clave);
+
+CREATE TABLE IF NOT EXISTS cambios_pausa (
+    id INTEGER PRIMARY KEY CHECK (id = 1)
+);
+
+CREATE TRIGGER IF NOT EXISTS trg_cambios_producto_insert
+AFTER INSERT ON producto
+WHEN NOT EXISTS (SELECT 1 FROM cambios_pausa)
+BEGIN
+    DELETE FROM cambios WHERE tabla = 'producto' AND clave = NEW.id_producto;
+    INSERT INTO cambios (tabla, clave, borrado) VALUES ('producto', NEW.id_producto, 0);
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_cambios_producto_update
+AFTER UPDATE ON producto
+WHEN NOT EXISTS (SELECT 1 FROM cambios_pausa)
+BEGIN
+    DELETE FROM cambios WHERE tabla = 'producto' AND clave = NEW.id_producto;
+    INSERT INTO cambios (tabla, clave, borrado) VALUES ('producto', NEW.id_producto, 0);
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_cambios_producto_delete
+AFTER DELETE ON producto
+WHEN NOT EXISTS (SELECT 1 FROM cambios_pausa)
+BEGIN
+    DELETE FROM cambios WHERE tabla = 'producto' AND clave = OLD.id_producto;
+    INSERT INTO cambios (tabla, clave, borrado) VALUES ('producto', OLD.id_producto, 1);
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_cambios_cliente_insert
+AFTER INSERT ON cliente
+WHEN NOT EXISTS (SELECT 1 FROM cambios_pausa)
+BEGIN
+    DELETE FROM cambios WHERE tabla = 'cliente' AND clave = NEW.id_cliente;
+    INSERT INTO cambios (tabla, clave, borrado) VALUES ('cliente', NEW.id_cliente, 0);
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_cambios_cliente_update
+AFTER UPDATE ON cliente
+WHEN NOT EXISTS (SELECT 1 FROM cambios_pausa)
+BEGIN
+    DELETE FROM cambios WHERE tabla = 'cliente' AND clave = NEW.id_cliente;
+    INSERT INTO cambios (tabla, clave, borrado) VALUES ('cliente', NEW.id_cliente, 0);
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_cambios_cliente_delete
+AFTER DELETE ON cliente
+WHEN NOT EXISTS (SELECT 1 FROM cambios_pausa)
+BEGIN
+    DELETE FROM cambios WHERE tabla = 'cliente' AND clave = OLD.id_cliente;
+    INSERT INTO cambios (tabla, clave, borrado) VALUES ('cliente', OLD.id_cliente, 1);
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_cambios_rubro_insert
+AFTER INSERT ON rubro
+WHEN NOT EXISTS (SELECT 1 FROM cambios_pausa)
+BEGIN
+    DELETE FROM cambios WHERE tabla = 'rubro' AND clave = NEW.id_rubro;
+    INSERT INTO cambios (tabla, clave, borrado) VALUES ('rubro', NEW.id_rubro, 0);
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_cambios_rubro_update
+AFTER UPDATE ON rubro
+WHEN NOT EXISTS (SELECT 1 FROM cambios_pausa)
+BEGIN
+    DELETE FROM cambios WHERE tabla = 'rubro' AND clave = NEW.id_rubro;
+    INSERT INTO cambios (tabla, clave, borrado) VALUES ('rubro', NEW.id_rubro, 0);
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_cambios_rubro_delete
+AFTER DELETE ON rubro
+WHEN NOT EXISTS (SELECT 1 FROM cambios_pausa)
+BEGIN
+    DELETE FROM cambios WHERE tabla = 'rubro' AND clave = OLD.id_rubro;
+    INSERT INTO cambios (tabla, clave, borrado) VALUES ('rubro', OLD.id_rubro, 1);
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_cambios_factura_insert
+AFTER INSERT ON factura
+WHEN NOT EXISTS (SELECT 1 FROM cambios_pausa)
+BEGIN
+    DELETE FROM cambios WHERE tabla = 'factura' AND clave = NEW.id_factura;
+    INSERT INTO cambios (tabla, clave, borrado) VALUES ('factura', NEW.id_factura, 0);
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_cambios_factura_update
+AFTER UPDATE ON factura
+WHEN NOT EXISTS (SELECT 1 FROM cambios_pausa)
+BEGIN
+    DELETE FROM cambios WHERE tabla = 'factura' AND clave = NEW.id_factura;
+    INSERT INTO cambios (tabla, clave, borrado) VALUES ('factura', NEW.id_factura, 0);
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_cambios_factura_delete
+AFTER DELETE ON factura
+WHEN NOT EXISTS (SELECT 1 FROM cambios_pausa)
+BEGIN
+    DELETE FROM cambios WHERE tabla = 'factura' AND clave = OLD.id_factura;
+    INSERT INTO cambios (tabla, clave, borrado) VALUES ('factura', OLD.id_factura, 1);
+END;
@@ -0,0 +1,75 @@
+-- Búsqueda de texto completo (FTS5) sobre productos y clientes.
+-- Las tablas FTS son de contenido externo: guardan solo el índice y leen el texto de
+-- producto / cliente. unicode61 con remove_diacritics ignora tildes y mayúsculas, y los
+-- índices de prefijo de 2 y 3 letras hacen rápidas las búsquedas "mientras se escribe".
+-- Durante las cargas masivas (cambios_pausa, ver 005) los triggers no corren y
+-- csv_loader.bulk_replace reconstruye los índices al terminar.
+
+CREATE VIRTUAL TABLE IF NOT EXISTS producto_fts USING fts5(
+    descripcion,
+    content = 'producto',
+    content_rowid = 'id_producto',
+    tokenize = 'unicode61 remove_diacritics 2',
+    prefix = '2 3'
+);
+
+CREATE VIRTUAL TABLE IF NOT EXISTS cliente_fts USING fts5(
+    nombre,
+    email,
+    domicilio,
+    content = 'cliente',
+    content_rowid = 'id_cliente',
+    tokenize = 'unicode61 remove_diacritics 2',
+    prefix = '2 3'
+);
+
+INSERT INTO producto_fts (producto_fts) VALUES ('rebuild');
+INSERT INTO cliente_fts (cliente_fts) VALUES ('rebuild');
+
+CREATE TRIGGER IF NOT EXISTS trg_producto_fts_insert
+AFTER INSERT ON producto
+WHEN NOT EXISTS (SELECT 1 FROM cambios_pausa)
+BEGIN
+    INSERT INTO producto_fts (rowid, descripcion) VALUES (NEW.id_producto, NEW.descripcion);
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_producto_fts_update
+AFTER UPDATE OF descripcion ON producto
+WHEN NOT EXISTS (SELECT 1 FROM cambios_pausa)
+BEGIN
+    INSERT INTO producto_fts (producto_fts, rowid, descripcion) VALUES ('delete', OLD.id_producto, OLD.descripcion);
+    INSERT INTO producto_fts (rowid, descripcion) VALUES (NEW.id_producto, NEW.descripcion);
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_producto_fts_delete
+AFTER DELETE ON producto
+WHEN NOT EXISTS (SELECT 1 FROM cambios_pausa)
+BEGIN
+    INSERT INTO producto_fts (producto_fts, rowid, descripcion) VALUES ('delete', OLD.id_producto, OLD.descripcion);
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_cliente_fts_insert
+AFTER INSERT ON cliente
+WHEN NOT EXISTS (SELECT 1 FROM cambios_pausa)
+BEGIN
+    INSERT INTO cliente_fts (rowid, nombre, email, domicilio)
+    VALUES (NEW.id_cliente, NEW.nombre, NEW.email, NEW.domicilio);
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_cliente_fts_update
+AFTER UPDATE OF nombre, email, domicilio ON cliente
+WHEN NOT EXISTS (SELECT 1 FROM cambios_pausa)
+BEGIN
+    INSERT INTO cliente_fts (cliente_fts, rowid, nombre, email, domicilio)
+    VALUES ('delete', OLD.id_cliente, OLD.nombre, OLD.email, OLD.domicilio);
+    INSERT INTO cliente_fts (rowid, nombre, email, domicilio)
+    VALUES (NEW.id_cliente, NEW.nombre, NEW.email, NEW.domicilio);
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_cliente_fts_delete
+AFTER DELETE ON cliente
+WHEN NOT EXISTS (SELECT 1 FROM cambios_pausa)
+BEGIN
+    INSERT INTO cliente_fts (cliente_fts, rowid, nombre, email, domicilio)
+    VALUES ('delete', OLD.id_cliente, OLD.nombre, OLD.email, OLD.domicilio);
+END;
@@ -0,0 +1,18 @@
+-- Índices para ordenar y filtrar los listados paginados de productos y clientes
+-- (get_products_page / get_clients_page con sort y filters). Cada índice incluye
+-- implícitamente el rowid, así que cubre el orden compuesto (columna, id) del keyset.
+
+CREATE INDEX IF NOT EXISTS idx_producto_descripcion ON producto (descripcion);
+CREATE INDEX IF NOT EXISTS idx_producto_precio ON producto (precio);
+CREATE INDEX IF NOT EXISTS idx_producto_stock ON producto (stock);
+
+-- filtro por rubro combinado con cada orden
+CREATE INDEX IF NOT EXISTS idx_producto_rubro_descripcion ON producto (id_rubro, descripcion);
+CREATE INDEX IF NOT EXISTS idx_producto_rubro_precio ON producto (id_rubro, precio);
+CREATE INDEX IF NOT EXISTS idx_producto_rubro_stock ON producto (id_rubro, stock);
+
+CREATE INDEX IF NOT EXISTS idx_cliente_email ON cliente (email);
+
+-- filtro por provincia combinado con cada orden
+CREATE INDEX IF NOT EXISTS idx_cliente_provincia_nombre ON cliente (id_provincia, nombre);
+CREATE INDEX IF NOT EXISTS idx_cliente_provincia_email ON cliente (id_provincia, email);
@@ -0,0 +1,6 @@
+-- Índice cubriente para las agregaciones de analytics.py (ventas por producto y rubro):
+-- SUM(cantidad) y SUM(cantidad * precio_unitario) agrupados por producto se resuelven
+-- leyendo solo el índice, ya ordenado por id_producto, sin tocar la tabla ni ordenar aparte.
+-- Reemplaza a idx_detalle_producto, que queda cubierto por su prefijo.
+CREATE INDEX IF NOT EXISTS idx_detalle_producto_ventas ON detalle_factura (id_producto, cantidad, precio_unitario);
+DROP INDEX IF EXISTS idx_detalle_producto;
@@ -0,0 +1,282 @@
+-- Resúmenes de ventas diarios mantenidos por triggers, para que el dashboard y los
+-- reportes lean unos miles de filas ya agregadas en lugar del detalle completo.
+--
+--   venta_diaria        día × producto × provincia del cliente × sucursal (+ rubro del producto)
+--   venta_diaria_rubro  día × rubro × provincia × sucursal, derivado de venta_diaria
+--
+-- Cada alta, cambio o baja de detalle_factura (y los cambios de fecha/cliente/sucursal de
+-- la factura, de provincia del cliente o de rubro del producto) ajusta las filas afectadas
+-- dentro de la misma sentencia, así que los resúmenes nunca quedan a medias.
+-- 'lineas' cuenta las líneas de detalle de cada fila: cuando llega a 0 la fila se borra.
+-- Factura sin fecha, sucursal o cliente se resume con '' / 0 como clave.
+-- Durante las cargas masivas (cambios_pausa, ver 005) los triggers no corren y
+-- csv_loader.bulk_replace reconstruye los resúmenes al terminar (repository.rebuild_sales_rollup).
+
+CREATE TABLE IF NOT EXISTS venta_diaria (
+    fecha TEXT NOT NULL,
+    id_producto INTEGER NOT NULL,
+    id_provincia INTEGER NOT NULL,
+    id_sucursal INTEGER NOT NULL,
+    id_rubro INTEGER NOT NULL,
+    unidades INTEGER NOT NULL,
+    importe REAL NOT NULL,
+    lineas INTEGER NOT NULL,
+    PRIMARY KEY (fecha, id_producto, id_provincia, id_sucursal)
+) WITHOUT ROWID;
+
+-- cambio de rubro de un producto
+CREATE INDEX IF NOT EXISTS idx_venta_diaria_producto ON venta_diaria (id_producto);
+
+CREATE TABLE IF NOT EXISTS venta_diaria_rubro (
+    fecha TEXT NOT NULL,
+    id_rubro INTEGER NOT NULL,
+    id_provincia INTEGER NOT NULL,
+    id_sucursal INTEGER NOT NULL,
+    unidades INTEGER NOT NULL,
+    importe REAL NOT NULL,
+    lineas INTEGER NOT NULL,
+    PRIMARY KEY (fecha, id_rubro, id_provincia, id_sucursal)
+) WITHOUT ROWID;
+
+-- Clave de resumen de cada factura (día, provincia del cliente, sucursal)
+CREATE VIEW IF NOT EXISTS venta_clave AS
+SELECT f.id_factura,
+       COALESCE(f.fecha, '') AS fecha,
+       COALESCE(c.id_provincia, 0) AS id_provincia,
+       COALESCE(f.id_sucursal, 0) AS id_sucursal
+FROM factura AS f
+LEFT JOIN cliente AS c ON c.id_cliente = f.id_cliente;
+
+-- Carga inicial desde el detalle existente (las filas de rubro las agregan los triggers de abajo
+-- recién en las próximas escrituras, así que se calculan aparte)
+INSERT INTO venta_diaria (fecha, id_producto, id_provincia, id_sucursal, id_rubro, unidades, importe, lineas)
+SELECT k.fecha, df.id_producto, k.id_provincia, k.id_sucursal, COALESCE(p.id_rubro, 0),
+       SUM(df.cantidad), SUM(df.cantidad * df.precio_unitario), COUNT(*)
+FROM detalle_factura AS df
+JOIN venta_clave AS k ON k.id_factura = df.id_factura
+LEFT JOIN producto AS p ON p.id_producto = df.id_producto
+GROUP BY k.fecha, df.id_producto, k.id_provincia, k.id_sucursal;
+
+INSERT INTO venta_diaria_rubro (fecha, id_rubro, id_provincia, id_sucursal, unidades, importe, lineas)
+SELECT fecha, id_rubro, id_provincia, id_sucursal, SUM(unidades), SUM(importe), SUM(lineas)
+FROM venta_diaria
+GROUP BY fecha, id_rubro, id_provincia, id_sucursal;
+
+-- --------------------------------------------------------
+-- detalle_factura -> venta_diaria
+
+CREATE TRIGGER IF NOT EXISTS trg_venta_detalle_insert
+AFTER INSERT ON detalle_factura
+WHEN NOT EXISTS (SELECT 1 FROM cambios_pausa)
+BEGIN
+    INSERT INTO venta_diaria (fecha, id_producto, id_provincia, id_sucursal, id_rubro, unidades, importe, lineas)
+    SELECT k.fecha, NEW.id_producto, k.id_provincia, k.id_sucursal,
+           COALESCE((SELECT id_rubro FROM producto WHERE id_producto = NEW.id_producto), 0),
+           NEW.cantidad, NEW.cantidad * NEW.precio_unitario, 1
+    FROM venta_clave AS k
+    WHERE k.id_factura = NEW.id_factura
+    ON CONFLICT (fecha, id_producto, id_provincia, id_sucursal) DO UPDATE SET
+        unidades = unidades + excluded.unidades,
+        importe = importe + excluded.importe,
+        lineas = lineas + 1;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_venta_detalle_delete
+AFTER DELETE ON detalle_factura
+WHEN NOT EXISTS (SELECT 1 FROM cambios_pausa)
+BEGIN
+    UPDATE venta_diaria
+    SET unidades = unidades - OLD.cantidad,
+        importe = importe - OLD.cantidad * OLD.precio_unitario,
+        lineas = lineas - 1
+    FROM venta_clave AS k
+    WHERE k.id_factura = OLD.id_factura
+      AND venta_diaria.fecha = k.fecha
+      AND venta_diaria.id_producto = OLD.id_producto
+      AND venta_diaria.id_provincia = k.id_provincia
+      AND venta_diaria.id_sucursal = k.id_sucursal;
+    DELETE FROM venta_diaria
+    WHERE fecha = (SELECT fecha FROM venta_clave WHERE id_factura = OLD.id_factura)
+      AND id_producto = OLD.id_producto
+      AND lineas <= 0;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_venta_detalle_update
+AFTER UPDATE OF id_factura, id_producto, cantidad, precio_unitario ON detalle_factura
+WHEN NOT EXISTS (SELECT 1 FROM cambios_pausa)
+BEGIN
+    UPDATE venta_diaria
+    SET unidades = unidades - OLD.cantidad,
+        importe = importe - OLD.cantidad * OLD.precio_unitario,
+        lineas = lineas - 1
+    FROM venta_clave AS k
+    WHERE k.id_factura = OLD.id_factura
+      AND venta_diaria.fecha = k.fecha
+      AND venta_diaria.id_producto = OLD.id_producto
+      AND venta_diaria.id_provincia = k.id_provincia
+      AND venta_diaria.id_sucursal = k.id_sucursal;
+    DELETE FROM venta_diaria
+    WHERE fecha = (SELECT fecha FROM venta_clave WHERE id_factura = OLD.id_factura)
+      AND id_producto = OLD.id_producto
+      AND lineas <= 0;
+    INSERT INTO venta_diaria (fecha, id_producto, id_provincia, id_sucursal, id_rubro, unidades, importe, lineas)
+    SELECT k.fecha, NEW.id_producto, k.id_provincia, k.id_sucursal,
+           COALESCE((SELECT id_rubro FROM producto WHERE id_producto = NEW.id_producto), 0),
+           NEW.cantidad, NEW.cantidad * NEW.precio_unitario, 1
+    FROM venta_clave AS k
+    WHERE k.id_factura = NEW.id_factura
+    ON CONFLICT (fecha, id_producto, id_provincia, id_sucursal) DO UPDATE SET
+        unidades = unidades + excluded.unidades,
+        importe = importe + excluded.importe,
+        lineas = lineas + 1;
+END;
+
+-- --------------------------------------------------------
+-- factura: al cambiar día, sucursal o cliente sus líneas pasan a otra clave;
+-- al borrarla se descuentan las líneas que todavía tenga
+
+CREATE TRIGGER IF NOT EXISTS trg_venta_factura_update
+AFTER UPDATE OF fecha, id_sucursal, id_cliente ON factura
+WHEN NOT EXISTS (SELECT 1 FROM cambios_pausa)
+BEGIN
+    UPDATE venta_diaria
+    SET unidades = unidades - df.cantidad,
+        importe = importe - df.cantidad * df.precio_unitario,
+        lineas = lineas - 1
+    FROM detalle_factura AS df
+    WHERE df.id_factura = OLD.id_factura
+      AND venta_diaria.fecha = COALESCE(OLD.fecha, '')
+      AND venta_diaria.id_producto = df.id_producto
+      AND venta_diaria.id_provincia = COALESCE((SELECT id_provincia FROM cliente WHERE id_cliente = OLD.id_cliente), 0)
+      AND venta_diaria.id_sucursal = COALESCE(OLD.id_sucursal, 0);
+    DELETE FROM venta_diaria WHERE fecha = COALESCE(OLD.fecha, '') AND lineas <= 0;
+    INSERT INTO venta_diaria (fecha, id_producto, id_provincia, id_sucursal, id_rubro, unidades, importe, lineas)
+    SELECT k.fecha, df.id_producto, k.id_provincia, k.id_sucursal, COALESCE(p.id_rubro, 0),
+           df.cantidad, df.cantidad * df.precio_unitario, 1
+    FROM venta_clave AS k
+    JOIN detalle_factura AS df ON df.id_factura = k.id_factura
+    LEFT JOIN producto AS p ON p.id_producto = df.id_producto
+    WHERE k.id_factura = NEW.id_factura
+    ON CONFLICT (fecha, id_producto, id_provincia, id_sucursal) DO UPDATE SET
+        unidades = unidades + excluded.unidades,
+        importe = importe + excluded.importe,
+        lineas = lineas + 1;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_venta_factura_delete
+AFTER DELETE ON factura
+WHEN NOT EXISTS (SELECT 1 FROM cambios_pausa)
+BEGIN
+    UPDATE venta_diaria
+    SET unidades = unidades - df.cantidad,
+        importe = importe - df.cantidad * df.precio_unitario,
+        lineas = lineas - 1
+    FROM detalle_factura AS df
+    WHERE df.id_factura = OLD.id_factura
+      AND venta_diaria.fecha = COALESCE(OLD.fecha, '')
+      AND venta_diaria.id_producto = df.id_producto
+      AND venta_diaria.id_provincia = COALESCE((SELECT id_provincia FROM cliente WHERE id_cliente = OLD.id_cliente), 0)
+      AND venta_diaria.id_sucursal = COALESCE(OLD.id_sucursal, 0);
+    DELETE FROM venta_diaria WHERE fecha = COALESCE(OLD.fecha, '') AND lineas <= 0;
+END;
+
+-- --------------------------------------------------------
+-- cliente que cambia de provincia: todas sus ventas pasan a la provincia nueva
+
+CREATE TRIGGER IF NOT EXISTS trg_venta_cliente_provincia
+AFTER UPDATE OF id_provincia ON cliente
+WHEN NOT EXISTS (SELECT 1 FROM cambios_pausa) AND OLD.id_provincia IS NOT NEW.id_provincia
+BEGIN
+    UPDATE venta_diaria
+    SET unidades = venta_diaria.unidades - m.unidades,
+        importe = venta_diaria.importe - m.importe,
+        lineas = venta_diaria.lineas - m.lineas
+    FROM (
+        SELECT COALESCE(f.fecha, '') AS fecha, df.id_producto, COALESCE(f.id_sucursal, 0) AS id_sucursal,
+               SUM(df.cantidad) AS unidades, SUM(df.cantidad * df.precio_unitario) AS importe, COUNT(*) AS lineas
+        FROM factura AS f
+        JOIN detalle_factura AS df ON df.id_factura = f.id_factura
+        WHERE f.id_cliente = OLD.id_cliente
+        GROUP BY 1, 2, 3
+    ) AS m
+    WHERE venta_diaria.fecha = m.fecha
+      AND venta_diaria.id_producto = m.id_producto
+      AND venta_diaria.id_provincia = COALESCE(OLD.id_provincia, 0)
+      AND venta_diaria.id_sucursal = m.id_sucursal;
+    DELETE FROM venta_diaria
+    WHERE fecha IN (SELECT COALESCE(fecha, '') FROM factura WHERE id_cliente = OLD.id_cliente)
+      AND lineas <= 0;
+    INSERT INTO venta_diaria (fecha, id_producto, id_provincia, id_sucursal, id_rubro, unidades, importe, lineas)
+    SELECT COALESCE(f.fecha, ''), df.id_producto, COALESCE(NEW.id_provincia, 0), COALESCE(f.id_sucursal, 0),
+           COALESCE(p.id_rubro, 0), SUM(df.cantidad), SUM(df.cantidad * df.precio_unitario), COUNT(*)
+    FROM factura AS f
+    JOIN detalle_factura AS df ON df.id_factura = f.id_factura
+    LEFT JOIN producto AS p ON p.id_producto = df.id_producto
+    WHERE f.id_cliente = NEW.id_cliente
+    GROUP BY 1, 2, 4
+    ON CONFLICT (fecha, id_producto, id_provincia, id_sucursal) DO UPDATE SET
+        unidades = unidades + excluded.unidades,
+        importe = importe + excluded.importe,
+        lineas = lineas + excluded.lineas;
+END;
+
+-- producto que cambia de rubro (el UPDATE de venta_diaria mueve también venta_diaria_rubro)
+CREATE TRIGGER IF NOT EXISTS trg_venta_producto_rubro
+AFTER UPDATE OF id_rubro ON producto
+WHEN NOT EXISTS (SELECT 1 FROM cambios_pausa) AND OLD.id_rubro IS NOT NEW.id_rubro
+BEGIN
+    UPDATE venta_diaria SET id_rubro = COALESCE(NEW.id_rubro, 0) WHERE id_producto = NEW.id_producto;
+END;
+
+-- --------------------------------------------------------
+-- venta_diaria -> venta_diaria_rubro (resta la fila vieja y suma la nueva)
+
+CREATE TRIGGER IF NOT EXISTS trg_venta_rubro_insert
+AFTER INSERT ON venta_diaria
+WHEN NOT EXISTS (SELECT 1 FROM cambios_pausa)
+BEGIN
+    INSERT INTO venta_diaria_rubro (fecha, id_rubro, id_provincia, id_sucursal, unidades, importe, lineas)
+    VALUES (NEW.fecha, NEW.id_rubro, NEW.id_provincia, NEW.id_sucursal, NEW.unidades, NEW.importe, NEW.lineas)
+    ON CONFLICT (fecha, id_rubro, id_provincia, id_sucursal) DO UPDATE SET
+        unidades = unidades + excluded.unidades,
+        importe = importe + excluded.importe,
+        lineas = lineas + excluded.lineas;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_venta_rubro_update
+AFTER UPDATE ON venta_diaria
+WHEN NOT EXISTS (SELECT 1 FROM cambios_pausa)
+BEGIN
+    UPDATE venta_diaria_rubro
+    SET unidades = unidades - OLD.unidades,
+        importe = importe - OLD.importe,
+        lineas = lineas - OLD.lineas
+    WHERE fecha = OLD.fecha AND id_rubro = OLD.id_rubro
+      AND id_provincia = OLD.id_provincia AND id_sucursal = OLD.id_sucursal;
+    INSERT INTO venta_diaria_rubro (fecha, id_rubro, id_provincia, id_sucursal, unidades, importe, lineas)
+    VALUES (NEW.fecha, NEW.id_rubro, NEW.id_provincia, NEW.id_sucursal, NEW.unidades, NEW.importe, NEW.lineas)
+    ON CONFLICT (fecha, id_rubro, id_provincia, id_sucursal) DO UPDATE SET
+        unidades = unidades + excluded.unidades,
+        importe = importe + excluded.importe,
+        lineas = lineas + excluded.lineas;
+    DELETE FROM venta_diaria_rubro
+    WHERE fecha = OLD.fecha AND id_rubro = OLD.id_rubro
+      AND id_provincia = OLD.id_provincia AND id_sucursal = OLD.id_sucursal
+      AND lineas <= 0;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_venta_rubro_delete
+AFTER DELETE ON venta_diaria
+WHEN NOT EXISTS (SELECT 1 FROM cambios_pausa)
+BEGIN
+    UPDATE venta_diaria_rubro
+    SET unidades = unidades - OLD.unidades,
+        importe = importe - OLD.importe,
+        lineas = lineas - OLD.lineas
+    WHERE fecha = OLD.fecha AND id_rubro = OLD.id_rubro
+      AND id_provincia = OLD.id_provincia AND id_sucursal = OLD.id_sucursal;
+    DELETE FROM venta_diaria_rubro
+    WHERE fecha = OLD.fecha AND id_rubro = OLD.id_rubro
+      AND id_provincia = OLD.id_provincia AND id_sucursal = OLD.id_sucursal
+      AND lineas <= 0;
+END;
@@ -0,0 +1,21 @@
+-- Fecha de factura normalizada como entero AAAAMMDD (20250104) para filtrar por rango con índice.
+-- factura.fecha sigue siendo el texto original; fecha_dia es una columna generada, así que la
+-- calcula SQLite en cada alta o cambio (formulario, CSV, Parquet, sincronización) sin triggers.
+-- Se reconocen AAAA-MM-DD y AAAA/MM/DD (con o sin hora), DD/MM/AAAA y DD-MM-AAAA, y AAAAMMDD;
+-- cualquier otro formato queda en NULL. Al ser VIRTUAL no ocupa lugar en la tabla: el valor se
+-- guarda solo en el índice. PRAGMA table_info no la lista, así que exportaciones e importaciones
+-- la ignoran.
+
+ALTER TABLE factura ADD COLUMN fecha_dia INTEGER GENERATED ALWAYS AS (
+    CASE
+        WHEN trim(fecha) GLOB '[0-9][0-9][0-9][0-9][-/][0-9][0-9][-/][0-9][0-9]*'
+            THEN CAST(substr(trim(fecha), 1, 4) || substr(trim(fecha), 6, 2) || substr(trim(fecha), 9, 2) AS INTEGER)
+        WHEN trim(fecha) GLOB '[0-9][0-9][-/][0-9][0-9][-/][0-9][0-9][0-9][0-9]*'
+            THEN CAST(substr(trim(fecha), 7, 4) || substr(trim(fecha), 4, 2) || substr(trim(fecha), 1, 2) AS INTEGER)
+        WHEN trim(fecha) GLOB '[0-9][0-9][0-9][0-9][0-9][0-9][0-9][0-9]'
+            THEN CAST(trim(fecha) AS INTEGER)
+    END
+) VIRTUAL;
+
+-- get_invoices(date_from, date_to): rangos por día / mes / año
+CREATE INDEX IF NOT EXISTS idx_factura_fecha_dia ON factura (fecha_dia);
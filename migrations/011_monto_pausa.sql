@@ -0,0 +1,37 @@
+-- Los triggers de factura.monto (003) pasan a respetar cambios_pausa, como los de 005, 006 y 009.
+-- Durante las cargas masivas (csv_loader.bulk_replace) el monto llega ya calculado en la
+-- propia factura: sumar cada línea encima lo duplicaba hasta la reconciliación posterior.
+
+DROP TRIGGER IF EXISTS trg_detalle_monto_insert;
+DROP TRIGGER IF EXISTS trg_detalle_monto_update;
+DROP TRIGGER IF EXISTS trg_detalle_monto_delete;
+
+CREATE TRIGGER trg_detalle_monto_insert
+AFTER INSERT ON detalle_factura
+WHEN NOT EXISTS (SELECT 1 FROM cambios_pausa)
+BEGIN
+    UPDATE factura
+    SET monto = COALESCE(monto, 0) + NEW.cantidad * NEW.precio_unitario
+    WHERE id_factura = NEW.id_factura;
+END;
+
+CREATE TRIGGER trg_detalle_monto_update
+AFTER UPDATE OF id_factura, cantidad, precio_unitario ON detalle_factura
+WHEN NOT EXISTS (SELECT 1 FROM cambios_pausa)
+BEGIN
+    UPDATE factura
+    SET monto = COALESCE(monto, 0) - OLD.cantidad * OLD.precio_unitario
+    WHERE id_factura = OLD.id_factura;
+    UPDATE factura
+    SET monto = COALESCE(monto, 0) + NEW.cantidad * NEW.precio_unitario
+    WHERE id_factura = NEW.id_factura;
+END;
+
+CREATE TRIGGER trg_detalle_monto_delete
+AFTER DELETE ON detalle_factura
+WHEN NOT EXISTS (SELECT 1 FROM cambios_pausa)
+BEGIN
+    UPDATE factura
+    SET monto = COALESCE(monto, 0) - OLD.cantidad * OLD.precio_unitario
+    WHERE id_factura = OLD.id_factura;
+END;
@@ -0,0 +1,6 @@
+-- Las búsquedas por nombre de rubro y provincia se resuelven desde el cache de referencia
+-- en memoria (repository._lookup_id), así que los índices de expresión de 002 ya no los usa
+-- ninguna consulta y solo agregan trabajo a cada alta o cambio de esas tablas.
+
+DROP INDEX IF EXISTS idx_rubro_nombre_norm;
+DROP INDEX IF EXISTS idx_provincia_nombre_norm;
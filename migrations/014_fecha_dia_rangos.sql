@@ -0,0 +1,247 @@
+-- factura.fecha_dia (010) se vuelve a crear para controlar rangos: con mes fuera de 1..12 o día
+-- fuera de 1..31 queda en NULL ('2025-13-45' ya no da 20251345). Combinaciones imposibles con
+-- números en rango, como 31/02, siguen teniendo valor (20250231): la columna no es un calendario.
+-- Las fechas que la aplicación guarda ya llegan como 'YYYY-MM-DD' (repository._fecha_iso, en el
+-- formulario, create/update_invoice, CSV, sincronización y Parquet); las guardadas antes con día o
+-- mes de un dígito ('4/1/2025', '2025-1-4'), que fecha_dia no reconocía, se normalizan acá.
+--
+-- SQLite no deja borrar una columna que usan la vista venta_clave y los triggers de 013, así que
+-- se bajan, se reemplaza la columna y se vuelven a crear iguales; al final se recalculan los
+-- resúmenes de ventas, porque las facturas normalizadas cambian de día (antes dia = 0).
+
+DROP TRIGGER IF EXISTS trg_venta_detalle_insert;
+DROP TRIGGER IF EXISTS trg_venta_detalle_delete;
+DROP TRIGGER IF EXISTS trg_venta_detalle_update;
+DROP TRIGGER IF EXISTS trg_venta_factura_update;
+DROP TRIGGER IF EXISTS trg_venta_factura_delete;
+DROP TRIGGER IF EXISTS trg_venta_cliente_provincia;
+DROP VIEW IF EXISTS venta_clave;
+DROP INDEX IF EXISTS idx_factura_fecha_dia;
+ALTER TABLE factura DROP COLUMN fecha_dia;
+
+-- Fechas a 'YYYY-MM-DD' (más la hora, si la tienen): se separa la fecha de la hora, se
+-- completan con 0 los números de un dígito ('-4-' -> '-04-'; con los separadores duplicados
+-- para que dos números seguidos no compartan el guion) y se reordena DD-MM-AAAA y AAAAMMDD.
+UPDATE factura
+SET fecha = n.iso || n.resto
+FROM (
+    SELECT id_factura, resto,
+           CASE
+               WHEN p GLOB '[0-9][0-9][0-9][0-9]-[0-9][0-9]-[0-9][0-9]' THEN p
+               WHEN p GLOB '[0-9][0-9]-[0-9][0-9]-[0-9][0-9][0-9][0-9]'
+                   THEN substr(p, 7, 4) || '-' || substr(p, 4, 2) || '-' || substr(p, 1, 2)
+               WHEN p GLOB '[0-9][0-9][0-9][0-9][0-9][0-9][0-9][0-9]'
+                   THEN substr(p, 1, 4) || '-' || substr(p, 5, 2) || '-' || substr(p, 7, 2)
+           END AS iso
+    FROM (
+        SELECT id_factura, resto,
+               trim(replace(replace(replace(replace(replace(replace(replace(replace(replace(replace(replace('-' || replace(replace(texto, '/', '-'), '-', '--') || '-', '-0-', '-00-'), '-1-', '-01-'), '-2-', '-02-'), '-3-', '-03-'), '-4-', '-04-'), '-5-', '-05-'), '-6-', '-06-'), '-7-', '-07-'), '-8-', '-08-'), '-9-', '-09-'), '--', '-'), '-') AS p
+        FROM (
+            SELECT id_factura,
+                   substr(trim(fecha), 1, instr(replace(trim(fecha), 'T', ' ') || ' ', ' ') - 1) AS texto,
+                   substr(trim(fecha), instr(replace(trim(fecha), 'T', ' ') || ' ', ' ')) AS resto
+            FROM factura
+            WHERE trim(fecha) <> ''
+        )
+    )
+) AS n
+WHERE factura.id_factura = n.id_factura
+  AND CAST(substr(n.iso, 6, 2) AS INTEGER) BETWEEN 1 AND 12
+  AND CAST(substr(n.iso, 9, 2) AS INTEGER) BETWEEN 1 AND 31
+  AND factura.fecha IS NOT n.iso || n.resto;
+
+ALTER TABLE factura ADD COLUMN fecha_dia INTEGER GENERATED ALWAYS AS (
+    CASE
+        WHEN trim(fecha) GLOB '[0-9][0-9][0-9][0-9][-/][0-9][0-9][-/][0-9][0-9]*'
+             AND CAST(substr(trim(fecha), 6, 2) AS INTEGER) BETWEEN 1 AND 12
+             AND CAST(substr(trim(fecha), 9, 2) AS INTEGER) BETWEEN 1 AND 31
+            THEN CAST(substr(trim(fecha), 1, 4) || substr(trim(fecha), 6, 2) || substr(trim(fecha), 9, 2) AS INTEGER)
+        WHEN trim(fecha) GLOB '[0-9][0-9][-/][0-9][0-9][-/][0-9][0-9][0-9][0-9]*'
+             AND CAST(substr(trim(fecha), 4, 2) AS INTEGER) BETWEEN 1 AND 12
+             AND CAST(substr(trim(fecha), 1, 2) AS INTEGER) BETWEEN 1 AND 31
+            THEN CAST(substr(trim(fecha), 7, 4) || substr(trim(fecha), 4, 2) || substr(trim(fecha), 1, 2) AS INTEGER)
+        WHEN trim(fecha) GLOB '[0-9][0-9][0-9][0-9][0-9][0-9][0-9][0-9]'
+             AND CAST(substr(trim(fecha), 5, 2) AS INTEGER) BETWEEN 1 AND 12
+             AND CAST(substr(trim(fecha), 7, 2) AS INTEGER) BETWEEN 1 AND 31
+            THEN CAST(trim(fecha) AS INTEGER)
+    END
+) VIRTUAL;
+
+CREATE INDEX idx_factura_fecha_dia ON factura (fecha_dia);
+
+-- Vista y triggers de 013, sin cambios
+CREATE VIEW venta_clave AS
+SELECT f.id_factura,
+       COALESCE(f.fecha_dia, 0) AS dia,
+       COALESCE(c.id_provincia, 0) AS id_provincia,
+       COALESCE(f.id_sucursal, 0) AS id_sucursal
+FROM factura AS f
+LEFT JOIN cliente AS c ON c.id_cliente = f.id_cliente;
+
+CREATE TRIGGER trg_venta_detalle_insert
+AFTER INSERT ON detalle_factura
+WHEN NOT EXISTS (SELECT 1 FROM cambios_pausa)
+BEGIN
+    INSERT INTO venta_diaria (dia, id_producto, id_provincia, id_sucursal, id_rubro, unidades, importe, lineas)
+    SELECT k.dia, NEW.id_producto, k.id_provincia, k.id_sucursal,
+           COALESCE((SELECT id_rubro FROM producto WHERE id_producto = NEW.id_producto), 0),
+           NEW.cantidad, NEW.cantidad * NEW.precio_unitario, 1
+    FROM venta_clave AS k
+    WHERE k.id_factura = NEW.id_factura
+    ON CONFLICT (dia, id_producto, id_provincia, id_sucursal) DO UPDATE SET
+        unidades = unidades + excluded.unidades,
+        importe = importe + excluded.importe,
+        lineas = lineas + 1;
+END;
+
+CREATE TRIGGER trg_venta_detalle_delete
+AFTER DELETE ON detalle_factura
+WHEN NOT EXISTS (SELECT 1 FROM cambios_pausa)
+BEGIN
+    UPDATE venta_diaria
+    SET unidades = unidades - OLD.cantidad,
+        importe = importe - OLD.cantidad * OLD.precio_unitario,
+        lineas = lineas - 1
+    FROM venta_clave AS k
+    WHERE k.id_factura = OLD.id_factura
+      AND venta_diaria.dia = k.dia
+      AND venta_diaria.id_producto = OLD.id_producto
+      AND venta_diaria.id_provincia = k.id_provincia
+      AND venta_diaria.id_sucursal = k.id_sucursal;
+    DELETE FROM venta_diaria
+    WHERE dia = (SELECT dia FROM venta_clave WHERE id_factura = OLD.id_factura)
+      AND id_producto = OLD.id_producto
+      AND lineas <= 0;
+END;
+
+CREATE TRIGGER trg_venta_detalle_update
+AFTER UPDATE OF id_factura, id_producto, cantidad, precio_unitario ON detalle_factura
+WHEN NOT EXISTS (SELECT 1 FROM cambios_pausa)
+BEGIN
+    UPDATE venta_diaria
+    SET unidades = unidades - OLD.cantidad,
+        importe = importe - OLD.cantidad * OLD.precio_unitario,
+        lineas = lineas - 1
+    FROM venta_clave AS k
+    WHERE k.id_factura = OLD.id_factura
+      AND venta_diaria.dia = k.dia
+      AND venta_diaria.id_producto = OLD.id_producto
+      AND venta_diaria.id_provincia = k.id_provincia
+      AND venta_diaria.id_sucursal = k.id_sucursal;
+    DELETE FROM venta_diaria
+    WHERE dia = (SELECT dia FROM venta_clave WHERE id_factura = OLD.id_factura)
+      AND id_producto = OLD.id_producto
+      AND lineas <= 0;
+    INSERT INTO venta_diaria (dia, id_producto, id_provincia, id_sucursal, id_rubro, unidades, importe, lineas)
+    SELECT k.dia, NEW.id_producto, k.id_provincia, k.id_sucursal,
+           COALESCE((SELECT id_rubro FROM producto WHERE id_producto = NEW.id_producto), 0),
+           NEW.cantidad, NEW.cantidad * NEW.precio_unitario, 1
+    FROM venta_clave AS k
+    WHERE k.id_factura = NEW.id_factura
+    ON CONFLICT (dia, id_producto, id_provincia, id_sucursal) DO UPDATE SET
+        unidades = unidades + excluded.unidades,
+        importe = importe + excluded.importe,
+        lineas = lineas + 1;
+END;
+
+CREATE TRIGGER trg_venta_factura_update
+AFTER UPDATE OF fecha, id_sucursal, id_cliente ON factura
+WHEN NOT EXISTS (SELECT 1 FROM cambios_pausa)
+BEGIN
+    UPDATE venta_diaria
+    SET unidades = unidades - df.cantidad,
+        importe = importe - df.cantidad * df.precio_unitario,
+        lineas = lineas - 1
+    FROM detalle_factura AS df
+    WHERE df.id_factura = OLD.id_factura
+      AND venta_diaria.dia = COALESCE(OLD.fecha_dia, 0)
+      AND venta_diaria.id_producto = df.id_producto
+      AND venta_diaria.id_provincia = COALESCE((SELECT id_provincia FROM cliente WHERE id_cliente = OLD.id_cliente), 0)
+      AND venta_diaria.id_sucursal = COALESCE(OLD.id_sucursal, 0);
+    DELETE FROM venta_diaria WHERE dia = COALESCE(OLD.fecha_dia, 0) AND lineas <= 0;
+    INSERT INTO venta_diaria (dia, id_producto, id_provincia, id_sucursal, id_rubro, unidades, importe, lineas)
+    SELECT k.dia, df.id_producto, k.id_provincia, k.id_sucursal, COALESCE(p.id_rubro, 0),
+           df.cantidad, df.cantidad * df.precio_unitario, 1
+    FROM venta_clave AS k
+    JOIN detalle_factura AS df ON df.id_factura = k.id_factura
+    LEFT JOIN producto AS p ON p.id_producto = df.id_producto
+    WHERE k.id_factura = NEW.id_factura
+    ON CONFLICT (dia, id_producto, id_provincia, id_sucursal) DO UPDATE SET
+        unidades = unidades + excluded.unidades,
+        importe = importe + excluded.importe,
+        lineas = lineas + 1;
+END;
+
+CREATE TRIGGER trg_venta_factura_delete
+AFTER DELETE ON factura
+WHEN NOT EXISTS (SELECT 1 FROM cambios_pausa)
+BEGIN
+    UPDATE venta_diaria
+    SET unidades = unidades - df.cantidad,
+        importe = importe - df.cantidad * df.precio_unitario,
+        lineas = lineas - 1
+    FROM detalle_factura AS df
+    WHERE df.id_factura = OLD.id_factura
+      AND venta_diaria.dia = COALESCE(OLD.fecha_dia, 0)
+      AND venta_diaria.id_producto = df.id_producto
+      AND venta_diaria.id_provincia = COALESCE((SELECT id_provincia FROM cliente WHERE id_cliente = OLD.id_cliente), 0)
+      AND venta_diaria.id_sucursal = COALESCE(OLD.id_sucursal, 0);
+    DELETE FROM venta_diaria WHERE dia = COALESCE(OLD.fecha_dia, 0) AND lineas <= 0;
+END;
+
+CREATE TRIGGER trg_venta_cliente_provincia
+AFTER UPDATE OF id_provincia ON cliente
+WHEN NOT EXISTS (SELECT 1 FROM cambios_pausa) AND OLD.id_provincia IS NOT NEW.id_provincia
+BEGIN
+    UPDATE venta_diaria
+    SET unidades = venta_diaria.unidades - m.unidades,
+        importe = venta_diaria.importe - m.importe,
+        lineas = venta_diaria.lineas - m.lineas
+    FROM (
+        SELECT COALESCE(f.fecha_dia, 0) AS dia, df.id_producto, COALESCE(f.id_sucursal, 0) AS id_sucursal,
+               SUM(df.cantidad) AS unidades, SUM(df.cantidad * df.precio_unitario) AS importe, COUNT(*) AS lineas
+        FROM factura AS f
+        JOIN detalle_factura AS df ON df.id_factura = f.id_factura
+        WHERE f.id_cliente = OLD.id_cliente
+        GROUP BY 1, 2, 3
+    ) AS m
+    WHERE venta_diaria.dia = m.dia
+      AND venta_diaria.id_producto = m.id_producto
+      AND venta_diaria.id_provincia = COALESCE(OLD.id_provincia, 0)
+      AND venta_diaria.id_sucursal = m.id_sucursal;
+    DELETE FROM venta_diaria
+    WHERE dia IN (SELECT COALESCE(fecha_dia, 0) FROM factura WHERE id_cliente = OLD.id_cliente)
+      AND lineas <= 0;
+    INSERT INTO venta_diaria (dia, id_producto, id_provincia, id_sucursal, id_rubro, unidades, importe, lineas)
+    SELECT COALESCE(f.fecha_dia, 0), df.id_producto, COALESCE(NEW.id_provincia, 0), COALESCE(f.id_sucursal, 0),
+           COALESCE(p.id_rubro, 0), SUM(df.cantidad), SUM(df.cantidad * df.precio_unitario), COUNT(*)
+    FROM factura AS f
+    JOIN detalle_factura AS df ON df.id_factura = f.id_factura
+    LEFT JOIN producto AS p ON p.id_producto = df.id_producto
+    WHERE f.id_cliente = NEW.id_cliente
+    GROUP BY 1, 2, 4
+    ON CONFLICT (dia, id_producto, id_provincia, id_sucursal) DO UPDATE SET
+        unidades = unidades + excluded.unidades,
+        importe = importe + excluded.importe,
+        lineas = lineas + excluded.lineas;
+END;
+
+-- Resúmenes recalculados con los días nuevos (sin disparar los triggers de venta_diaria_rubro)
+INSERT OR IGNORE INTO cambios_pausa (id) VALUES (1);
+DELETE FROM venta_diaria;
+DELETE FROM venta_diaria_rubro;
+
+INSERT INTO venta_diaria (dia, id_producto, id_provincia, id_sucursal, id_rubro, unidades, importe, lineas)
+SELECT k.dia, df.id_producto, k.id_provincia, k.id_sucursal, COALESCE(p.id_rubro, 0),
+       SUM(df.cantidad), SUM(df.cantidad * df.precio_unitario), COUNT(*)
+FROM detalle_factura AS df
+JOIN venta_clave AS k ON k.id_factura = df.id_factura
+LEFT JOIN producto AS p ON p.id_producto = df.id_producto
+GROUP BY k.dia, df.id_producto, k.id_provincia, k.id_sucursal;
+
+INSERT INTO venta_diaria_rubro (dia, id_rubro, id_provincia, id_sucursal, unidades, importe, lineas)
+SELECT dia, id_rubro, id_provincia, id_sucursal, SUM(unidades), SUM(importe), SUM(lineas)
+FROM venta_diaria
+GROUP BY dia, id_rubro, id_provincia, id_sucursal;
+
+DELETE FROM cambios_pausa;
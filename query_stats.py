@@ -0,0 +1,344 @@
+"""
+Instrumentación de las consultas del repositorio.
+
+Con las estadísticas activas, las conexiones del pool se abren con InstrumentedConnection:
+cada sentencia (execute_query, transacciones, conexiones de solo lectura, exportaciones)
+suma su latencia (ejecución + lectura de filas) y sus filas a un histograma por SQL
+normalizado, y las que superan el umbral quedan en un registro de consultas lentas con su
+EXPLAIN QUERY PLAN. Apagadas, las conexiones son sqlite3.Connection comunes: no hay ningún
+costo por consulta.
+
+Se activan con repository.enable_query_stats() (desde el menú principal) o al iniciar con
+la variable de entorno CORAL_QUERY_STATS=1 (CORAL_SLOW_QUERY_MS fija el umbral).
+"""
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import deque
+from datetime import datetime
+from itertools import chain
+
+SLOW_QUERY_MS = float(os.environ.get("CORAL_SLOW_QUERY_MS", 50))
+SLOW_LOG_SIZE = 200  # consultas lentas que se conservan en memoria (las más recientes)
+
+# Límites superiores (ms) de los buckets del histograma; el último es "más de 2500 ms"
+BUCKETS_MS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, float("inf"))
+
+# Sentencias con plan de consulta (PRAGMA, BEGIN, COMMIT, etc. no tienen)
+_CON_PLAN = re.compile(r"^\s*(SELECT|WITH|INSERT|UPDATE|DELETE|REPLACE)\b", re.IGNORECASE)
+
+_lock = threading.Lock()
+_enabled = os.environ.get("CORAL_QUERY_STATS", "") not in ("", "0")
+_slow_ms = SLOW_QUERY_MS
+_log_path = None
+_stats = {}
+_slow = deque(maxlen=SLOW_LOG_SIZE)
+_plans = {}
+_since = datetime.now()
+
+_VACIO = object()  # executemany sin juegos de parámetros (distinto de un juego vacío, ())
+
+
+def is_enabled():
+    return _enabled
+
+
+def configure(enabled, slow_ms=None, log_path=None):
+    """
+    Activa o desactiva la instrumentación. slow_ms fija el umbral del registro de lentas;
+    log_path agrega cada consulta lenta (JSON por línea) a ese archivo.
+    Las conexiones ya abiertas no cambian: repository.enable_query_stats() las reabre.
+    """
+    global _enabled, _slow_ms, _log_path
+    with _lock:
+        _enabled = enabled
+        if slow_ms is not None:
+            _slow_ms = float(slow_ms)
+        if log_path is not None:
+            _log_path = log_path or None
+
+
+def slow_threshold_ms():
+    return _slow_ms
+
+
+def reset():
+    """Borra las estadísticas y el registro de lentas acumulados."""
+    global _since
+    with _lock:
+        _stats.clear()
+        _slow.clear()
+        _plans.clear()
+        _since = datetime.now()
+
+
+# --------------- Normalización ---------------
+
+_COMENTARIOS = re.compile(r"--[^\n]*|/\*.*?\*/", re.DOTALL)
+_TEXTOS = re.compile(r"'(?:[^']|'')*'")
+_NUMEROS = re.compile(r"(?<![\w.])-?\d+(?:\.\d+)?(?![\w.])")
+_LISTAS = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+_ESPACIOS = re.compile(r"\s+")
+
+
+def normalize_sql(sql):
+    """
+    SQL sin comentarios, con los literales reemplazados por ? y los espacios colapsados,
+    así las variantes de una misma consulta comparten histograma.
+    """
+    sql = _COMENTARIOS.sub(" ", sql)
+    sql = _TEXTOS.sub("?", sql)
+    sql = _NUMEROS.sub("?", sql)
+    sql = _LISTAS.sub("(?, ...)", sql)
+    return _ESPACIOS.sub(" ", sql).strip().rstrip(";")
+
+
+# --------------- Registro ---------------
+
+class _QueryStat:
+    __slots__ = ("sql", "count", "total_ms", "min_ms", "max_ms", "rows", "buckets")
+
+    def __init__(self, sql):
+        self.sql = sql
+        self.count = 0
+        self.total_ms = 0.0
+        self.min_ms = float("inf")
+        self.max_ms = 0.0
+        self.rows = 0
+        self.buckets = [0] * len(BUCKETS_MS)
+
+    def percentile(self, fraccion):
+        """Estimación desde el histograma: límite superior del bucket del percentil."""
+        objetivo = fraccion * self.count
+        acumulado = 0
+        for limite, n in zip(BUCKETS_MS, self.buckets):
+            acumulado += n
+            if acumulado >= objetivo:
+                return min(limite, self.max_ms)
+        return self.max_ms
+
+    def as_dict(self):
+        return {
+            "sql": self.sql,
+            "ejecuciones": self.count,
+            "total_ms": round(self.total_ms, 3),
+            "promedio_ms": round(self.total_ms / self.count, 4) if self.count else 0.0,
+            "min_ms": round(self.min_ms, 4) if self.count else 0.0,
+            "max_ms": round(self.max_ms, 4),
+            "p50_ms": round(self.percentile(0.5), 4),
+            "p95_ms": round(self.percentile(0.95), 4),
+            "filas": self.rows,
+            "histograma": {
+                (f"<= {limite:g} ms" if limite != float("inf") else f"> {BUCKETS_MS[-2]:g} ms"): n
+                for limite, n in zip(BUCKETS_MS, self.buckets) if n
+            },
+        }
+
+
+def _plan(connection, sql, params):
+    """EXPLAIN QUERY PLAN de la sentencia, con un cursor sin instrumentar."""
+    if not _CON_PLAN.match(sql):
+        return []
+    cursor = sqlite3.Cursor(connection)
+    try:
+        return [row[3] for row in cursor.execute(f"EXPLAIN QUERY PLAN {sql}", params)]
+    except sqlite3.Error as e:
+        return [f"(sin plan: {e})"]
+    finally:
+        cursor.close()
+
+
+def _record(connection, sql, params, ms, rows):
+    clave = normalize_sql(sql)
+    with _lock:
+        stat = _stats.get(clave)
+        if stat is None:
+            stat = _stats[clave] = _QueryStat(clave)
+        stat.count += 1
+        stat.total_ms += ms
+        stat.rows += rows
+        stat.min_ms = min(stat.min_ms, ms)
+        stat.max_ms = max(stat.max_ms, ms)
+        for i, limite in enumerate(BUCKETS_MS):
+            if ms <= limite:
+                stat.buckets[i] += 1
+                break
+        lenta = ms >= _slow_ms
+        plan = _plans.get(clave)
+        log_path = _log_path
+    if not lenta:
+        return
+
+    if plan is None:
+        # el plan se captura la primera vez que la consulta es lenta y se reutiliza
+        plan = _plan(connection, sql, params)
+        with _lock:
+            _plans[clave] = plan
+    entrada = {
+        "cuando": datetime.now().isoformat(timespec="milliseconds"),
+        "ms": round(ms, 3),
+        "filas": rows,
+        "hilo": threading.current_thread().name,
+        "sql": clave,
+        "plan": plan,
+    }
+    with _lock:
+        _slow.append(entrada)
+    if log_path:
+        try:
+            with open(log_path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(entrada, ensure_ascii=False) + "\n")
+        except OSError as e:
+            print(f"[DB WARN] No se pudo escribir el registro de consultas lentas: {e}")
+
+
+class InstrumentedCursor(sqlite3.Cursor):
+    """
+    Cursor que mide cada sentencia desde execute hasta que se leen sus filas. La medición
+    se registra al ejecutar la siguiente sentencia, al cerrar el cursor o al liberarlo.
+    """
+
+    _pending = None  # [sql, params, ms acumulados, filas leídas]
+
+    def _flush(self):
+        pending, self._pending = self._pending, None
+        if pending is not None:
+            sql, params, ms, rows = pending
+            _record(self.connection, sql, params, ms, rows if rows else max(self.rowcount, 0))
+
+    def _timed(self, sql, params, fn, *args):
+        self._flush()
+        inicio = time.perf_counter()
+        try:
+            fn(*args)
+        finally:
+            self._pending = [sql, params, (time.perf_counter() - inicio) * 1000, 0]
+        return self
+
+    def execute(self, sql, parameters=()):
+        return self._timed(sql, parameters, super().execute, sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        # para el plan alcanza con el primer juego de parámetros (sin consumir el generador)
+        filas = iter(seq_of_parameters)
+        primera = next(filas, _VACIO)
+        if primera is _VACIO:
+            return self._timed(sql, (), super().executemany, sql, ())
+        return self._timed(sql, primera, super().executemany, sql, chain([primera], filas))
+
+    def _fetch(self, fn, *args):
+        inicio = time.perf_counter()
+        result = fn(*args)
+        if self._pending is not None:
+            self._pending[2] += (time.perf_counter() - inicio) * 1000
+            self._pending[3] += len(result) if isinstance(result, list) else result is not None
+        return result
+
+    def fetchone(self):
+        return self._fetch(super().fetchone)
+
+    def fetchmany(self, size=None):
+        return self._fetch(super().fetchmany, size if size is not None else self.arraysize)
+
+    def fetchall(self):
+        return self._fetch(super().fetchall)
+
+    def __next__(self):
+        inicio = time.perf_counter()
+        try:
+            row = super().__next__()
+        finally:
+            if self._pending is not None:
+                self._pending[2] += (time.perf_counter() - inicio) * 1000
+        if self._pending is not None:
+            self._pending[3] += 1
+        return row
+
+    def close(self):
+        self._flush()
+        super().close()
+
+    def __del__(self):
+        try:
+            self._flush()
+        except Exception:
+            pass
+
+
+class InstrumentedConnection(sqlite3.Connection):
+    """Conexión cuyos cursores (incluidos los de execute/executemany) son InstrumentedCursor."""
+
+    def cursor(self, factory=None):
+        return super().cursor(factory or InstrumentedCursor)
+
+    def execute(self, sql, parameters=()):
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        return self.cursor().executemany(sql, seq_of_parameters)
+
+
+# --------------- Consulta de resultados ---------------
+
+def snapshot(order="total_ms"):
+    """Estadísticas por SQL normalizado, de mayor a menor según 'order'."""
+    with _lock:
+        filas = [stat.as_dict() for stat in _stats.values()]
+    return sorted(filas, key=lambda s: s[order], reverse=True)
+
+
+def slow_queries():
+    """Registro de consultas lentas, de la más reciente a la más antigua."""
+    with _lock:
+        return list(reversed(_slow))
+
+
+def as_dict():
+    return {
+        "generado": datetime.now().isoformat(timespec="seconds"),
+        "desde": _since.isoformat(timespec="seconds"),
+        "habilitado": _enabled,
+        "umbral_lento_ms": _slow_ms,
+        "consultas": snapshot(),
+        "lentas": slow_queries(),
+    }
+
+
+def dump_json(path):
+    """Guarda estadísticas y consultas lentas en un archivo JSON. Devuelve la ruta."""
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(as_dict(), f, ensure_ascii=False, indent=2)
+    return path
+
+
+def _recortar(sql, largo):
+    return sql if len(sql) <= largo else sql[:largo - 1] + "…"
+
+
+def print_summary(limit=15, slow_limit=5):
+    """Imprime las consultas con más tiempo acumulado y las últimas lentas con su plan."""
+    consultas = snapshot()
+    estado = "activas" if _enabled else "desactivadas"
+    print(f"\n📊 Estadísticas de consultas ({estado}, desde {_since:%H:%M:%S}, umbral lento {_slow_ms:g} ms)")
+    if not consultas:
+        print("   Todavía no hay consultas registradas.")
+        return
+
+    print(f"   {'veces':>7} {'total ms':>10} {'prom ms':>9} {'p95 ms':>9} {'max ms':>9} {'filas':>9}  SQL")
+    for s in consultas[:limit]:
+        print(f"   {s['ejecuciones']:>7} {s['total_ms']:>10.1f} {s['promedio_ms']:>9.3f} {s['p95_ms']:>9.3f} "
+              f"{s['max_ms']:>9.2f} {s['filas']:>9}  {_recortar(s['sql'], 90)}")
+    if len(consultas) > limit:
+        print(f"   … y {len(consultas) - limit} consulta(s) más (ver el JSON).")
+
+    lentas = slow_queries()
+    print(f"\n🐢 Consultas lentas: {len(lentas)} registrada(s)")
+    for entrada in lentas[:slow_limit]:
+        print(f"   [{entrada['cuando']}] {entrada['ms']:.1f} ms, {entrada['filas']} fila(s), "
+              f"hilo {entrada['hilo']}")
+        print(f"      {_recortar(entrada['sql'], 110)}")
+        for paso in entrada["plan"]:
+            print(f"      ↳ {paso}")
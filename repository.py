@@ -1,12 +1,212 @@
 import sqlite3
-import pandas as pd
+import threading
+import base64
+import json
+import random
+import re
+import time
+import unicodedata
 import os
+from contextlib import contextmanager
+from datetime import date, datetime
+from urllib.parse import quote
 from rubro import Rubro
+import query_stats
 
 DB_NAME = "coral_tech.db"
 DB_PATH = "coral_tech.db"
 SQL_FILE = "init.sql"
 CSV_FOLDER = "data"
+MIGRATIONS_FOLDER = "migrations"
+
+# Tamaño del caché de sentencias preparadas por conexión (el default de sqlite3 es 128)
+STATEMENT_CACHE_SIZE = 512
+
+# Pragmas que se aplican una sola vez, al abrir cada conexión del pool
+CONNECTION_PRAGMAS = (
+    "PRAGMA cache_size = -16000",  # ~16 MB de caché de páginas
+    "PRAGMA temp_store = MEMORY",
+)
+
+# Modo de journal que se configura al iniciar (None = dejar el que tenga la base).
+# En WAL los lectores no bloquean al escritor ni viceversa.
+JOURNAL_MODE = "WAL"
+
+# Espera máxima de SQLite ante un bloqueo antes de devolver "database is locked"
+BUSY_TIMEOUT_MS = 5000
+
+# Reintentos ante conflictos de escritura (backoff exponencial con jitter)
+WRITE_RETRIES = 5
+WRITE_RETRY_BACKOFF = 0.05  # segundos; se duplica en cada intento
+
+
+# --------------- Connection Pool ---------------
+
+_local = threading.local()
+_pool_lock = threading.Lock()
+_pool_connections = []
+_pool_generation = 0
+
+
+def _new_connection(path, read_only=False):
+    # check_same_thread=False solo para poder cerrarlas desde close_connections();
+    # cada conexión la usa únicamente el hilo que la creó.
+    # Con las estadísticas de consultas activas se abren instrumentadas (ver query_stats).
+    factory = query_stats.InstrumentedConnection if query_stats.is_enabled() else sqlite3.Connection
+    if read_only:
+        uri = f"file:{quote(os.path.abspath(path))}?mode=ro"
+        conn = sqlite3.connect(uri, uri=True, timeout=BUSY_TIMEOUT_MS / 1000, factory=factory,
+                               cached_statements=STATEMENT_CACHE_SIZE, check_same_thread=False)
+    else:
+        conn = sqlite3.connect(path, timeout=BUSY_TIMEOUT_MS / 1000, factory=factory,
+                               cached_statements=STATEMENT_CACHE_SIZE, check_same_thread=False)
+    for pragma in CONNECTION_PRAGMAS:
+        conn.execute(pragma)
+    if conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal":
+        # en WAL, synchronous=NORMAL sigue siendo seguro ante caídas de la aplicación
+        conn.execute("PRAGMA synchronous = NORMAL")
+    return conn
+
+
+def _pooled_connection(read_only=None):
+    """
+    Devuelve la conexión reutilizable del hilo actual para DB_NAME (la abre la primera vez).
+    Si read_only es None se usa la de solo lectura cuando el hilo está dentro de read_only().
+    """
+    if getattr(_local, "generation", None) != _pool_generation:
+        _local.connections = {}
+        _local.tx_depth = 0
+        _local.generation = _pool_generation
+    if read_only is None:
+        read_only = getattr(_local, "read_only_depth", 0) > 0 and _local.tx_depth == 0
+
+    key = (DB_NAME, read_only)
+    conn = _local.connections.get(key)
+    if conn is None:
+        conn = _new_connection(DB_NAME, read_only)
+        _local.connections[key] = conn
+        with _pool_lock:
+            _pool_connections.append(conn)
+    return conn
+
+
+def _in_transaction():
+    return getattr(_local, "generation", None) == _pool_generation and _local.tx_depth > 0
+
+
+def _is_locked(error):
+    mensaje = str(error).lower()
+    return isinstance(error, sqlite3.OperationalError) and ("locked" in mensaje or "busy" in mensaje)
+
+
+def _with_retry(fn):
+    """Ejecuta fn reintentando con backoff exponencial si la base está bloqueada."""
+    delay = WRITE_RETRY_BACKOFF
+    for intento in range(WRITE_RETRIES):
+        try:
+            return fn()
+        except sqlite3.OperationalError as e:
+            if not _is_locked(e) or intento == WRITE_RETRIES - 1:
+                raise
+            print(f"[DB WARN] Base bloqueada, reintentando en {delay:.2f}s ({intento + 1}/{WRITE_RETRIES - 1})")
+            time.sleep(delay + random.uniform(0, delay))
+            delay *= 2
+
+
+def close_connections():
+    """Cierra todas las conexiones del pool (de todos los hilos)."""
+    global _pool_generation
+    with _pool_lock:
+        for conn in _pool_connections:
+            try:
+                conn.close()
+            except sqlite3.Error:
+                pass
+        _pool_connections.clear()
+        _pool_generation += 1
+
+
+def release_connections():
+    """Cierra las conexiones del hilo actual (para hilos worker de vida corta)."""
+    if getattr(_local, "generation", None) != _pool_generation:
+        return
+    with _pool_lock:
+        for conn in _local.connections.values():
+            conn.close()
+            if conn in _pool_connections:
+                _pool_connections.remove(conn)
+    _local.connections = {}
+
+
+def enable_query_stats(slow_ms=None, log_path=None):
+    """
+    Activa las estadísticas de consultas (latencia, filas y registro de lentas con su plan).
+    Reabre las conexiones del pool para que pasen a estar instrumentadas.
+    """
+    query_stats.configure(True, slow_ms, log_path)
+    close_connections()
+
+
+def disable_query_stats():
+    """Desactiva las estadísticas; las conexiones vuelven a abrirse sin instrumentar."""
+    query_stats.configure(False)
+    close_connections()
+
+
+def configure_journal_mode(mode=None):
+    """
+    Configura el modo de journal de la base (por defecto JOURNAL_MODE).
+    Es persistente en el archivo, así que alcanza con hacerlo una vez al iniciar.
+    """
+    mode = mode or JOURNAL_MODE
+    if not mode or not os.path.exists(DB_NAME):
+        return None
+    row = _with_retry(lambda: _pooled_connection(read_only=False).execute(f"PRAGMA journal_mode = {mode}").fetchone())
+    return row[0] if row else None
+
+
+@contextmanager
+def transaction():
+    """
+    Ejecuta un bloque dentro de una única transacción de escritura sobre la conexión del hilo.
+    Toma el lock de escritura al empezar (BEGIN IMMEDIATE, con reintentos si está ocupado),
+    hace commit al salir y rollback si se produce una excepción.
+    Las transacciones anidadas se suman a la exterior.
+
+        with db.transaction() as cur:
+            cur.execute(...)
+    """
+    conn = _pooled_connection(read_only=False)
+    depth = _local.tx_depth
+    if depth == 0 and not conn.in_transaction:
+        _with_retry(lambda: conn.execute("BEGIN IMMEDIATE"))
+    _local.tx_depth = depth + 1
+    cursor = conn.cursor()
+    try:
+        yield cursor
+    except BaseException:
+        if depth == 0:
+            conn.rollback()
+        raise
+    else:
+        if depth == 0:
+            conn.commit()
+    finally:
+        cursor.close()
+        _local.tx_depth = depth
+
+
+@contextmanager
+def read_only():
+    """
+    Las consultas hechas dentro del bloque usan una conexión de solo lectura (mode=ro).
+    Pensado para el dashboard y las exportaciones: en WAL nunca bloquean a las escrituras.
+    """
+    _local.read_only_depth = getattr(_local, "read_only_depth", 0) + 1
+    try:
+        yield
+    finally:
+        _local.read_only_depth -= 1
 
 
 # --------------- Database Management ---------------
@@ -14,12 +214,15 @@ CSV_FOLDER = "data"
 def create_db():
     if os.path.exists(DB_NAME):
         print(f"Database '{DB_NAME}' already exists. Skipping creation.")
+        configure_journal_mode()
+        migrate()
         return
 
     print(f"Creating database '{DB_NAME}'...")
 
     # 🔹 Crear conexión y cursor
-    conn = sqlite3.connect(DB_NAME)
+    close_connections()
+    conn = _pooled_connection()
     cursor = conn.cursor()
 
     # 🔹 Crear las tablas desde el archivo SQL
@@ -38,57 +241,100 @@ def create_db():
     conn.commit()
     print("✅ Rubros iniciales cargados desde Rubro(Enum).")
 
-    # 🔹 Cerrar conexión al final
-    conn.close()
+    cursor.close()
     print("Base tables and initial data created successfully.")
+    configure_journal_mode()
+    migrate()
 
 
-def load_csv_data():
-    conn = sqlite3.connect(DB_NAME)
-    cursor = conn.cursor()
-
-    # 🔹 Map de tabla -> archivo CSV
-    csv_map = {
-        "cliente": "cliente.csv",
-        "rubro": "rubro.csv",
-        "producto": "producto.csv",
-        "factura": "factura.csv",
-        "detalle_factura": "detalle_factura.csv"
-    }
-
-    print("🧹 Limpiando tablas antes de cargar datos CSV...")
-
-    # 🔹 Desactivar restricciones de claves foráneas para poder limpiar en orden
-    cursor.execute("PRAGMA foreign_keys = OFF;")
-
-    # 🔹 Limpiar tablas en orden correcto (detalle primero)
-    for table in ["detalle_factura", "factura", "producto", "cliente", "rubro"]:
-        cursor.execute(f"DELETE FROM {table};")
-        print(f"  → Tabla '{table}' vaciada.")
-
+def migrate():
+    """
+    Aplica, en orden, las migraciones de MIGRATIONS_FOLDER (NNN_descripcion.sql)
+    que todavía no figuran en la tabla schema_version. Cada migración corre en su
+    propia transacción: si falla, se revierte y se relanza el error.
+    """
+    conn = _pooled_connection()
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS schema_version (
+            version INTEGER PRIMARY KEY,
+            nombre TEXT NOT NULL,
+            aplicada_en TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
     conn.commit()
-    cursor.execute("PRAGMA foreign_keys = ON;")  # volver a activar
-
-    print("\n📂 Cargando datos desde CSV...\n")
+    aplicadas = {row[0] for row in conn.execute("SELECT version FROM schema_version")}
 
-    # 🔹 Cargar cada CSV nuevamente
-    for table, filename in csv_map.items():
-        path = os.path.join(CSV_FOLDER, filename)
-        if not os.path.exists(path):
-            print(f"⚠️  No se encontró el archivo CSV para '{table}': {path}")
+    pendientes = []
+    for filename in sorted(os.listdir(MIGRATIONS_FOLDER)):
+        if not filename.endswith(".sql"):
             continue
+        version = int(filename.split("_", 1)[0])
+        if version not in aplicadas:
+            pendientes.append((version, filename))
+
+    for version, filename in pendientes:
+        with open(os.path.join(MIGRATIONS_FOLDER, filename), "r", encoding="utf-8") as f:
+            sql_script = f.read()
+        try:
+            conn.executescript(
+                f"BEGIN;\n{sql_script}\n"
+                f"INSERT INTO schema_version (version, nombre) VALUES ({version}, '{filename}');\n"
+                "COMMIT;"
+            )
+        except sqlite3.Error as e:
+            if conn.in_transaction:
+                conn.rollback()
+            print(f"[DB ERROR] Falló la migración {filename}: {e}")
+            raise
+        print(f"  → Migración aplicada: {filename}")
+
+    return len(pendientes)
+
+
+def get_schema_version():
+    """Última versión de migración aplicada (0 si no hay ninguna)."""
+    row = execute_query("SELECT COALESCE(MAX(version), 0) FROM schema_version", fetch="one")
+    return row[0] if row else 0
+
+
+def load_csv_data(chunk_size=None, workers=0):
+    """
+    Reemplaza el contenido de las tablas con los CSV de CSV_FOLDER.
+    La carga es por bloques y en una sola transacción (ver csv_loader).
+    """
+    import csv_loader  # import diferido: csv_loader usa este módulo
 
-        print(f"Loading '{filename}' into table '{table}'...")
-        df = pd.read_csv(path)
-        df.to_sql(table, conn, if_exists="append", index=False)
-
-    conn.close()
+    csv_loader.load_csv_files(CSV_FOLDER, chunk_size=chunk_size or csv_loader.CHUNK_SIZE, workers=workers)
+    # los montos del CSV que no coincidan con su detalle se corrigen
+    reconcile_invoice_totals()
     print("\n✅ Datos CSV cargados correctamente.")
 
 
+def sync_csv_data():
+    """
+    Sincronización incremental con los CSV de CSV_FOLDER: aplica solo altas, cambios
+    y bajas desde la última sincronización (ver csv_loader.sync_csv_files).
+    """
+    import csv_loader  # import diferido: csv_loader usa este módulo
+
+    summaries = csv_loader.sync_csv_files(CSV_FOLDER)
+    cambios = [summaries.get(t) for t in ("factura", "detalle_factura")]
+    if any(s and (s["insertadas"] or s["actualizadas"] or s["eliminadas"]) for s in cambios):
+        reconcile_invoice_totals()
+    if summaries.get("rubro"):
+        invalidate_lookups("rubro")
+    print("\n✅ Sincronización CSV completada.")
+    return summaries
+
+
 def delete_db():
+    close_connections()
+    invalidate_lookups()
     if os.path.exists(DB_NAME):
         os.remove(DB_NAME)
+        for sufijo in ("-wal", "-shm"):
+            if os.path.exists(DB_NAME + sufijo):
+                os.remove(DB_NAME + sufijo)
         print(f"Database '{DB_NAME}' has been deleted.")
     else:
         print(f"Database '{DB_NAME}' does not exist.")
@@ -99,7 +345,7 @@ def delete_table(table_name):
         print(f"Database '{DB_NAME}' does not exist.")
         return
 
-    conn = sqlite3.connect(DB_NAME)
+    conn = _pooled_connection()
     cursor = conn.cursor()
 
     try:
@@ -109,15 +355,15 @@ def delete_table(table_name):
     except sqlite3.Error as e:
         print("Error deleting table:", e)
     finally:
-        conn.close()
+        cursor.close()
 
 
 def get_connection():
-    return sqlite3.connect("coral_tech.db")
+    """Conexión del pool para el hilo actual. No cerrarla: se reutiliza entre llamadas."""
+    return _pooled_connection()
 
 
-def execute_query(query, params=(), fetch=False, commit=True):
-    connection = sqlite3.connect("coral_tech.db")
+def _run_query(connection, query, params, fetch, commit):
     cursor = connection.cursor()
     try:
         cursor.execute(query, params)
@@ -128,23 +374,74 @@ def execute_query(query, params=(), fetch=False, commit=True):
         elif fetch == "one":
             result = cursor.fetchone()
 
-        if commit:
+        # dentro de db.transaction() el commit lo hace la transacción
+        if commit and not _in_transaction():
             connection.commit()
 
         return result
+    except sqlite3.Error:
+        if not _in_transaction():
+            connection.rollback()
+        raise
+    finally:
+        cursor.close()
+
+
+def execute_query(query, params=(), fetch=False, commit=True):
+    """
+    Ejecuta una consulta sobre la conexión del pool. Los errores de SQL se informan
+    y devuelven None; si la base sigue bloqueada después de los reintentos se relanza
+    el sqlite3.OperationalError para que quien llama pueda avisar al usuario.
+    """
+    connection = _pooled_connection()
+    try:
+        if _in_transaction():
+            return _run_query(connection, query, params, fetch, commit)
+        return _with_retry(lambda: _run_query(connection, query, params, fetch, commit))
     except sqlite3.Error as e:
+        if _is_locked(e):
+            raise
         print(f"[DB ERROR] {e}")
         return None
-    finally:
-        connection.close()
+
+
+# Tablas de soporte que no son datos del negocio (no se muestran ni se exportan)
+INTERNAL_TABLES = {"schema_version", "csv_sync_files", "csv_sync_rows", "cambios", "cambios_pausa",
+                   "venta_diaria", "venta_diaria_rubro"}
+
+# Índices de búsqueda FTS5 (migración 006); sus tablas internas se llaman <índice>_data, _idx, etc.
+SEARCH_INDEXES = ("producto_fts", "cliente_fts")
+
+
+def get_table_names():
+    """Nombres de las tablas de datos (sin las internas de SQLite ni las de soporte)."""
+    with read_only():
+        rows = execute_query(
+            "SELECT name FROM sqlite_master WHERE type = 'table' AND name NOT LIKE 'sqlite_%' ORDER BY rowid",
+            fetch="all"
+        ) or []
+    return [
+        r[0] for r in rows
+        if r[0] not in INTERNAL_TABLES and not r[0].startswith(SEARCH_INDEXES)
+    ]
+
+
+def has_data():
+    """True si alguna tabla de datos tiene al menos una fila (sin leer las tablas completas)."""
+    with read_only():
+        for table in get_table_names():
+            if execute_query(f"SELECT EXISTS (SELECT 1 FROM {table})", fetch="one") == (1,):
+                return True
+    return False
 
 
 def get_all_data(return_data=False):
     """Muestra o devuelve todas las tablas en la base de datos."""
-    conn = get_connection()
+    import pandas as pd  # import diferido: pandas tarda en cargar y solo se usa acá
+
+    conn = _pooled_connection(read_only=True)
     cursor = conn.cursor()
-    cursor.execute("SELECT name FROM sqlite_master WHERE type='table';")
-    tables = [t[0] for t in cursor.fetchall()]
+    tables = get_table_names()
 
     data_dict = {}
 
@@ -155,12 +452,193 @@ def get_all_data(return_data=False):
             print(f"\n=== {table.upper()} ===")
             print(df)
 
-    conn.close()
+    cursor.close()
 
     if return_data:
         return data_dict
 
 
+# --------------- Pagination ---------------
+
+DEFAULT_PAGE_SIZE = 200
+
+
+def _encode_cursor(values):
+    """Cursor opaco a partir de la clave de orden de la última fila entregada."""
+    return base64.urlsafe_b64encode(json.dumps(values).encode("utf-8")).decode("ascii")
+
+
+def _decode_cursor(cursor):
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+    except (ValueError, UnicodeDecodeError):
+        raise ValueError(f"Cursor de paginación inválido: {cursor!r}")
+    if not isinstance(values, list):
+        raise ValueError(f"Cursor de paginación inválido: {cursor!r}")
+    return values
+
+
+def _estimate_count(table):
+    """Estimación barata de filas: MAX(rowid) es una sola búsqueda en el índice de la PK."""
+    row = execute_query(f"SELECT MAX(rowid) FROM {table}", fetch="one")
+    return (row[0] or 0) if row else 0
+
+
+def _keyset_page(select_sql, order, page_size, cursor, params=(), where=(), descending=False, offset=None):
+    """
+    Página por keyset sobre select_sql (SELECT ... FROM ... JOIN ..., sin WHERE/ORDER BY).
+    order: [(expresión SQL, índice de la columna en la fila), ...]; la última debe ser única (la PK).
+    offset (sin cursor) permite saltar a una posición arbitraria, p. ej. al arrastrar la barra
+    de desplazamiento; las páginas siguientes vuelven a usar el cursor.
+    Devuelve (filas, cursor_siguiente o None).
+    """
+    conditions = list(where)
+    params = list(params)
+    if cursor:
+        last = _decode_cursor(cursor)
+        if len(last) != len(order):
+            raise ValueError(f"Cursor de paginación inválido: {cursor!r}")
+        columns = ", ".join(expr for expr, _ in order)
+        conditions.append(f"({columns}) {'<' if descending else '>'} ({', '.join('?' * len(order))})")
+        params.extend(last)
+
+    direction = "DESC" if descending else "ASC"
+    query = (
+        f"{select_sql}\n"
+        + (f"WHERE {' AND '.join(conditions)}\n" if conditions else "")
+        + f"ORDER BY {', '.join(f'{expr} {direction}' for expr, _ in order)}\n"
+        + "LIMIT ?"
+    )
+    params.append(page_size + 1)
+    if offset and not cursor:
+        query += " OFFSET ?"
+        params.append(offset)
+    rows = execute_query(query, params, fetch="all") or []
+
+    next_cursor = None
+    if len(rows) > page_size:
+        rows = rows[:page_size]
+        next_cursor = _encode_cursor([rows[-1][i] for _, i in order])
+    return rows, next_cursor
+
+
+def _count(select_sql, where, params):
+    """Total exacto de filas de select_sql con esos filtros (solo se usa con filtros activos)."""
+    row = execute_query(
+        f"SELECT COUNT(*) FROM ({select_sql} WHERE {' AND '.join(where)})", params, fetch="one"
+    )
+    return row[0] if row else 0
+
+
+def _listing_order(sorts, sort, pk):
+    """Orden del keyset para `sort` (clave de la lista blanca), siempre desempatado por la PK."""
+    if sort is None or sort == "id":
+        return [pk]
+    if sort not in sorts:
+        raise ValueError(f"No se puede ordenar por {sort!r}; opciones: {', '.join(['id', *sorts])}")
+    return [sorts[sort], pk]
+
+
+def _listing_filters(allowed, filters):
+    """Convierte {filtro: valor} en condiciones SQL; solo se aceptan los filtros de la lista blanca."""
+    where, params = [], []
+    for name, value in (filters or {}).items():
+        if value is None or value == "":
+            continue
+        if name not in allowed:
+            raise ValueError(f"Filtro no soportado: {name!r}; opciones: {', '.join(allowed)}")
+        condition, convert = allowed[name]
+        converted = convert(value)
+        if converted is None:
+            raise ValueError(f"Valor inválido para el filtro {name!r}: {value!r}")
+        where.append(condition)
+        params.append(converted)
+    return where, params
+
+
+def _reference_id(table):
+    """Convertidor de filtro: acepta el id o el nombre (resuelto con el cache de referencia)."""
+    def convert(value):
+        if isinstance(value, int) or (isinstance(value, str) and value.strip().isdigit()):
+            return int(value)
+        return _lookup_id(table, value)
+    return convert
+
+
+# --------------- Cambios (refresco incremental) ---------------
+
+# tabla -> (SELECT con el mismo formato que su listado, PK, tablas cuyas columnas también se muestran)
+_CHANGE_SOURCES = {
+    "producto": ("""
+        SELECT p.id_producto, p.descripcion, p.precio, p.stock, r.nombre_rubro
+        FROM producto AS p
+        JOIN rubro AS r ON p.id_rubro = r.id_rubro
+    """, "p.id_producto", ("rubro",)),
+    "cliente": ("""
+        SELECT c.id_cliente, c.nombre, p.nombre_provincia, c.domicilio, c.telefono, c.email
+        FROM cliente AS c
+        JOIN provincia AS p ON c.id_provincia = p.id_provincia
+    """, "c.id_cliente", ()),
+    "rubro": ("SELECT id_rubro, nombre_rubro FROM rubro", "id_rubro", ()),
+    "factura": ("""
+        SELECT f.id_factura, c.nombre, f.fecha, COALESCE(f.monto, 0)
+        FROM factura AS f
+        JOIN cliente AS c ON f.id_cliente = c.id_cliente
+    """, "f.id_factura", ("cliente",)),
+}
+
+
+def get_data_version():
+    """Versión actual del registro de cambios (migración 005): crece con cada alta/cambio/baja."""
+    row = execute_query("SELECT MAX(version) FROM cambios", fetch="one")
+    return (row[0] or 0) if row else 0
+
+
+def get_changes_since(table, version):
+    """
+    Filas de `table` (producto, cliente, rubro o factura) que cambiaron después de `version`.
+    Devuelve (version_actual, filas, ids_borrados), con las filas en el mismo formato que
+    get_products / get_clients / get_rubros / get_invoices, ordenadas por id.
+
+    Si version es None, si la tabla se recargó completa o si cambió una tabla de la que se
+    muestran columnas (p. ej. el nombre de un rubro en los productos), filas e ids_borrados
+    son None: hay que volver a leer el listado completo.
+    """
+    select_sql, pk, depends = _CHANGE_SOURCES[table]
+    with read_only():
+        current = get_data_version()
+        if version is None:
+            return current, None, None
+        if current == version:
+            return current, [], []
+
+        condition = "(tabla = ? AND clave IS NULL)"
+        if depends:
+            condition += f" OR tabla IN ({', '.join('?' * len(depends))})"
+        full = execute_query(
+            f"SELECT EXISTS (SELECT 1 FROM cambios WHERE version > ? AND ({condition}))",
+            (version, table, *depends), fetch="one"
+        )
+        if full is None or full[0]:
+            return current, None, None
+
+        rows = execute_query(f"""
+            {select_sql}
+            WHERE {pk} IN (
+                SELECT clave FROM cambios WHERE tabla = ? AND version > ? AND borrado = 0
+            )
+            ORDER BY {pk}
+        """, (table, version), fetch="all") or []
+        deleted = execute_query(
+            "SELECT clave FROM cambios WHERE tabla = ? AND version > ? AND borrado = 1",
+            (table, version), fetch="all"
+        ) or []
+
+    if table == "factura":
+        rows = [{"id": r[0], "cliente": r[1], "fecha": r[2], "total": r[3]} for r in rows]
+    return current, rows, [r[0] for r in deleted]
+
+
 # --------------- Products ---------------
 
 def get_products():
@@ -172,6 +650,44 @@ def get_products():
     """, fetch="all")
 
 
+# Columnas por las que se puede ordenar / filtrar el listado paginado (lista blanca, con índice)
+PRODUCT_SORTS = {
+    "descripcion": ("p.descripcion", 1),
+    "precio": ("p.precio", 2),
+    "stock": ("p.stock", 3),
+}
+PRODUCT_FILTERS = {
+    "precio_min": ("p.precio >= ?", float),
+    "precio_max": ("p.precio <= ?", float),
+    "stock_max": ("p.stock < ?", int),       # stock por debajo de N
+    "rubro": ("p.id_rubro = ?", _reference_id("rubro")),
+}
+
+
+def get_products_page(page_size=DEFAULT_PAGE_SIZE, cursor=None, with_total=False, offset=None,
+                      sort=None, descending=False, filters=None):
+    """
+    Una página de productos (paginación por keyset, sin OFFSET), ordenada por `sort`
+    (una clave de PRODUCT_SORTS; por defecto el id) y filtrada con `filters`
+    ({clave de PRODUCT_FILTERS: valor}). El cursor solo vale para el mismo orden y filtros.
+    Devuelve (filas, cursor_siguiente, total); el cursor es None en la última página y el
+    total (estimado, o exacto si hay filtros) solo se calcula si with_total=True.
+    """
+    select_sql = """
+        SELECT p.id_producto, p.descripcion, p.precio, p.stock, r.nombre_rubro
+        FROM producto AS p
+        JOIN rubro AS r ON p.id_rubro = r.id_rubro
+    """
+    order = _listing_order(PRODUCT_SORTS, sort, ("p.id_producto", 0))
+    where, params = _listing_filters(PRODUCT_FILTERS, filters)
+    rows, next_cursor = _keyset_page(select_sql, order, page_size, cursor, params, where,
+                                     descending=descending, offset=offset)
+    total = None
+    if with_total:
+        total = _count(select_sql, where, params) if where else _estimate_count("producto")
+    return rows, next_cursor, total
+
+
 def get_product_by_id(id_producto: int):
     return execute_query("""
         SELECT p.id_producto, p.descripcion, p.precio, p.stock, r.nombre_rubro
@@ -223,6 +739,36 @@ def get_clients():
     """, fetch="all")
 
 
+CLIENT_SORTS = {
+    "nombre": ("c.nombre", 1),
+    "email": ("c.email", 5),
+}
+CLIENT_FILTERS = {
+    "provincia": ("c.id_provincia = ?", _reference_id("provincia")),
+}
+
+
+def get_clients_page(page_size=DEFAULT_PAGE_SIZE, cursor=None, with_total=False, offset=None,
+                     sort=None, descending=False, filters=None):
+    """
+    Una página de clientes ordenada por `sort` (clave de CLIENT_SORTS o el id) y filtrada
+    con `filters` (claves de CLIENT_FILTERS). Devuelve (filas, cursor_siguiente, total).
+    """
+    select_sql = """
+        SELECT c.id_cliente, c.nombre, p.nombre_provincia, c.domicilio, c.telefono, c.email
+        FROM cliente AS c
+        JOIN provincia AS p ON c.id_provincia = p.id_provincia
+    """
+    order = _listing_order(CLIENT_SORTS, sort, ("c.id_cliente", 0))
+    where, params = _listing_filters(CLIENT_FILTERS, filters)
+    rows, next_cursor = _keyset_page(select_sql, order, page_size, cursor, params, where,
+                                     descending=descending, offset=offset)
+    total = None
+    if with_total:
+        total = _count(select_sql, where, params) if where else _estimate_count("cliente")
+    return rows, next_cursor, total
+
+
 def get_client_by_id(id_cliente: int):
     return execute_query("""
         SELECT c.id_cliente, c.nombre, p.nombre_provincia, c.domicilio
@@ -254,6 +800,12 @@ def create_client(nombre, id_provincia, domicilio, telefono, email):
     print(f"[OK] Cliente agregado: {nombre} (provincia id {id_provincia})")
 
 
+def get_client_id_by_name(nombre: str):
+    """Devuelve id_cliente a partir del nombre exacto del cliente (o None)."""
+    result = execute_query("SELECT id_cliente FROM cliente WHERE nombre = ?", (nombre,), fetch="one")
+    return result[0] if result else None
+
+
 def update_client(id_cliente: int, nombre: str, id_provincia: int, domicilio: str, telefono: str, email: str):
     execute_query("""
         UPDATE cliente
@@ -267,6 +819,124 @@ def delete_client(id_cliente):
     print(f"[OK] Cliente con ID {id_cliente} eliminado.")
 
 
+# --------------- Búsqueda (FTS5) ---------------
+
+SEARCH_LIMIT = 100
+# Coincidencias que se ordenan por relevancia como máximo: calcular bm25 sobre todas las
+# coincidencias de un prefijo muy común ("mo") tarda segundos con millones de filas
+SEARCH_CANDIDATES = 2000
+
+
+def _fts_query(texto):
+    """
+    Convierte lo que escribe el usuario en una consulta FTS5: cada palabra como prefijo
+    y entre comillas (así ningún carácter se interpreta como operador). "mou lógi" -> "mou"* "logi"*
+    """
+    return " ".join(f'"{token}"*' for token in re.findall(r"\w+", normalize_name(texto)))
+
+
+def search_products(query, limit=SEARCH_LIMIT):
+    """
+    Productos cuya descripción contiene palabras que empiezan con las de `query`
+    (sin distinguir mayúsculas ni tildes), ordenados por relevancia (bm25) entre las
+    primeras SEARCH_CANDIDATES coincidencias. Mismo formato de fila que get_products.
+    """
+    match = _fts_query(query)
+    if not match:
+        return []
+    return execute_query("""
+        SELECT p.id_producto, p.descripcion, p.precio, p.stock, r.nombre_rubro
+        FROM (
+            SELECT rowid AS id, rank FROM producto_fts WHERE producto_fts MATCH ? LIMIT ?
+        ) AS m
+        JOIN producto AS p ON p.id_producto = m.id
+        JOIN rubro AS r ON p.id_rubro = r.id_rubro
+        ORDER BY m.rank
+        LIMIT ?
+    """, (match, SEARCH_CANDIDATES, limit), fetch="all") or []
+
+
+def search_clients(query, limit=SEARCH_LIMIT):
+    """
+    Clientes que coinciden por nombre, email o domicilio (prefijos, sin tildes), ordenados
+    por relevancia con más peso al nombre. Mismo formato de fila que get_clients.
+    """
+    match = _fts_query(query)
+    if not match:
+        return []
+    return execute_query("""
+        SELECT c.id_cliente, c.nombre, p.nombre_provincia, c.domicilio, c.telefono, c.email
+        FROM (
+            SELECT rowid AS id, bm25(cliente_fts, 10.0, 2.0, 1.0) AS rank
+            FROM cliente_fts WHERE cliente_fts MATCH ? LIMIT ?
+        ) AS m
+        JOIN cliente AS c ON c.id_cliente = m.id
+        JOIN provincia AS p ON c.id_provincia = p.id_provincia
+        ORDER BY m.rank
+        LIMIT ?
+    """, (match, SEARCH_CANDIDATES, limit), fetch="all") or []
+
+
+# --------------- Tablas de referencia (rubro, provincia) ---------------
+
+# tabla -> (id, nombre) de las tablas chicas que se resuelven por nombre desde la UI
+_LOOKUP_SOURCES = {
+    "rubro": ("id_rubro", "nombre_rubro"),
+    "provincia": ("id_provincia", "nombre_provincia"),
+}
+_lookup_lock = threading.Lock()
+_lookups = {}  # tabla -> ([(id, nombre), ...], {nombre normalizado: id})
+
+
+def normalize_name(texto):
+    """Clave de comparación de nombres: sin tildes, sin distinguir mayúsculas y con los espacios colapsados."""
+    sin_tildes = "".join(c for c in unicodedata.normalize("NFKD", texto) if not unicodedata.combining(c))
+    return " ".join(sin_tildes.replace("_", " ").casefold().split())
+
+
+def _lookup(table):
+    """Carga la tabla de referencia una sola vez; create/update/delete_rubro la invalidan."""
+    with _lookup_lock:
+        cached = _lookups.get(table)
+    if cached is not None:
+        return cached
+
+    id_col, name_col = _LOOKUP_SOURCES[table]
+    rows = execute_query(f"SELECT {id_col}, {name_col} FROM {table} ORDER BY {id_col}", fetch="all")
+    if rows is None:
+        return [], {}  # error de base: no se cachea, se reintenta en la próxima búsqueda
+    index = {}
+    for id_, nombre in rows:
+        index.setdefault(normalize_name(nombre or ""), id_)
+    cached = (rows, index)
+    with _lookup_lock:
+        _lookups[table] = cached
+    return cached
+
+
+def _lookup_id(table, nombre):
+    if not nombre:
+        return None
+    rows, index = _lookup(table)
+    id_ = index.get(normalize_name(nombre))
+    if id_ is None:
+        print(f"[DB DEBUG] {table} '{nombre}': sin coincidencias. Disponibles: {[n for _, n in rows]}")
+    return id_
+
+
+def _lookup_names(table):
+    return [nombre for _, nombre in _lookup(table)[0]]
+
+
+def invalidate_lookups(table=None):
+    """Descarta el cache de una tabla de referencia (o de todas) para que se relea en el próximo uso."""
+    with _lookup_lock:
+        if table is None:
+            _lookups.clear()
+        else:
+            _lookups.pop(table, None)
+
+
 # --------------- Provinces ---------------
 
 def get_provincias():
@@ -275,20 +945,13 @@ def get_provincias():
 
 
 def get_provincia_id_by_name(nombre_provincia: str):
-    """Busca id_provincia por nombre (insensible a mayúsc/minúsc y espacios)."""
-    if not nombre_provincia:
-        return None
-    nombre_limpio = nombre_provincia.strip().lower()
-    result = execute_query(
-        "SELECT id_provincia FROM provincia WHERE LOWER(TRIM(nombre_provincia)) = ?",
-        (nombre_limpio,), fetch="one"
-    )
-    if not result:
-        # debug helper: listar provincias disponibles
-        disponibles = execute_query("SELECT id_provincia, nombre_provincia FROM provincia ORDER BY id_provincia", fetch="all")
-        print(f"[DB DEBUG] Provincia buscada: '{nombre_provincia}' -> normalizado '{nombre_limpio}'. Provincias en BD: {disponibles}")
-        return None
-    return result[0]
+    """Busca id_provincia por nombre (sin distinguir mayúsculas, tildes ni espacios extra)."""
+    return _lookup_id("provincia", nombre_provincia)
+
+
+def get_provincia_names():
+    """Nombres de provincia en orden de id, desde el cache de referencia."""
+    return _lookup_names("provincia")
 
 
 # --------------- Rubros ---------------
@@ -298,56 +961,106 @@ def get_rubros():
 
 
 def get_rubro_id_by_name(nombre_rubro: str):
-    """Devuelve id_rubro a partir del nombre del rubro (insensible a mayúsculas y espacios)."""
-    if not nombre_rubro:
-        return None
-    nombre_limpio = nombre_rubro.strip().lower()
-    # Usamos LOWER en la consulta para ignorar mayúsculas/minúsculas
-    result = execute_query(
-        "SELECT id_rubro FROM rubro WHERE LOWER(TRIM(nombre_rubro)) = ?",
-        (nombre_limpio,),
-        fetch="one"
-    )
-    if not result:
-        # debug: listar rubros disponibles (solo para desarrollo)
-        disponibles = execute_query("SELECT id_rubro, nombre_rubro FROM rubro ORDER BY id_rubro", fetch="all")
-        print(f"[DB DEBUG] Rubro buscado: '{nombre_rubro}' -> normalizado '{nombre_limpio}'. Rubros en BD: {disponibles}")
-        return None
-    return result[0]
+    """Devuelve id_rubro a partir del nombre del rubro (sin distinguir mayúsculas, tildes ni espacios extra)."""
+    return _lookup_id("rubro", nombre_rubro)
+
+
+def get_rubro_names():
+    """Nombres de rubro en orden de id, desde el cache de referencia."""
+    return _lookup_names("rubro")
 
 
 def create_rubro(nombre_rubro: str):
     execute_query("INSERT INTO rubro (nombre_rubro) VALUES (?)", (nombre_rubro,), commit=True)
+    invalidate_lookups("rubro")
 
 
 def update_rubro(id_rubro: int, nombre_rubro: str):
     execute_query("UPDATE rubro SET nombre_rubro = ? WHERE id_rubro = ?", (nombre_rubro, id_rubro), commit=True)
+    invalidate_lookups("rubro")
 
 
 def delete_rubro(id_rubro: int):
     execute_query("DELETE FROM rubro WHERE id_rubro = ?", (id_rubro,), commit=True)
+    invalidate_lookups("rubro")
 
 
 # --------------- Facturas ---------------
 
-def get_invoices():
+# Formatos de fecha que se aceptan al guardar y en los rangos; al guardar se escriben como
+# 'YYYY-MM-DD' (_fecha_iso), el formato que factura.fecha_dia (migraciones 010 y 014) reconoce
+FORMATOS_FECHA = ("%Y-%m-%d", "%Y/%m/%d", "%d/%m/%Y", "%d-%m-%Y", "%Y%m%d")
+_FECHA_Y_RESTO = re.compile(r"(\S+?)([ T].*)?")
+
+
+def _leer_fecha(valor):
+    """(date, resto) de una fecha en uno de FORMATOS_FECHA; resto es la hora, si la hay."""
+    if isinstance(valor, datetime):
+        return valor.date(), ""
+    if isinstance(valor, date):
+        return valor, ""
+    texto, resto = _FECHA_Y_RESTO.fullmatch(str(valor).strip()).groups()
+    for formato in FORMATOS_FECHA:
+        try:
+            return datetime.strptime(texto, formato).date(), resto or ""
+        except ValueError:
+            continue
+    raise ValueError(f"Fecha no reconocida: {str(valor).strip()!r}")
+
+
+def _fecha_dia(valor):
     """
-    Devuelve todas las facturas con el nombre del cliente y el total calculado.
-    Hace JOIN entre factura y cliente.
+    Fecha (date o texto en uno de FORMATOS_FECHA, con o sin hora) -> entero AAAAMMDD
+    como factura.fecha_dia; None si no hay. ValueError si el texto no es una fecha.
     """
-    query = """
+    if valor is None or str(valor).strip() == "":
+        return None
+    dia, _ = _leer_fecha(valor)
+    return dia.year * 10000 + dia.month * 100 + dia.day
+
+
+def _fecha_iso(valor):
+    """
+    Fecha a guardar en factura.fecha: 'YYYY-MM-DD' (más la hora, si la trae) para cualquier
+    formato de FORMATOS_FECHA, incluso con día o mes de un dígito ('4/1/2025', '2025-1-4').
+    Lo que no se reconoce como fecha se guarda tal cual.
+    """
+    if valor is None or str(valor).strip() == "":
+        return valor
+    try:
+        dia, resto = _leer_fecha(valor)
+    except ValueError:
+        return valor
+    return dia.isoformat() + resto
+
+
+def get_invoices(date_from=None, date_to=None):
+    """
+    Devuelve las facturas con el nombre del cliente y el total, opcionalmente solo las
+    del período date_from..date_to (inclusive; date o texto en FORMATOS_FECHA, cualquiera puede faltar).
+    El total es factura.monto, que mantienen los triggers de detalle_factura.
+    El período se filtra por idx_factura_fecha_dia; las facturas con fecha en un formato
+    no reconocido quedan afuera de cualquier período.
+    """
+    where, params = [], []
+    for condition, valor in (("f.fecha_dia >= ?", date_from), ("f.fecha_dia <= ?", date_to)):
+        dia = _fecha_dia(valor)
+        if dia is not None:
+            where.append(condition)
+            params.append(dia)
+
+    query = f"""
         SELECT 
             f.id_factura AS id,
             c.nombre AS cliente,
             f.fecha AS fecha,
-            COALESCE(SUM(df.cantidad * df.precio_unitario), 0) AS total
+            COALESCE(f.monto, 0) AS total
         FROM factura AS f
         JOIN cliente AS c ON f.id_cliente = c.id_cliente
-        LEFT JOIN detalle_factura AS df ON f.id_factura = df.id_factura
-        GROUP BY f.id_factura, c.nombre, f.fecha
+        {"WHERE " + " AND ".join(where) if where else ""}
         ORDER BY f.id_factura;
     """
-    rows = execute_query(query, fetch="all")
+    rows = execute_query(query, params, fetch="all") or []
 
     # Convertimos cada fila a un dict para la UI
     facturas = [
@@ -357,6 +1070,30 @@ def get_invoices():
     return facturas
 
 
+def get_invoices_page(page_size=DEFAULT_PAGE_SIZE, cursor=None, with_total=False, offset=None):
+    """
+    Una página de facturas (mismo formato de dict que get_invoices) ordenada por id.
+    Devuelve (facturas, cursor_siguiente, total_estimado).
+    """
+    rows, next_cursor = _keyset_page("""
+        SELECT f.id_factura, c.nombre, f.fecha, COALESCE(f.monto, 0)
+        FROM factura AS f
+        JOIN cliente AS c ON f.id_cliente = c.id_cliente
+    """, [("f.id_factura", 0)], page_size, cursor, offset=offset)
+    facturas = [{"id": row[0], "cliente": row[1], "fecha": row[2], "total": row[3]} for row in rows]
+    return facturas, next_cursor, _estimate_count("factura") if with_total else None
+
+
+def get_invoice_by_id(id_factura: int):
+    """Devuelve (fecha, nombre_cliente) de una factura, o None si no existe."""
+    return execute_query("""
+        SELECT f.fecha, c.nombre
+        FROM factura AS f
+        JOIN cliente AS c ON f.id_cliente = c.id_cliente
+        WHERE f.id_factura = ?
+    """, (id_factura,), fetch="one")
+
+
 def get_invoice_details(factura_id: int):
     """
     Devuelve el detalle de una factura: producto, cantidad, precio unitario, subtotal, id_producto.
@@ -390,58 +1127,71 @@ def get_invoice_details(factura_id: int):
 
 
 def get_detalles_por_factura(id_factura):
-    with sqlite3.connect(DB_NAME) as conn:
-        cursor = conn.cursor()
-        cursor.execute("""
-            SELECT 
-                p.id_producto,
-                p.descripcion AS producto_nombre,
-                df.cantidad,
-                df.precio_unitario
-            FROM detalle_factura AS df
-            JOIN producto AS p ON df.id_producto = p.id_producto
-            WHERE df.id_factura = ?
-        """, (id_factura,))
-        result = [
-            {
-                "id_producto": row[0],
-                "producto_nombre": row[1],
-                "cantidad": row[2],
-                "precio_unitario": row[3]
-            }
-            for row in cursor.fetchall()
-        ]
+    rows = execute_query("""
+        SELECT 
+            p.id_producto,
+            p.descripcion AS producto_nombre,
+            df.cantidad,
+            df.precio_unitario
+        FROM detalle_factura AS df
+        JOIN producto AS p ON df.id_producto = p.id_producto
+        WHERE df.id_factura = ?
+    """, (id_factura,), fetch="all") or []
+    result = [
+        {
+            "id_producto": row[0],
+            "producto_nombre": row[1],
+            "cantidad": row[2],
+            "precio_unitario": row[3]
+        }
+        for row in rows
+    ]
     return result
 
 
 def get_all_facturas():
-    """Obtiene todas las facturas con el total calculado y datos de cliente."""
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
-
+    """Obtiene las facturas que tienen detalle, con su total (factura.monto) y datos de cliente."""
     query = """
         SELECT 
             f.id_factura,
             c.nombre AS cliente,
             f.fecha,
-            SUM(df.cantidad * df.precio_unitario) AS total
+            f.monto AS total
         FROM factura f
         JOIN cliente c ON f.id_cliente = c.id_cliente
-        JOIN detalle_factura df ON f.id_factura = df.id_factura
-        GROUP BY f.id_factura, c.nombre, f.fecha
+        WHERE EXISTS (SELECT 1 FROM detalle_factura df WHERE df.id_factura = f.id_factura)
         ORDER BY f.fecha DESC
     """
-    cursor.execute(query)
-    data = cursor.fetchall()
-    conn.close()
-    return data
+    return execute_query(query, fetch="all") or []
+
+
+def reconcile_invoice_totals():
+    """
+    Recalcula factura.monto a partir de detalle_factura y corrige las que no coinciden
+    (bases anteriores a los triggers, cargas masivas o ediciones manuales).
+    Devuelve la cantidad de facturas corregidas.
+    """
+    with transaction() as cur:
+        cur.execute("""
+            UPDATE factura
+            SET monto = totales.total
+            FROM (
+                SELECT f.id_factura,
+                       COALESCE(SUM(df.cantidad * df.precio_unitario), 0) AS total
+                FROM factura AS f
+                LEFT JOIN detalle_factura AS df ON df.id_factura = f.id_factura
+                GROUP BY f.id_factura
+            ) AS totales
+            WHERE factura.id_factura = totales.id_factura
+              AND (factura.monto IS NULL OR ABS(factura.monto - totales.total) > 0.005)
+        """)
+        corregidas = cur.rowcount
+    print(f"[OK] Totales de facturas reconciliados: {corregidas} corregida(s).")
+    return corregidas
 
 
 def get_all_detalle_factura():
     """Obtiene todos los detalles de factura (factura, producto, cantidad, precio)."""
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
-
     query = """
         SELECT 
             df.id_factura,
@@ -452,80 +1202,275 @@ def get_all_detalle_factura():
         JOIN producto p ON df.id_producto = p.id_producto
         ORDER BY df.id_factura
     """
-    cursor.execute(query)
-    data = cursor.fetchall()
-    conn.close()
-    return data
+    return execute_query(query, fetch="all") or []
 
 
+def _agrupar_items(items):
+    """Une líneas repetidas del mismo producto: [(id_producto, cantidad, precio_unitario), ...]."""
+    lineas = {}
+    for id_producto, cantidad, precio_unitario in items:
+        if id_producto in lineas:
+            lineas[id_producto][0] += cantidad
+        else:
+            lineas[id_producto] = [cantidad, precio_unitario]
+    return [(id_producto, cant, precio) for id_producto, (cant, precio) in lineas.items()]
 
-# --------------- Invoice Products Operations ---------------
 
-def add_invoice_product(id_factura: int, id_producto: int, cantidad: int, precio_unitario: float):
-    try:
-        # Verificar stock disponible
-        stock_actual = execute_query(
-            "SELECT stock FROM producto WHERE id_producto = ?", 
-            (id_producto,), fetch=True
+class StockInsuficiente(Exception):
+    """
+    Alguna línea pide más unidades de las que hay en stock (o el producto no existe).
+    faltantes: [(id_producto, descripcion, pedido, disponible)], descripcion None si no existe.
+    """
+
+    def __init__(self, faltantes):
+        self.faltantes = faltantes
+        detalle = ", ".join(
+            f"{descripcion} (pedido {pedido}, disponible {disponible})" if descripcion is not None
+            else f"producto {id_producto} inexistente"
+            for id_producto, descripcion, pedido, disponible in faltantes
         )
-        if not stock_actual:
-            print(f"[DB ERROR] Producto {id_producto} no existe.")
-            return
+        super().__init__(f"Stock insuficiente: {detalle}")
 
-        stock_disponible = stock_actual[0][0]
-        if cantidad > stock_disponible:
-            print(f"[ERROR] Stock insuficiente. Disponible: {stock_disponible}, solicitado: {cantidad}")
-            return
 
-        # Insertar detalle
-        execute_query("""
-            INSERT INTO detalle_factura (id_factura, id_producto, cantidad, precio_unitario)
-            VALUES (?, ?, ?, ?)
-        """, (id_factura, id_producto, cantidad, precio_unitario))
+def _reservar_stock(cursor, items):
+    """
+    Descuenta el stock de todas las líneas con un único UPDATE condicional (solo donde
+    stock >= pedido). Si alguna no se pudo descontar lanza StockInsuficiente; quien llama
+    está dentro de db.transaction(), que revierte también las líneas que sí se descontaron.
+    Como la condición se evalúa en la misma sentencia que escribe, dos terminales que venden
+    el mismo producto a la vez nunca lo dejan en negativo.
+    """
+    pedidos = {}
+    for id_producto, cantidad, *_ in items:
+        pedidos[id_producto] = pedidos.get(id_producto, 0) + cantidad
+    if not pedidos:
+        return
 
-        # Actualizar stock
-        execute_query("""
+    cursor.execute("""
+        UPDATE producto
+        SET stock = stock - r.cantidad
+        FROM (
+            SELECT json_extract(value, '$[0]') AS id_producto, json_extract(value, '$[1]') AS cantidad
+            FROM json_each(?)
+        ) AS r
+        WHERE producto.id_producto = r.id_producto AND producto.stock >= r.cantidad
+        RETURNING producto.id_producto
+    """, (json.dumps(list(pedidos.items())),))
+    reservados = {row[0] for row in cursor.fetchall()}
+    if len(reservados) == len(pedidos):
+        return
+
+    cortos = [id_producto for id_producto in pedidos if id_producto not in reservados]
+    existentes = {
+        row[0]: (row[1], row[2]) for row in cursor.execute(
+            f"SELECT id_producto, descripcion, stock FROM producto WHERE id_producto IN ({', '.join('?' * len(cortos))})",
+            cortos
+        )
+    }
+    faltantes = []
+    for id_producto in cortos:
+        descripcion, disponible = existentes.get(id_producto, (None, 0))
+        faltantes.append((id_producto, descripcion, pedidos[id_producto], disponible))
+    raise StockInsuficiente(faltantes)
+
+
+def _insertar_detalles(cursor, id_factura, items):
+    """Reserva el stock de todas las líneas (ver _reservar_stock) y las inserta."""
+    lineas = _agrupar_items(items)
+    _reservar_stock(cursor, lineas)
+    cursor.executemany(
+        "INSERT INTO detalle_factura (id_factura, id_producto, cantidad, precio_unitario) VALUES (?, ?, ?, ?)",
+        [(id_factura, id_producto, cantidad, precio) for id_producto, cantidad, precio in lineas]
+    )
+
+
+def create_invoice(cliente_id: int, fecha: str, items):
+    """
+    Crea una factura completa en una única transacción.
+    items: iterable de (id_producto, cantidad, precio_unitario).
+    Devuelve el id de la factura; si algo falla se revierte todo y se relanza el error
+    (StockInsuficiente si alguna línea no tiene stock).
+    """
+    with transaction() as cur:
+        cur.execute(
+            "INSERT INTO factura (id_cliente, fecha) VALUES (?, ?) RETURNING id_factura",
+            (cliente_id, _fecha_iso(fecha))
+        )
+        id_factura = cur.fetchone()[0]
+        _insertar_detalles(cur, id_factura, items)
+    return id_factura
+
+
+def update_invoice(id_factura: int, cliente_id: int, fecha: str, items):
+    """
+    Reemplaza cabecera y detalle de una factura en una única transacción,
+    devolviendo al stock las cantidades anteriores antes de descontar las nuevas.
+    Si alguna línea nueva no tiene stock lanza StockInsuficiente y la factura queda como estaba.
+    """
+    with transaction() as cur:
+        cur.execute("""
             UPDATE producto
-            SET stock = stock - ?
-            WHERE id_producto = ?
-        """, (cantidad, id_producto))
+            SET stock = stock + (
+                SELECT df.cantidad FROM detalle_factura AS df
+                WHERE df.id_factura = ? AND df.id_producto = producto.id_producto
+            )
+            WHERE id_producto IN (SELECT id_producto FROM detalle_factura WHERE id_factura = ?)
+        """, (id_factura, id_factura))
+        cur.execute(
+            "UPDATE factura SET id_cliente = ?, fecha = ? WHERE id_factura = ?",
+            (cliente_id, _fecha_iso(fecha), id_factura)
+        )
+        cur.execute("DELETE FROM detalle_factura WHERE id_factura = ?", (id_factura,))
+        _insertar_detalles(cur, id_factura, items)
+    return id_factura
 
-        print(f"[OK] Producto {id_producto} agregado a factura {id_factura}. Stock actualizado (-{cantidad}).")
 
-    except Exception as e:
+
+# --------------- Invoice Products Operations ---------------
+
+def add_invoice_product(id_factura: int, id_producto: int, cantidad: int, precio_unitario: float):
+    """
+    Agrega un producto a una factura (o suma la cantidad si ya estaba) descontando el stock
+    en la misma transacción. Devuelve True si se agregó.
+    """
+    try:
+        with transaction() as cur:
+            _reservar_stock(cur, [(id_producto, cantidad)])
+            cur.execute("""
+                INSERT INTO detalle_factura (id_factura, id_producto, cantidad, precio_unitario)
+                VALUES (?, ?, ?, ?)
+                ON CONFLICT (id_factura, id_producto) DO UPDATE SET cantidad = cantidad + excluded.cantidad
+            """, (id_factura, id_producto, cantidad, precio_unitario))
+    except StockInsuficiente as e:
+        print(f"[ERROR] {e}")
+        return False
+    except sqlite3.Error as e:
         print(f"[DB ERROR] No se pudo agregar producto a factura: {e}")
+        return False
+
+    print(f"[OK] Producto {id_producto} agregado a factura {id_factura}. Stock actualizado (-{cantidad}).")
+    return True
 
 
 def delete_invoice_product(id_factura: int, id_producto: int):
     """
-    Elimina un producto del detalle de una factura y restaura el stock.
+    Elimina un producto del detalle de una factura y restaura el stock, en una sola transacción.
     """
     try:
-        # Obtener la cantidad eliminada
-        result = execute_query("""
-            SELECT cantidad FROM detalle_factura
-            WHERE id_factura = ? AND id_producto = ?
-        """, (id_factura, id_producto), fetch=True)
-
-        if result and result[0]:
-            cantidad_eliminada = result[0][0]
-        else:
-            cantidad_eliminada = 0
+        with transaction() as cur:
+            cur.execute("""
+                DELETE FROM detalle_factura
+                WHERE id_factura = ? AND id_producto = ?
+                RETURNING cantidad
+            """, (id_factura, id_producto))
+            row = cur.fetchone()
+            cantidad_eliminada = row[0] if row else 0
+            if row:
+                cur.execute(
+                    "UPDATE producto SET stock = stock + ? WHERE id_producto = ?",
+                    (cantidad_eliminada, id_producto)
+                )
+    except sqlite3.Error as e:
+        print(f"[DB ERROR] No se pudo eliminar producto de factura: {e}")
+        return
 
-        # Borrar detalle
-        execute_query("""
-            DELETE FROM detalle_factura
-            WHERE id_factura = ? AND id_producto = ?
-        """, (id_factura, id_producto))
+    print(f"[OK] Producto {id_producto} eliminado de factura {id_factura}. Stock restaurado (+{cantidad_eliminada}).")
 
-        # Restaurar stock
-        execute_query("""
-            UPDATE producto
-            SET stock = stock + ?
-            WHERE id_producto = ?
-        """, (cantidad_eliminada, id_producto))
 
-        print(f"[OK] Producto {id_producto} eliminado de factura {id_factura}. Stock restaurado (+{cantidad_eliminada}).")
+# --------------- Resúmenes de ventas (migraciones 009 y 013) ---------------
 
-    except Exception as e:
-        print(f"[DB ERROR] No se pudo eliminar producto de factura: {e}")
\ No newline at end of file
+# Tablas de resumen y la consulta que calcula su contenido desde el detalle.
+# venta_diaria_rubro se arma a partir de venta_diaria ya reconstruida.
+SALES_ROLLUPS = {
+    "venta_diaria": (
+        ("dia", "id_producto", "id_provincia", "id_sucursal"),
+        """
+        SELECT k.dia, df.id_producto, k.id_provincia, k.id_sucursal, COALESCE(p.id_rubro, 0) AS id_rubro,
+               SUM(df.cantidad) AS unidades, SUM(df.cantidad * df.precio_unitario) AS importe, COUNT(*) AS lineas
+        FROM detalle_factura AS df
+        JOIN venta_clave AS k ON k.id_factura = df.id_factura
+        LEFT JOIN producto AS p ON p.id_producto = df.id_producto
+        GROUP BY k.dia, df.id_producto, k.id_provincia, k.id_sucursal
+        """,
+    ),
+    "venta_diaria_rubro": (
+        ("dia", "id_rubro", "id_provincia", "id_sucursal"),
+        """
+        SELECT k.dia, COALESCE(p.id_rubro, 0) AS id_rubro, k.id_provincia, k.id_sucursal,
+               SUM(df.cantidad) AS unidades, SUM(df.cantidad * df.precio_unitario) AS importe, COUNT(*) AS lineas
+        FROM detalle_factura AS df
+        JOIN venta_clave AS k ON k.id_factura = df.id_factura
+        LEFT JOIN producto AS p ON p.id_producto = df.id_producto
+        GROUP BY k.dia, COALESCE(p.id_rubro, 0), k.id_provincia, k.id_sucursal
+        """,
+    ),
+}
+
+
+def rebuild_sales_rollup():
+    """
+    Recalcula por completo venta_diaria y venta_diaria_rubro desde detalle_factura,
+    en una única transacción y sin disparar los triggers de mantenimiento.
+    Devuelve {tabla: filas}.
+    """
+    filas = {}
+    with transaction() as cur:
+        pausado = cur.execute("SELECT 1 FROM cambios_pausa").fetchone()
+        if not pausado:
+            cur.execute("INSERT INTO cambios_pausa (id) VALUES (1)")
+        cur.execute("DELETE FROM venta_diaria")
+        cur.execute("DELETE FROM venta_diaria_rubro")
+        cur.execute(f"""
+            INSERT INTO venta_diaria (dia, id_producto, id_provincia, id_sucursal, id_rubro, unidades, importe, lineas)
+            {SALES_ROLLUPS["venta_diaria"][1]}
+        """)
+        filas["venta_diaria"] = cur.rowcount
+        cur.execute("""
+            INSERT INTO venta_diaria_rubro (dia, id_rubro, id_provincia, id_sucursal, unidades, importe, lineas)
+            SELECT dia, id_rubro, id_provincia, id_sucursal, SUM(unidades), SUM(importe), SUM(lineas)
+            FROM venta_diaria
+            GROUP BY dia, id_rubro, id_provincia, id_sucursal
+        """)
+        filas["venta_diaria_rubro"] = cur.rowcount
+        if not pausado:
+            cur.execute("DELETE FROM cambios_pausa")
+    print(f"[OK] Resúmenes de ventas reconstruidos: "
+          f"{filas['venta_diaria']} fila(s) por producto, {filas['venta_diaria_rubro']} por rubro.")
+    return filas
+
+
+def check_sales_rollup(muestra=5):
+    """
+    Compara los resúmenes con lo que da el detalle y devuelve {tabla: filas distintas}
+    (faltantes, sobrantes o con otros totales; importes con tolerancia de medio centavo).
+    Imprime hasta 'muestra' claves distintas de cada tabla.
+    """
+    diferencias = {}
+    with read_only():
+        for tabla, (clave, esperado_sql) in SALES_ROLLUPS.items():
+            # el rubro de venta_diaria depende del producto: si no coincide aparece como
+            # una fila faltante y otra sobrante
+            columnas = ", ".join(clave + (("id_rubro",) if tabla == "venta_diaria" else ()))
+            # esperado con signo + y resumen con signo -: lo que no se anula es una diferencia
+            query = f"""
+                SELECT {columnas},
+                       CASE SUM(n) WHEN 1 THEN 'faltante' WHEN -1 THEN 'sobrante' ELSE 'distinta' END
+                FROM (
+                    SELECT {columnas}, unidades, importe, lineas, 1 AS n FROM ({esperado_sql})
+                    UNION ALL
+                    SELECT {columnas}, -unidades, -importe, -lineas, -1 FROM {tabla}
+                )
+                GROUP BY {columnas}
+                HAVING SUM(n) != 0 OR SUM(unidades) != 0 OR SUM(lineas) != 0 OR ABS(SUM(importe)) > 0.005
+            """
+            filas = execute_query(query, fetch="all")
+            if filas is None:
+                raise sqlite3.OperationalError(f"No se pudo verificar {tabla}.")
+            diferencias[tabla] = len(filas)
+            if filas:
+                print(f"[DB WARN] {tabla}: {len(filas)} fila(s) no coinciden con el detalle ({columnas}):")
+                for fila in filas[:muestra]:
+                    print(f"    {fila}")
+            else:
+                print(f"[OK] {tabla} coincide con el detalle.")
+    return diferencias
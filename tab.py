@@ -1,13 +1,134 @@
 import customtkinter as ctk
+from bisect import bisect_left
+from collections import OrderedDict
 from tkinter import ttk, messagebox
 import repository as db 
-from provincia import Provincia
+from loader import BackgroundLoader
+import ui_profiler
+
+
+def _display_values(row):
+    # Convertimos solo None a ""
+    return tuple(str(r) if r is not None else "" for r in row)
+
+
+class TreeSync:
+    """
+    Mantiene un Treeview alineado con filas identificadas por su PK (iid = str(id)) tocando
+    solo los items que cambiaron, así la selección y la posición del scroll se conservan.
+    Las filas se muestran ordenadas por id, como las devuelve el repositorio.
+    """
+
+    def __init__(self, tree, key=lambda row: row[0], values=_display_values, striped=True):
+        self.tree = tree
+        self.key = key
+        self.values = values
+        self.striped = striped
+        self._keys = []    # ids mostrados, en orden
+        self._shown = {}   # id -> (valores, tags) mostrados
+
+    def _tags(self, position):
+        if not self.striped:
+            return ()
+        return ("even" if position % 2 == 0 else "odd",)
+
+    def _show(self, index, key, values, position=None):
+        """Inserta o actualiza la fila en el índice `index`; solo llama a Tk si algo cambió."""
+        shown = (values, self._tags(index if position is None else position))
+        if key not in self._shown:
+            self.tree.insert("", index, iid=str(key), values=shown[0], tags=shown[1])
+        elif self._shown[key] != shown:
+            self.tree.item(str(key), values=shown[0], tags=shown[1])
+        self._shown[key] = shown
+
+    def replace(self, rows, start=0):
+        """
+        Deja en la tabla exactamente `rows`. start es la posición absoluta de la primera
+        fila (modo virtual) para que los colores alternados no cambien al desplazarse.
+        """
+        rows = rows or []
+        with ui_profiler.phase("armado"):
+            # claves y textos a mostrar, antes de tocar el Treeview
+            keys = [self.key(row) for row in rows]
+            values = [self.values(row) for row in rows]
+        wanted = set(keys)
+        kept = [key for key in self._keys if key in wanted]
+        if kept != [key for key in keys if key in self._shown]:
+            # otro orden (p. ej. resultados de búsqueda por relevancia): se rearma la tabla
+            kept = []
+        stale = [key for key in self._keys if key not in kept]
+        if stale:
+            self.tree.delete(*(str(key) for key in stale))
+            for key in stale:
+                del self._shown[key]
+        # las que quedan conservan su orden relativo: recorriendo en orden, cada fila
+        # existente ya está en su índice y cada nueva se inserta en el suyo
+        for index, (key, shown) in enumerate(zip(keys, values)):
+            self._show(index, key, shown, start + index)
+        self._keys = keys
+
+    def apply(self, changed_rows, deleted_keys):
+        """Aplica un delta (filas nuevas o modificadas y ids borrados) sin releer el resto."""
+        first_moved = len(self._keys)
+        for key in deleted_keys:
+            if key in self._shown:
+                position = bisect_left(self._keys, key)
+                del self._keys[position]
+                del self._shown[key]
+                self.tree.delete(str(key))
+                first_moved = min(first_moved, position)
+
+        with ui_profiler.phase("armado"):
+            changed = [(self.key(row), self.values(row)) for row in changed_rows]
+        for key, values in changed:
+            position = bisect_left(self._keys, key)
+            if key not in self._shown:
+                self._keys.insert(position, key)
+                first_moved = min(first_moved, position + 1)
+            self._show(position, key, values)
+
+        # las filas que se corrieron de lugar cambian de color alternado
+        if self.striped:
+            for position in range(first_moved, len(self._keys)):
+                key = self._keys[position]
+                values, tags = self._shown[key]
+                if tags != self._tags(position):
+                    self.tree.item(str(key), tags=self._tags(position))
+                    self._shown[key] = (values, self._tags(position))
 
 
 class EntityTab:
-    """Generic tab handler for CRUD operations on any entity (Product, Client, etc.)"""
-    def __init__(self, parent, title, columns, get_all_fn, create_fn, update_fn, delete_fn, form_fields, dropdowns=None):
+    """
+    Generic tab handler for CRUD operations on any entity (Product, Client, etc.)
+
+    Si se pasa page_fn (p. ej. db.get_products_page) la tabla funciona en modo virtual:
+    el Treeview solo contiene las filas visibles y los bloques se piden al repositorio
+    a medida que se desplaza, con la barra de desplazamiento escalada al total de filas.
+
+    Todas las consultas de lectura corren en segundo plano (ver loader.BackgroundLoader);
+    mientras hay una pendiente la pestaña muestra "Cargando...".
+
+    Con changes_fn (p. ej. partial(db.get_changes_since, "producto")) cada refresh pide solo
+    las filas que cambiaron desde el anterior y actualiza esos items en el lugar.
+
+    Con search_fn (p. ej. db.search_products) se agrega un campo de búsqueda: mientras tiene
+    texto la tabla muestra los resultados ordenados por relevancia en lugar del listado.
+
+    En modo virtual, sort_columns ({encabezado: clave de orden del repositorio}) hace que esos
+    encabezados ordenen al hacer clic (otro clic invierte el sentido) y filter_fields
+    ({etiqueta: (clave de filtro, float | int | "rubro" | "provincia")}) agrega una barra de
+    filtros. Orden y filtros se resuelven en SQL y se pasan a page_fn en cada bloque.
+    """
+    ROW_HEIGHT = 25       # igual al rowheight del estilo "Treeview" de ui.App
+    BLOCK_SIZE = 100      # filas por pedido al repositorio
+    MAX_BLOCKS = 8        # bloques que se mantienen en memoria (LRU)
+    SEARCH_DELAY_MS = 250 # espera desde la última tecla antes de buscar
+
+    def __init__(self, parent, title, columns, get_all_fn, create_fn, update_fn, delete_fn, form_fields,
+                 dropdowns=None, page_fn=None, changes_fn=None, search_fn=None,
+                 sort_columns=None, filter_fields=None):
         self.parent = parent
+        self.title = title
         self.tab = parent.tab_view.tab(title) if hasattr(parent, "tab_view") else parent
         self.columns = columns
         self.get_all_fn = get_all_fn
@@ -16,7 +137,33 @@ class EntityTab:
         self.delete_fn = delete_fn
         self.form_fields = form_fields
         self.dropdowns = dropdowns or {}
+        self.page_fn = page_fn
+        self.changes_fn = changes_fn
+        self.search_fn = search_fn
+        self._search_text = ""
+        self._search_job = None
+        self.sort_columns = (sort_columns or {}) if page_fn else {}
+        self.filter_fields = (filter_fields or {}) if page_fn else {}
+        self._sort = None
+        self._descending = False
+        self._filters = {}
+        self._filter_widgets = {}
+        self._version = None           # versión de datos mostrada (ver db.get_changes_since)
         self.tree = None
+        self.rows = None
+        self.scrollbar = None
+
+        # estado del modo virtual
+        self._total = 0
+        self._offset = 0
+        self._visible_rows = 15
+        self._blocks = OrderedDict()   # índice de bloque -> filas
+        self._block_cursors = {0: None}  # índice de bloque -> cursor para pedirlo por keyset
+        self._selected_id = None
+        self._generation = 0           # se incrementa en cada refresh: descarta bloques viejos
+        self._pending_blocks = set()
+
+        self.loader = BackgroundLoader(self.tab, on_busy=self._set_loading)
         self._setup_ui()
 
     def _setup_ui(self):
@@ -34,38 +181,390 @@ class EntityTab:
     
         refresh_btn = ctk.CTkButton(btn_frame, text="🔄 Actualizar", command=self._refresh)
         refresh_btn.pack(side="left", padx=5)
+
+        if self.search_fn:
+            self.search_entry = ctk.CTkEntry(btn_frame, placeholder_text="🔍 Buscar...", width=200)
+            self.search_entry.pack(side="left", padx=5)
+            self.search_entry.bind("<KeyRelease>", self._on_search_key)
+
+        self.loading_label = ctk.CTkLabel(btn_frame, text="", width=110)
+        self.loading_label.pack(side="left", padx=5)
+
+        if self.filter_fields:
+            self._setup_filters()
     
         # 🔹 Solo un frame para el Treeview
         tree_frame = ctk.CTkFrame(self.tab)
         tree_frame.pack(expand=True, fill="both", padx=40, pady=20)
     
         # 🔹 Y solo una instancia del Treeview
-        self.tree = ttk.Treeview(tree_frame, columns=self.columns, show="headings", height=15)
+        self.tree = ttk.Treeview(tree_frame, columns=self.columns, show="headings", height=self._visible_rows)
+        if self.page_fn:
+            self.scrollbar = ttk.Scrollbar(tree_frame, orient="vertical", command=self._on_scrollbar)
+            self.scrollbar.pack(side="right", fill="y")
         self.tree.pack(expand=True, fill="both")
     
         # Configuración de columnas
         for col in self.columns:
-            self.tree.heading(col, text=col)
+            if col in self.sort_columns:
+                self.tree.heading(col, text=col, command=lambda c=col: self._on_heading(c))
+            else:
+                self.tree.heading(col, text=col)
             self.tree.column(col, width=120, anchor="center")
+
+        # tags y eventos se configuran una sola vez (no en cada refresh)
+        self.rows = TreeSync(self.tree)
+        self.tree.tag_configure("even", background="#968787")
+        self.tree.tag_configure("odd", background="#6f8ea2")
+        self.tree.bind("<Double-1>", self._on_double_click)
+
+        if self.page_fn:
+            self.tree.bind("<<TreeviewSelect>>", self._on_select)
+            self.tree.bind("<Configure>", self._on_resize)
+            self.tree.bind("<MouseWheel>", self._on_mousewheel)
+            self.tree.bind("<Button-4>", lambda e: self._scroll_to(self._offset - 3))
+            self.tree.bind("<Button-5>", lambda e: self._scroll_to(self._offset + 3))
+            self.tree.bind("<Prior>", lambda e: self._scroll_to(self._offset - self._visible_rows))
+            self.tree.bind("<Next>", lambda e: self._scroll_to(self._offset + self._visible_rows))
     
         self._refresh()
 
+    @ui_profiler.profiled("EntityTab._refresh", label="title")
     def _refresh(self):
-        self.tree.delete(*self.tree.get_children())  # limpia
-        rows = self.get_all_fn()  # devuelve lista de tuplas (ID, col1, col2,...)
+        if self._search_text:
+            self._run_search()
+            return
+        if self.filter_fields:
+            self._refresh_filter_options()
+        if self.page_fn:
+            self._refresh_virtual()
+            return
 
-        if not rows:
+        # la consulta corre en un worker; el resultado se aplica luego en el hilo de Tk
+        if self.changes_fn is None:
+            self.loader.submit("rows", self.get_all_fn, self.rows.replace)
             return
+        version = self._version
+        self.loader.submit("rows", lambda: self._fetch_changes(version), self._apply_changes)
+
+    def _fetch_changes(self, version):
+        """(En el worker) Delta desde `version`, o el listado completo si no se puede calcular."""
+        new_version, rows, deleted = self.changes_fn(version)
+        if rows is None:
+            return new_version, self.get_all_fn(), None
+        return new_version, rows, deleted
+
+    def _apply_changes(self, result):
+        version, rows, deleted = result
+        if deleted is None:
+            self.rows.replace(rows)
+        else:
+            self.rows.apply(rows, deleted)
+        self._version = version
+
+    def _set_loading(self, busy):
+        self.loading_label.configure(text="⏳ Cargando..." if busy else "")
+
+    # =====================
+    # ORDEN Y FILTROS
+    # =====================
+
+    def _setup_filters(self):
+        filter_frame = ctk.CTkFrame(self.tab)
+        filter_frame.pack(pady=(0, 5))
+
+        for label, (_, kind) in self.filter_fields.items():
+            ctk.CTkLabel(filter_frame, text=f"{label}:").pack(side="left", padx=(8, 2))
+            if kind in ("rubro", "provincia"):
+                widget = ctk.CTkComboBox(filter_frame, values=[""], width=150, state="readonly")
+                widget.set("")
+            else:
+                widget = ctk.CTkEntry(filter_frame, width=80)
+            widget.pack(side="left", padx=2)
+            self._filter_widgets[label] = widget
+        self._refresh_filter_options()
+
+        ctk.CTkButton(filter_frame, text="Filtrar", width=70, command=self._apply_filters).pack(side="left", padx=5)
+        ctk.CTkButton(filter_frame, text="Limpiar", width=70, command=self._clear_filters).pack(side="left", padx=5)
+
+    def _refresh_filter_options(self):
+        # los nombres salen del cache de referencia del repositorio (no consultan la base)
+        names = {"rubro": db.get_rubro_names, "provincia": db.get_provincia_names}
+        for label, (_, kind) in self.filter_fields.items():
+            if kind in names:
+                self._filter_widgets[label].configure(values=[""] + names[kind]())
+
+    def _apply_filters(self):
+        filters = {}
+        for label, (key, kind) in self.filter_fields.items():
+            value = self._filter_widgets[label].get().strip()
+            if not value:
+                continue
+            if kind in (int, float):
+                try:
+                    value = kind(value)
+                except ValueError:
+                    messagebox.showerror("Error", f"El filtro {label} debe ser un número")
+                    return
+            filters[key] = value
+        self._filters = filters
+        self._restart_listing()
+
+    def _clear_filters(self):
+        for label, widget in self._filter_widgets.items():
+            if isinstance(widget, ctk.CTkComboBox):
+                widget.set("")
+            else:
+                widget.delete(0, "end")
+        self._filters = {}
+        self._restart_listing()
+
+    def _on_heading(self, col):
+        key = self.sort_columns[col]
+        if self._sort == key:
+            self._descending = not self._descending
+        else:
+            self._sort, self._descending = key, False
+        for c in self.sort_columns:
+            arrow = (" ▼" if self._descending else " ▲") if c == col else ""
+            self.tree.heading(c, text=c + arrow)
+        self._restart_listing()
+
+    def _restart_listing(self):
+        """Con otro orden o filtro los bloques y cursores cacheados ya no valen: se vuelve al principio."""
+        self._blocks.clear()
+        self._block_cursors = {0: None}
+        self._offset = 0
+        self._version = None
+        self._refresh()
 
-        for i, row in enumerate(rows):
-            # Convertimos solo None a ""
-            display_row = [str(r) if r is not None else "" for r in row]
-            tag = "even" if i % 2 == 0 else "odd"
-            self.tree.insert("", "end", values=display_row, tags=(tag,))
+    def _page_request(self, cursor=None, **kwargs):
+        """Función para el worker que pide un bloque con el orden y los filtros actuales."""
+        if self._sort:
+            kwargs.update(sort=self._sort, descending=self._descending)
+        if self._filters:
+            kwargs["filters"] = dict(self._filters)
+        return lambda: self.page_fn(self.BLOCK_SIZE, cursor, **kwargs)
+
+    def _on_load_error(self, error):
+        messagebox.showerror("Error", f"No se pudieron cargar los datos: {error}")
+
+    # =====================
+    # BÚSQUEDA
+    # =====================
+
+    def _on_search_key(self, event):
+        # debounce: solo se busca cuando se deja de escribir por SEARCH_DELAY_MS
+        if self._search_job is not None:
+            self.tab.after_cancel(self._search_job)
+        self._search_job = self.tab.after(self.SEARCH_DELAY_MS, self._apply_search)
+
+    def _apply_search(self):
+        self._search_job = None
+        text = self.search_entry.get().strip()
+        if text == self._search_text:
+            return
+        self._search_text = text
+        if not text:
+            # vuelve al listado: se relee completo y se compara contra los resultados mostrados
+            self.loader.cancel("search")
+            self._version = None
+        self._refresh()
 
-        self.tree.tag_configure("even", background="#968787")
-        self.tree.tag_configure("odd", background="#6f8ea2")
-        self.tree.bind("<Double-1>", self._on_double_click)
+    def _run_search(self):
+        # descarta lo que el listado tenga en camino (filas, bloques del modo virtual)
+        self._generation += 1
+        self.loader.cancel("rows")
+        text = self._search_text
+        self.loader.submit("search", lambda: self.search_fn(text), self._show_search_results)
+
+    def _show_search_results(self, rows):
+        if not self._search_text:
+            return
+        self.rows.replace(rows)
+        if self.scrollbar is not None:
+            self.scrollbar.set(0.0, 1.0)
+
+    # =====================
+    # MODO VIRTUAL
+    # =====================
+
+    def _refresh_virtual(self):
+        """
+        Si solo se modificaron filas ya cacheadas, las corrige en el lugar; si hubo altas o
+        bajas pide de nuevo el total y el primer bloque (los bloques viejos se descartan al llegar).
+        """
+        self._generation += 1
+        generation = self._generation
+        for index in self._pending_blocks:
+            self.loader.cancel(f"block-{index}")
+        self._pending_blocks.clear()
+
+        if self.changes_fn is None:
+            self._reload_virtual(generation, None)
+            return
+        version = self._version
+        self.loader.submit(
+            "refresh",
+            lambda: self.changes_fn(version),
+            lambda result: self._on_virtual_changes(generation, result),
+        )
+
+    def _on_virtual_changes(self, generation, result):
+        if generation != self._generation:
+            return
+        version, rows, deleted = result
+        # con otro orden o con filtros una fila editada puede cambiar de lugar o dejar de coincidir
+        sorted_or_filtered = self._sort not in (None, "id") or self._filters
+        if rows is not None and not deleted and not sorted_or_filtered and self._patch_blocks(rows):
+            self._version = version
+            self._scroll_to(self._offset)
+        else:
+            self._reload_virtual(generation, version)
+
+    def _patch_blocks(self, rows):
+        """Reemplaza en los bloques cacheados las filas modificadas. False si alguna no está cacheada."""
+        cached = {}
+        for block in self._blocks.values():
+            for position, row in enumerate(block):
+                cached[row[0]] = (block, position)
+        if any(row[0] not in cached for row in rows):
+            return False
+        for row in rows:
+            block, position = cached[row[0]]
+            block[position] = row
+        return True
+
+    def _reload_virtual(self, generation, version):
+        self.loader.submit(
+            "refresh",
+            self._page_request(with_total=True),
+            lambda result: self._on_first_block(generation, version, result),
+            self._on_load_error,
+        )
+
+    def _on_first_block(self, generation, version, result):
+        if generation != self._generation:
+            return
+        self._version = version
+        rows, next_cursor, total = result
+        self._blocks.clear()
+        self._block_cursors = {0: None}
+        self._store_block(0, rows, next_cursor)
+        if next_cursor is not None:
+            self._total = max(total or 0, len(rows))
+        self._scroll_to(self._offset)
+
+    def _store_block(self, index, rows, next_cursor):
+        self._blocks[index] = rows
+        self._blocks.move_to_end(index)
+        while len(self._blocks) > self.MAX_BLOCKS:
+            self._blocks.popitem(last=False)
+        if next_cursor is not None:
+            self._block_cursors[index + 1] = next_cursor
+        else:
+            # última página: ahora conocemos el total exacto
+            self._total = index * self.BLOCK_SIZE + len(rows)
+
+    def _get_block(self, index):
+        """Devuelve el bloque si está cacheado; si no, lo pide en segundo plano y devuelve None."""
+        if index in self._blocks:
+            self._blocks.move_to_end(index)
+            return self._blocks[index]
+        self._request_block(index)
+        return None
+
+    def _request_block(self, index):
+        if index in self._pending_blocks:
+            return
+        self._pending_blocks.add(index)
+        generation = self._generation
+
+        if index in self._block_cursors:
+            cursor = self._block_cursors[index]
+            fetch = self._page_request(cursor)
+        else:
+            # salto a una zona no visitada (p. ej. arrastrando la barra)
+            fetch = self._page_request(offset=index * self.BLOCK_SIZE)
+
+        self.loader.submit(
+            f"block-{index}",
+            fetch,
+            lambda result: self._on_block(generation, index, result),
+            lambda error: self._pending_blocks.discard(index),
+        )
+
+    def _on_block(self, generation, index, result):
+        if generation != self._generation:
+            return
+        self._pending_blocks.discard(index)
+        rows, next_cursor, _ = result
+        self._store_block(index, rows, next_cursor)
+        self._scroll_to(self._offset)
+
+    def _window_rows(self, start, count):
+        """Devuelve (filas, completo); completo es False si falta algún bloque todavía en camino."""
+        rows = []
+        index = start // self.BLOCK_SIZE
+        skip = start % self.BLOCK_SIZE
+        while len(rows) < count and index * self.BLOCK_SIZE < self._total:
+            block = self._get_block(index)
+            if block is None:
+                return rows, False
+            if not block:
+                break
+            rows.extend(block[skip:skip + count - len(rows)])
+            skip = 0
+            index += 1
+        return rows, True
+
+    def _scroll_to(self, offset):
+        if self._search_text:
+            return None  # con resultados de búsqueda el Treeview se desplaza solo
+        offset = max(0, min(int(offset), max(0, self._total - self._visible_rows)))
+        self._offset = offset
+        rows, complete = self._window_rows(offset, self._visible_rows)
+        if not complete:
+            # la ventana se dibuja cuando llegue el bloque (_on_block); mientras, solo se mueve la barra
+            self._set_scrollbar(offset)
+            return "break"
+        if len(rows) < self._visible_rows and offset > max(0, self._total - self._visible_rows):
+            # el total estimado era mayor que el real: reubicar la ventana al final
+            return self._scroll_to(self._total - self._visible_rows)
+
+        self.rows.replace(rows, start=offset)
+        if self._selected_id is not None and self.tree.exists(self._selected_id):
+            self.tree.selection_set(self._selected_id)
+
+        self._set_scrollbar(offset)
+        return "break"
+
+    def _set_scrollbar(self, offset):
+        if self._total:
+            self.scrollbar.set(offset / self._total, min(1.0, (offset + self._visible_rows) / self._total))
+        else:
+            self.scrollbar.set(0.0, 1.0)
+
+    def _on_scrollbar(self, action, value, unit=None):
+        if action == "moveto":
+            self._scroll_to(float(value) * self._total)
+        elif action == "scroll":
+            step = self._visible_rows if unit == "pages" else 1
+            self._scroll_to(self._offset + int(value) * step)
+
+    def _on_mousewheel(self, event):
+        return self._scroll_to(self._offset - (3 if event.delta > 0 else -3))
+
+    def _on_resize(self, event):
+        visible = max(1, (event.height - self.ROW_HEIGHT) // self.ROW_HEIGHT)
+        if visible != self._visible_rows:
+            self._visible_rows = visible
+            self._scroll_to(self._offset)
+
+    def _on_select(self, event):
+        selected = self.tree.selection()
+        if selected:
+            self._selected_id = selected[0]
 
     def _on_double_click(self, event):
         item = self.tree.selection()
@@ -134,20 +633,12 @@ class EntityTab:
             ctk.CTkLabel(modal, text=f"{label}:").pack(pady=5)
 
             if label in self.dropdowns:
-                # actualizar dinámicamente desde DB solo si están las funciones en repository
-                try:
-                    if label.lower() == "rubro":
-                        rubros = db.get_rubros()  # [(id, nombre), ...]
-                        self.dropdowns[label] = [r[1] for r in rubros]
-                    elif label.lower() == "provincia":
-                        # si repository tiene get_provincias la usamos, si no usamos el valor que le pasaron al crear la pestaña
-                        if hasattr(db, "get_provincias"):
-                            provincias = db.get_provincias()  # [(id, nombre), ...]
-                            self.dropdowns[label] = [p[1] for p in provincias]
-                except Exception:
-                    # en caso de error dejamos lo que ya había:
-                    pass
-                
+                # opciones desde el cache de referencia del repositorio (no consulta la base en cada apertura)
+                if label.lower() == "rubro":
+                    self.dropdowns[label] = db.get_rubro_names()
+                elif label.lower() == "provincia":
+                    self.dropdowns[label] = db.get_provincia_names()
+
                 combo = ctk.CTkComboBox(modal, values=self.dropdowns[label], width=250, state="readonly")
                 combo.pack(pady=5)
                 entries[label] = combo
@@ -170,14 +661,6 @@ class EntityTab:
                     widget.insert(0, str(value))
 
         def submit():
-            import unicodedata
-
-            # --- Función auxiliar para normalizar texto de Enum ---
-            def normalize_enum_key(s: str):
-                # Quita tildes y normaliza a mayúsculas con "_"
-                nfkd = unicodedata.normalize('NFKD', s)
-                return ''.join([c for c in nfkd if not unicodedata.combining(c)]).upper().replace(" ", "_")
-
             new_values = []
             for f_label, f_type in self.form_fields.items():
                 w = entries[f_label]
@@ -188,37 +671,18 @@ class EntityTab:
 
                 # --- 🔁 Mapeo especial para dropdowns ---
                 if f_label == "Provincia":
-                    # la opción del combo contiene el nombre mostrado; convertimos a id mediante repo
-                    if hasattr(db, "get_provincia_id_by_name"):
-                        id_prov = db.get_provincia_id_by_name(val)
-                        if id_prov is None:
-                            messagebox.showerror("Error", f"Provincia '{val}' no encontrada en la base de datos.")
-                            return
-                        val = id_prov
-                    else:
-                        # si no existe la utilidad en repo, intentar con el Enum Provincia (tu fallback anterior)
-                        try:
-                            provincia_id = list(Provincia).index(Provincia[normalize_enum_key(val)]) + 1
-                            val = provincia_id
-                        except Exception:
-                            messagebox.showerror("Error", f"Provincia '{val}' no reconocida.")
-                            return
+                    # la opción del combo contiene el nombre mostrado; convertimos a id con el cache del repo
+                    id_prov = db.get_provincia_id_by_name(val)
+                    if id_prov is None:
+                        messagebox.showerror("Error", f"Provincia '{val}' no encontrada en la base de datos.")
+                        return
+                    val = id_prov
 
                 elif f_label == "Rubro":
-                    rubro_nombre = val.strip().capitalize()  # Ej: “x” -> “X”
-                    rubros = db.get_rubros()  # Debería devolver [(1, 'Computadoras'), (2, 'Periféricos'), ...]
-
-                    # Buscar el ID correspondiente
-                    id_rubro = None
-                    for rid, nombre in rubros:
-                        if nombre.lower() == rubro_nombre.lower():
-                            id_rubro = rid
-                            break
-                        
+                    id_rubro = db.get_rubro_id_by_name(val)
                     if id_rubro is None:
-                        messagebox.showerror("Error", f"Rubro '{rubro_nombre}' no encontrado en la base de datos.")
+                        messagebox.showerror("Error", f"Rubro '{val}' no encontrado en la base de datos.")
                         return
-                
                     val = id_rubro
 
                 # --- Validación numérica si aplica ---
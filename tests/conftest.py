@@ -0,0 +1,32 @@
+import os
+from contextlib import redirect_stdout
+from io import StringIO
+
+import pytest
+
+import repository as db
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def configurar_base(monkeypatch, path):
+    """Apunta repository a una base en 'path' (init.sql y migraciones del repo, CSV de data/)."""
+    db.close_connections()
+    monkeypatch.setattr(db, "DB_NAME", str(path))
+    monkeypatch.setattr(db, "SQL_FILE", os.path.join(ROOT, "init.sql"))
+    monkeypatch.setattr(db, "CSV_FOLDER", os.path.join(ROOT, "data"))
+    monkeypatch.setattr(db, "MIGRATIONS_FOLDER", os.path.join(ROOT, "migrations"))
+    db.invalidate_lookups()
+
+
+@pytest.fixture(scope="module")
+def base_temporal(tmp_path_factory):
+    """Base temporal vacía con todas las migraciones aplicadas, compartida por el módulo."""
+    with pytest.MonkeyPatch.context() as monkeypatch:
+        configurar_base(monkeypatch, tmp_path_factory.mktemp("db") / "coral_tech.db")
+        with redirect_stdout(StringIO()):
+            db.create_db()
+        yield db.DB_NAME
+        db.close_connections()
+    db.invalidate_lookups()
+
@@ -0,0 +1,116 @@
+"""Cargas masivas de los CSV de data/ (csv_loader.bulk_replace)."""
+import os
+import sqlite3
+from contextlib import redirect_stdout
+from io import StringIO
+
+import pytest
+
+import csv_loader
+import repository as db
+from conftest import configurar_base
+
+
+def _crear_con_init_sql():
+    with sqlite3.connect(db.DB_NAME) as conn, open(db.SQL_FILE, encoding="utf-8") as f:
+        conn.executescript(f.read())
+    conn.close()
+
+
+@pytest.fixture
+def base_sin_migraciones(tmp_path, monkeypatch):
+    """Base creada solo con init.sql, como las anteriores al sistema de migraciones."""
+    configurar_base(monkeypatch, tmp_path / "coral_tech.db")
+    _crear_con_init_sql()
+    yield db.DB_NAME
+    db.close_connections()
+    db.invalidate_lookups()
+
+
+def _monto(id_factura):
+    return db.execute_query("SELECT monto FROM factura WHERE id_factura = ?", (id_factura,), fetch="one")[0]
+
+
+def test_carga_completa_no_duplica_montos(base_temporal):
+    with redirect_stdout(StringIO()):
+        csv_loader.load_csv_files()
+        # los montos de factura.csv ya coinciden con sus líneas: los triggers no deben sumarlas encima
+        assert db.reconcile_invoice_totals() == 0
+
+    # fuera de la carga masiva los triggers siguen manteniendo el total
+    monto = _monto(1)
+    db.execute_query("UPDATE detalle_factura SET cantidad = cantidad + 1 WHERE id_factura = 1 AND id_producto = 1")
+    assert _monto(1) == monto + 450000
+
+
+def _filas_csv(tabla):
+    with open(os.path.join(db.CSV_FOLDER, f"{tabla}.csv"), encoding="utf-8") as f:
+        return sum(1 for _ in f) - 1
+
+
+def _verificar_carga():
+    assert db.get_schema_version() == max(int(n.split("_", 1)[0]) for n in os.listdir(db.MIGRATIONS_FOLDER))
+    for tabla in csv_loader.LOAD_ORDER:
+        assert db.execute_query(f"SELECT COUNT(*) FROM {tabla}", fetch="one")[0] == _filas_csv(tabla)
+
+
+def test_recarga_completa_en_base_sin_migraciones(base_sin_migraciones):
+    with redirect_stdout(StringIO()):
+        db.load_csv_data()
+    _verificar_carga()
+
+
+def test_sincronizacion_en_base_sin_migraciones(base_sin_migraciones):
+    with redirect_stdout(StringIO()):
+        db.sync_csv_data()
+    _verificar_carga()
+
+
+def test_importacion_columnar_en_base_sin_migraciones(base_sin_migraciones, tmp_path):
+    pytest.importorskip("pyarrow")
+    import columnar
+
+    carpeta = tmp_path / "export_parquet"
+    with redirect_stdout(StringIO()):
+        db.load_csv_data()
+        columnar.export_all("parquet", str(carpeta))
+    db.close_connections()
+    os.remove(db.DB_NAME)
+    _crear_con_init_sql()
+
+    with redirect_stdout(StringIO()):
+        columnar.import_all(str(carpeta), "parquet")
+    _verificar_carga()
+
+
+def _csv_con_fechas(carpeta, fechas):
+    """Copia los CSV de data/ a 'carpeta' con las fechas de factura.csv reemplazadas por 'fechas'."""
+    carpeta.mkdir(exist_ok=True)
+    for tabla in csv_loader.LOAD_ORDER:
+        with open(os.path.join(db.CSV_FOLDER, f"{tabla}.csv"), encoding="utf-8") as f:
+            lineas = f.read().splitlines()
+        if tabla == "factura":
+            lineas = [lineas[0]] + [
+                ",".join([campos[0], fechas.get(int(campos[0]), campos[1])] + campos[2:])
+                for campos in (linea.split(",") for linea in lineas[1:])
+            ]
+        (carpeta / f"{tabla}.csv").write_text("\n".join(lineas) + "\n", encoding="utf-8")
+    return str(carpeta)
+
+
+def test_fechas_sin_ceros_del_csv_quedan_en_los_rangos(base_sin_migraciones, tmp_path, monkeypatch):
+    monkeypatch.setattr(db, "CSV_FOLDER", _csv_con_fechas(tmp_path / "carga", {1: "2025-10-1", 2: "1/10/2025"}))
+    with redirect_stdout(StringIO()):
+        db.load_csv_data()
+    assert db.execute_query("SELECT fecha FROM factura WHERE id_factura IN (1, 2)", fetch="all") == \
+        [("2025-10-01",), ("2025-10-01",)]
+    assert [f["id"] for f in db.get_invoices("2025-10-01", "2025-10-01")] == [1, 2]
+
+    # la sincronización guarda los cambios de fecha con el mismo formato
+    monkeypatch.setattr(db, "CSV_FOLDER", _csv_con_fechas(tmp_path / "sync", {1: "2025-10-1", 2: "20/10/2025"}))
+    with redirect_stdout(StringIO()):
+        db.sync_csv_data()
+    assert db.execute_query("SELECT fecha FROM factura WHERE id_factura IN (1, 2)", fetch="all") == \
+        [("2025-10-01",), ("2025-10-20",)]
+    assert [f["id"] for f in db.get_invoices("2025-10-20", "2025-10-20")] == [2]
+    assert db.execute_query("SELECT COUNT(*) FROM venta_diaria WHERE dia = 0", fetch="one")[0] == 0
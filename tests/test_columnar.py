@@ -0,0 +1,48 @@
+"""Exportación e importación Parquet de columnar (requiere pyarrow)."""
+from contextlib import redirect_stdout
+from datetime import date
+from io import StringIO
+
+import pytest
+
+import repository as db
+
+pa = pytest.importorskip("pyarrow")
+import pyarrow.parquet  # noqa: E402
+
+import columnar  # noqa: E402
+
+
+def _exportar(carpeta):
+    with redirect_stdout(StringIO()) as salida:
+        columnar.export_all("parquet", str(carpeta))
+    return pyarrow.parquet.read_table(carpeta / "factura.parquet"), salida.getvalue()
+
+
+def _fechas(*fechas):
+    db.execute_query("DELETE FROM factura")
+    for fecha in fechas:
+        db.execute_query("INSERT INTO factura (fecha, id_sucursal, id_cliente) VALUES (?, 1, 1)", (fecha,))
+
+
+def test_fechas_dd_mm_aaaa_se_exportan_como_el_mismo_dia(base_temporal, tmp_path):
+    _fechas("2025-01-05", "05/01/2025", " 2025/01/06 ", None)
+    tabla, _ = _exportar(tmp_path)
+
+    assert pa.types.is_date32(tabla.schema.field("fecha").type)
+    assert tabla.column("fecha").to_pylist() == [date(2025, 1, 5), date(2025, 1, 5), date(2025, 1, 6), None]
+
+    # al importar quedan en ISO
+    with redirect_stdout(StringIO()):
+        columnar.import_all(str(tmp_path), "parquet")
+    assert [f for (f,) in db.execute_query("SELECT fecha FROM factura ORDER BY id_factura", fetch="all")] == \
+        ["2025-01-05", "2025-01-05", "2025-01-06", None]
+
+
+def test_fecha_no_reconocida_exporta_la_columna_como_texto(base_temporal, tmp_path):
+    _fechas("2025-01-05", "05/01/2025", "ayer", "2025-02-30")
+    tabla, salida = _exportar(tmp_path)
+
+    assert pa.types.is_string(tabla.schema.field("fecha").type)
+    assert tabla.column("fecha").to_pylist() == ["2025-01-05", "05/01/2025", "ayer", "2025-02-30"]
+    assert "2 fecha(s) con formato no reconocido" in salida
@@ -0,0 +1,131 @@
+"""
+Verifica con EXPLAIN QUERY PLAN que las consultas de repository usen índices.
+
+Ejecuta cada función del repositorio contra una base temporal (con todas las
+migraciones aplicadas), captura las sentencias que emite y falla si alguna
+recorre completa una tabla que no está permitida para ese caso.
+
+    python -m pytest tests/test_query_plans.py
+"""
+import re
+
+import pytest
+
+import analytics
+import repository as db
+
+# (nombre, llamada, tablas/alias que pueden recorrerse completos)
+# Los listados completos recorren su tabla principal por diseño; el resto debe ir por índice.
+# rubro/provincia aparecen donde se carga el cache de nombres (filtros por nombre, búsquedas por nombre).
+CASOS = [
+    ("get_products", lambda: db.get_products(), {"p"}),
+    ("get_products_page", lambda: db.get_products_page(50, db._encode_cursor([100]), with_total=True), set()),
+    ("get_products_page precio desc", lambda: db.get_products_page(
+        50, db._encode_cursor([150.0, 50]), sort="precio", descending=True), set()),
+    ("get_products_page filtros", lambda: db.get_products_page(
+        50, None, with_total=True, sort="stock", filters={"rubro": "Redes", "precio_max": 250}), {"rubro"}),
+    ("get_product_by_id", lambda: db.get_product_by_id(1), set()),
+    ("get_clients", lambda: db.get_clients(), {"c"}),
+    ("get_clients_page", lambda: db.get_clients_page(50, db._encode_cursor([100]), with_total=True), set()),
+    ("get_clients_page nombre", lambda: db.get_clients_page(
+        50, db._encode_cursor(["Cliente 5", 6]), sort="nombre", filters={"provincia": "Córdoba"}), {"provincia"}),
+    ("get_client_by_id", lambda: db.get_client_by_id(1), set()),
+    ("get_client_id_by_name", lambda: db.get_client_id_by_name("Cliente 1"), set()),
+    ("get_provincias", lambda: db.get_provincias(), {"provincia"}),
+    # la primera búsqueda carga el cache de referencia (una lectura completa de la tabla chica)
+    ("get_provincia_id_by_name", lambda: db.get_provincia_id_by_name("  cordoba "), {"provincia"}),
+    ("get_rubros", lambda: db.get_rubros(), {"rubro"}),
+    ("get_rubro_id_by_name", lambda: db.get_rubro_id_by_name(" REDES "), {"rubro"}),
+    # FTS5: el "SCAN ... VIRTUAL TABLE INDEX" es la búsqueda en el índice de texto
+    ("search_products", lambda: db.search_products("produc 1"), {"producto_fts", "m"}),
+    ("search_clients", lambda: db.search_clients("client"), {"cliente_fts", "m"}),
+    ("get_invoices", lambda: db.get_invoices(), {"f"}),
+    ("get_invoices período", lambda: db.get_invoices("2025-01-05", "2025-01-10"), set()),
+    ("get_invoices_page", lambda: db.get_invoices_page(50, db._encode_cursor([100]), with_total=True), set()),
+    ("get_invoice_by_id", lambda: db.get_invoice_by_id(1), set()),
+    ("get_invoice_details", lambda: db.get_invoice_details(1), set()),
+    ("get_detalles_por_factura", lambda: db.get_detalles_por_factura(1), set()),
+    ("get_all_facturas", lambda: db.get_all_facturas(), {"f"}),
+    ("get_all_detalle_factura", lambda: db.get_all_detalle_factura(), {"df"}),
+    # json_each es la lista de ítems pasada como parámetro (la reserva de stock), no una tabla
+    ("create_invoice", lambda: db.create_invoice(1, "2025-10-10", [(1, 1, 100.0), (2, 2, 50.0)]), {"json_each"}),
+    ("update_invoice", lambda: db.update_invoice(1, 2, "2025-10-11", [(2, 1, 50.0)]), {"json_each"}),
+    ("add_invoice_product", lambda: db.add_invoice_product(3, 4, 1, 103.0), {"json_each"}),
+    ("update_product", lambda: db.update_product(1, "P", 1.0, 5, 1), set()),
+    ("update_client", lambda: db.update_client(1, "C", 1, "D", "1234567", "c@c.com"), set()),
+    ("get_data_version", lambda: db.get_data_version(), set()),
+    ("get_changes_since producto", lambda: db.get_changes_since("producto", db.get_data_version() - 1), set()),
+    ("get_changes_since factura", lambda: db.get_changes_since("factura", db.get_data_version() - 1), set()),
+    # agregaciones: sin rango de fechas recorren el resumen diario (ya agregado, no el detalle);
+    # v es el resultado agrupado, una fila por producto o rubro
+    ("top_products", lambda: analytics.top_products(5), {"venta_diaria", "v"}),
+    ("top_products rango", lambda: analytics.top_products(5, "2025-01-05", "2025-01-10"), {"v"}),
+    ("top_rubros", lambda: analytics.top_rubros(3, metric="importe"), {"venta_diaria_rubro", "v"}),
+    ("delete_invoice_product", lambda: db.delete_invoice_product(1, 2), set()),
+]
+
+# Sentencias que no son consultas sobre tablas de datos ("-- ..." son las internas de
+# triggers y de FTS5, que SQLite reporta al trace callback como comentarios)
+IGNORAR = re.compile(r"^\s*(--|BEGIN|COMMIT|ROLLBACK|PRAGMA|SAVEPOINT|RELEASE)", re.IGNORECASE)
+# "SCAN CONSTANT ROW" es la fila única de un SELECT sin FROM, no una tabla
+SCAN = re.compile(r"^SCAN (?!CONSTANT ROW)(\w+)")
+
+
+def poblar():
+    conn = db.get_connection()
+    conn.executemany(
+        "INSERT INTO producto (descripcion, precio, id_rubro, stock) VALUES (?, ?, ?, ?)",
+        [(f"Producto {i}", 100.0 + i, i % 5 + 1, 100) for i in range(200)],
+    )
+    conn.executemany(
+        "INSERT INTO cliente (nombre, id_provincia, domicilio, telefono, email) VALUES (?, ?, ?, ?, ?)",
+        [(f"Cliente {i}", i % 24 + 1, "Calle", "1234567", f"c{i}@mail.com") for i in range(200)],
+    )
+    conn.executemany(
+        "INSERT INTO factura (fecha, id_sucursal, id_cliente) VALUES (?, ?, ?)",
+        [(f"2025-01-{i % 28 + 1:02d}", 1, i % 200 + 1) for i in range(200)],
+    )
+    conn.executemany(
+        "INSERT INTO detalle_factura (id_factura, id_producto, cantidad, precio_unitario) VALUES (?, ?, ?, ?)",
+        [(i % 200 + 1, i // 200 + 1, 1, 100.0) for i in range(600)],
+    )
+    conn.commit()
+    # estadísticas para que el planificador elija como lo haría con datos reales
+    conn.execute("ANALYZE")
+
+
+def capturar(fn):
+    sentencias = []
+    # también la conexión de solo lectura: las consultas dentro de db.read_only() van por ella
+    conexiones = [db._pooled_connection(read_only=False), db._pooled_connection(read_only=True)]
+    for conn in conexiones:
+        conn.set_trace_callback(sentencias.append)
+    try:
+        fn()
+    finally:
+        for conn in conexiones:
+            conn.set_trace_callback(None)
+    return [s for s in sentencias if not IGNORAR.match(s) and not s.lstrip().upper().startswith("EXPLAIN")]
+
+
+def plan(sql):
+    return [row[3] for row in db.get_connection().execute(f"EXPLAIN QUERY PLAN {sql}")]
+
+
+@pytest.fixture(scope="module")
+def base(base_temporal):
+    poblar()
+    return base_temporal
+
+
+# Los casos corren en orden sobre la misma base (delete_invoice_product borra la línea que agrega add_invoice_product)
+@pytest.mark.parametrize("fn, permitidas", [caso[1:] for caso in CASOS], ids=[caso[0] for caso in CASOS])
+def test_consulta_usa_indices(base, fn, permitidas):
+    fallas = []
+    for sql in capturar(fn):
+        detalle = plan(sql)
+        prohibidos = {m.group(1) for m in map(SCAN.match, detalle) if m} - permitidas
+        if prohibidos:
+            fallas.append(f"recorrido completo de {', '.join(sorted(prohibidos))}: {' '.join(sql.split())}\n"
+                          f"    {' | '.join(detalle)}")
+    assert not fallas, "\n".join(fallas)
@@ -0,0 +1,22 @@
+"""Instrumentación de consultas (query_stats)."""
+import sqlite3
+
+import query_stats
+
+
+def _conexion():
+    return sqlite3.connect(":memory:", factory=query_stats.InstrumentedConnection)
+
+
+def test_executemany_con_filas_sin_parametros():
+    conn = _conexion()
+    conn.execute("CREATE TABLE t (id INTEGER PRIMARY KEY, x DEFAULT 1)")
+    conn.executemany("INSERT INTO t DEFAULT VALUES", [(), ()])
+    conn.executemany("INSERT INTO t DEFAULT VALUES", iter([(), (), ()]))
+    assert conn.execute("SELECT COUNT(*) FROM t").fetchone()[0] == 5
+
+    conn.executemany("INSERT INTO t (x) VALUES (?)", [])
+    conn.executemany("INSERT INTO t (x) VALUES (?)", ((i,) for i in range(3)))
+    assert conn.execute("SELECT COUNT(*) FROM t").fetchone()[0] == 8
+    conn.close()
+    query_stats.reset()
@@ -0,0 +1,153 @@
+"""Resúmenes de ventas por día normalizado (migraciones 009, 013 y 014) y sus rangos en analytics."""
+import os
+import shutil
+from contextlib import redirect_stdout
+from io import StringIO
+
+import pytest
+
+import analytics
+import repository as db
+from conftest import ROOT, configurar_base
+
+
+def _venta(fecha, cantidad=1):
+    return db.create_invoice(1, fecha, [(1, cantidad, 100.0)])
+
+
+def _catalogo():
+    db.execute_query("INSERT INTO producto (id_producto, descripcion, precio, stock, id_rubro) "
+                     "VALUES (1, 'Producto', 100.0, 1000, 1)")
+    db.execute_query("INSERT INTO cliente (id_cliente, nombre, id_provincia, domicilio, telefono, email) "
+                     "VALUES (1, 'Cliente', 1, 'Calle', '1234567', 'c@c.com')")
+
+
+def _sin_diferencias():
+    with redirect_stdout(StringIO()):
+        return not any(db.check_sales_rollup().values())
+
+
+@pytest.fixture
+def base(base_temporal):
+    _catalogo()
+    yield base_temporal
+    db.execute_query("DELETE FROM detalle_factura")
+    db.execute_query("DELETE FROM factura")
+    db.execute_query("DELETE FROM cliente")
+    db.execute_query("DELETE FROM producto")
+
+
+def test_formatos_de_fecha_del_mismo_dia_comparten_fila(base):
+    _venta("2025-01-05")
+    _venta("05/01/2025", 2)
+    _venta("2025/01/06")
+
+    assert db.execute_query("SELECT dia, unidades FROM venta_diaria ORDER BY dia", fetch="all") == \
+        [(20250105, 3), (20250106, 1)]
+    assert _sin_diferencias()
+    assert analytics.top_products(5, "05/01/2025", "2025-01-05")[0].unidades == 3
+    assert analytics.top_products(5, date_from="2025-01-06")[0].unidades == 1
+
+
+def test_fecha_no_reconocida_queda_afuera_de_los_periodos(base):
+    _venta("2025-01-05")
+    _venta("ayer", 4)
+
+    assert analytics.top_products(5)[0].unidades == 5
+    assert analytics.top_products(5, date_to="2025-12-31")[0].unidades == 1
+    with pytest.raises(ValueError):
+        analytics.top_products(5, "ayer")
+
+
+def test_cambio_de_fecha_mueve_las_ventas(base):
+    id_factura = _venta("05/01/2025")
+    db.update_invoice(id_factura, 1, "2025-01-05", [(1, 1, 100.0)])  # mismo día, otro formato
+    assert db.execute_query("SELECT dia, lineas FROM venta_diaria", fetch="all") == [(20250105, 1)]
+
+    db.update_invoice(id_factura, 1, "07/01/2025", [(1, 1, 100.0)])
+    assert db.execute_query("SELECT dia, lineas FROM venta_diaria_rubro", fetch="all") == [(20250107, 1)]
+    assert _sin_diferencias()
+
+
+def _base_con_migraciones_hasta(version, tmp_path, monkeypatch):
+    """Crea la base solo con las migraciones hasta 'version'; migrate() aplica después las demás."""
+    anteriores = tmp_path / "migrations"
+    anteriores.mkdir()
+    for nombre in os.listdir(os.path.join(ROOT, "migrations")):
+        if int(nombre.split("_", 1)[0]) <= version:
+            shutil.copy(os.path.join(ROOT, "migrations", nombre), anteriores)
+    configurar_base(monkeypatch, tmp_path / "coral_tech.db")
+    monkeypatch.setattr(db, "MIGRATIONS_FOLDER", str(anteriores))
+    with redirect_stdout(StringIO()):
+        db.create_db()
+    _catalogo()
+    monkeypatch.setattr(db, "MIGRATIONS_FOLDER", os.path.join(ROOT, "migrations"))
+
+
+def _fecha_guardada_tal_cual(id_factura, fecha):
+    # create_invoice ya normaliza la fecha: así quedaban las guardadas antes
+    db.execute_query("UPDATE factura SET fecha = ? WHERE id_factura = ?", (fecha, id_factura))
+
+
+def test_fechas_sin_ceros_quedan_en_los_rangos(base):
+    ids = [_venta("2025-1-4"), _venta("4/1/2025", 2), _venta("2025-01-04")]
+
+    assert db.execute_query("SELECT fecha, fecha_dia FROM factura ORDER BY id_factura", fetch="all") == \
+        [("2025-01-04", 20250104)] * 3
+    assert [f["id"] for f in db.get_invoices("2025-01-01", "2025-01-31")] == ids
+    assert analytics.top_products(5, "1/1/2025", "2025-1-31")[0].unidades == 4
+
+    db.update_invoice(ids[0], 1, "7/1/2025", [(1, 1, 100.0)])
+    assert db.execute_query("SELECT fecha FROM factura WHERE id_factura = ?", (ids[0],), fetch="one")[0] == "2025-01-07"
+    assert [f["id"] for f in db.get_invoices("2025-01-07", "2025-01-07")] == [ids[0]]
+    assert _sin_diferencias()
+
+
+def test_fecha_dia_controla_rangos_de_mes_y_dia(base):
+    for fecha in ("2025-13-45", "45/13/2025", "20250001", "31/02/2025"):
+        _venta(fecha)
+
+    # mes o día fuera de rango: sin día; 31/02 tiene números en rango y sí lo tiene
+    assert db.execute_query("SELECT fecha, fecha_dia FROM factura ORDER BY id_factura", fetch="all") == \
+        [("2025-13-45", None), ("45/13/2025", None), ("20250001", None), ("31/02/2025", 20250231)]
+    assert db.execute_query("SELECT dia, lineas FROM venta_diaria ORDER BY dia", fetch="all") == \
+        [(0, 3), (20250231, 1)]
+
+
+def test_migracion_reagrupa_los_resumenes_existentes(tmp_path, monkeypatch):
+    # base con las migraciones anteriores a 013: los resúmenes agrupan por el texto de la fecha
+    try:
+        _base_con_migraciones_hasta(12, tmp_path, monkeypatch)
+        _venta("2025-01-05")
+        _fecha_guardada_tal_cual(_venta("2025-01-05"), "05/01/2025")
+        assert db.execute_query("SELECT COUNT(*) FROM venta_diaria", fetch="one")[0] == 2
+
+        with redirect_stdout(StringIO()):
+            db.migrate()
+        assert db.execute_query("SELECT dia, unidades, lineas FROM venta_diaria", fetch="all") == [(20250105, 2, 2)]
+        assert _sin_diferencias()
+    finally:
+        db.close_connections()
+        db.invalidate_lookups()
+
+
+def test_migracion_normaliza_fechas_sin_ceros(tmp_path, monkeypatch):
+    try:
+        _base_con_migraciones_hasta(13, tmp_path, monkeypatch)
+        for fecha in ("2025-1-4", "4/1/2025 10:30", "2025/1/4T08:00", "04-01-2025", "20250104",
+                      "2025-13-45", "ayer"):
+            _fecha_guardada_tal_cual(_venta("2025-01-01"), fecha)
+        assert db.execute_query("SELECT COUNT(*) FROM factura WHERE fecha_dia = 20250104", fetch="one")[0] == 2
+
+        with redirect_stdout(StringIO()):
+            db.migrate()
+        assert [r[0] for r in db.execute_query("SELECT fecha FROM factura ORDER BY id_factura", fetch="all")] == \
+            ["2025-01-04", "2025-01-04 10:30", "2025-01-04T08:00", "2025-01-04", "2025-01-04",
+             "2025-13-45", "ayer"]
+        assert len(db.get_invoices("2025-01-04", "2025-01-04")) == 5
+        assert db.execute_query("SELECT dia, lineas FROM venta_diaria ORDER BY dia", fetch="all") == \
+            [(0, 2), (20250104, 5)]
+        assert _sin_diferencias()
+    finally:
+        db.close_connections()
+        db.invalidate_lookups()
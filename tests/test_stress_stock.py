@@ -0,0 +1,25 @@
+"""Reserva de stock con varios procesos facturando a la vez (benchmarks/stress_stock.py, en chico)."""
+from contextlib import redirect_stdout
+from io import StringIO
+
+import repository as db
+import stress_stock
+from conftest import configurar_base
+
+
+def test_reservas_concurrentes_no_sobrevenden(tmp_path, monkeypatch):
+    # 4 procesos × 60 intentos de 1 a 3 líneas sobre 3 productos con stock 20: la demanda
+    # supera varias veces al stock, así que las reservas compiten por las últimas unidades
+    configurar_base(monkeypatch, tmp_path / "stress.db")
+    try:
+        with redirect_stdout(StringIO()):
+            r = stress_stock.correr(db.DB_NAME, procesos=4, facturas=60, productos=3, stock=20)
+    finally:
+        db.close_connections()
+
+    assert r["errores"] == 0
+    assert r["ventas"] > 0
+    assert r["rechazadas"] > 0
+    assert r["negativos"] == []
+    assert r["descuadrados"] == []
+    assert r["vendidos"] <= 3 * 20
@@ -1,12 +1,12 @@
 import customtkinter as ctk
+from functools import partial
 from tkinter import ttk
 from PIL import Image
 import repository as db
 import tab
 from factura_tab import FacturaTab
 from provincia import Provincia
-from dashboard import DashboardWindow
-from dashboard import abrir_dashboard
+import ui_profiler
 
 
 class App(ctk.CTk):
@@ -44,7 +44,17 @@ class App(ctk.CTk):
                 "Stock": int,
                 "Rubro": str
             },
-            dropdowns={"Rubro": self.reload_rubros()}
+            dropdowns={"Rubro": self.reload_rubros()},
+            page_fn=db.get_products_page,
+            changes_fn=partial(db.get_changes_since, "producto"),
+            search_fn=db.search_products,
+            sort_columns={"ID": "id", "Descripción": "descripcion", "Precio": "precio", "Stock": "stock"},
+            filter_fields={
+                "Precio mín.": ("precio_min", float),
+                "Precio máx.": ("precio_max", float),
+                "Stock <": ("stock_max", int),
+                "Rubro": ("rubro", "rubro"),
+            }
         )
 
         # --- Clientes ---
@@ -63,7 +73,12 @@ class App(ctk.CTk):
                 "Teléfono": int,  # <- ahora validará solo números
                 "Mail": str
             },
-            dropdowns={"Provincia": [p.value for p in Provincia]}
+            dropdowns={"Provincia": [p.value for p in Provincia]},
+            page_fn=db.get_clients_page,
+            changes_fn=partial(db.get_changes_since, "cliente"),
+            search_fn=db.search_clients,
+            sort_columns={"ID": "id", "Nombre": "nombre", "Mail": "email"},
+            filter_fields={"Provincia": ("provincia", "provincia")}
         )
 
         # --- Rubros ---
@@ -83,7 +98,8 @@ class App(ctk.CTk):
             _create_rubro_and_refresh,
             db.update_rubro,
             _delete_rubro_and_refresh,
-            {"Nombre Rubro": str}
+            {"Nombre Rubro": str},
+            changes_fn=partial(db.get_changes_since, "rubro")
         )
         self.rubros_tab = rubros_tab  # para acceder desde el método _refresh_rubro_data
 
@@ -94,16 +110,20 @@ class App(ctk.CTk):
         dashboard_button = ctk.CTkButton(
             self,
             text="📊 Ver Dashboard",
-            command=lambda: abrir_dashboard(self),
+            command=self._abrir_dashboard,
             fg_color="#272f35",
             hover_color="#6D8799"
         )
         dashboard_button.pack(pady=10)
 
+    def _abrir_dashboard(self):
+        # import diferido: matplotlib se carga recién cuando se abre el dashboard
+        from dashboard import abrir_dashboard
+        abrir_dashboard(self)
+
     # --- Recarga la lista de rubros desde la base de datos ---
     def reload_rubros(self):
-        rubros = db.get_rubros()
-        return [r[1] for r in rubros] if rubros else []
+        return db.get_rubro_names()
 
     def _refresh_rubro_data(self):
         """Recarga rubros desde la BD y actualiza el combo en Productos y la tabla Rubros."""
@@ -130,8 +150,14 @@ class App(ctk.CTk):
 
 
 def run_ui():
+    db.configure_journal_mode()
+    db.migrate()  # actualiza bases existentes antes de abrir la interfaz
     app = App()
-    app.mainloop()
+    ui_profiler.watch(app)  # solo con CORAL_UI_PROFILE=1
+    try:
+        app.mainloop()
+    finally:
+        ui_profiler.report()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,268 @@
+"""
+Perfilado opcional de la interfaz: cuánto tarda cada refresco de pestaña y cada apertura
+de formulario, y cuándo el loop de eventos de Tk se queda trabado.
+
+Se activa con la variable de entorno CORAL_UI_PROFILE=1 (CORAL_UI_STALL_MS fija el umbral
+de trabas, 200 ms por defecto). Apagado, los decoradores solo consultan una bandera.
+
+Cada operación medida (@profiled) se sigue también a través de BackgroundLoader: el tiempo
+total va desde la llamada hasta que termina el último callback que originó, y se reparte en
+
+  - db:      funciones que corren en el worker del loader y bloques marcados con phase("db");
+  - armado:  preparación de los datos para mostrar (phase("armado"), p. ej. TreeSync);
+  - widgets: el resto del tiempo en el hilo de Tk (crear widgets, insertar en el Treeview);
+  - espera:  lo que queda: cola del loader, polling y otros eventos de Tk en el medio.
+
+Cada operación y cada traba se escriben en un log rotativo (ui_profile.log) y al cerrar la
+aplicación se imprime una tabla resumen.
+"""
+import logging
+import os
+import statistics
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager, nullcontext
+from functools import wraps
+from logging.handlers import RotatingFileHandler
+
+STALL_MS = float(os.environ.get("CORAL_UI_STALL_MS", 200))
+HEARTBEAT_MS = 50        # cada cuánto se comprueba que el loop de Tk responde
+LOG_FILE = "ui_profile.log"
+LOG_MAX_BYTES = 1_000_000
+LOG_BACKUPS = 3
+
+PHASES = ("db", "armado", "widgets", "espera")
+
+_enabled = os.environ.get("CORAL_UI_PROFILE", "") not in ("", "0")
+_lock = threading.Lock()
+_local = threading.local()
+_results = {}                   # nombre -> [fases de cada operación terminada]
+_stalls = []                    # (ms, culpables)
+_tk_segments = deque(maxlen=200)  # (nombre, inicio, fin) de lo que corrió en el hilo de Tk
+_logger = None
+
+
+def is_enabled():
+    return _enabled
+
+
+def enable(stall_ms=None, log_path=None):
+    """Activa el perfilado (equivale a CORAL_UI_PROFILE=1); log_path reemplaza a LOG_FILE."""
+    global _enabled, STALL_MS, LOG_FILE
+    _enabled = True
+    if stall_ms is not None:
+        STALL_MS = float(stall_ms)
+    if log_path:
+        LOG_FILE = log_path
+
+
+def _log(mensaje):
+    global _logger
+    if _logger is None:
+        _logger = logging.getLogger("coral_tech.ui_profile")
+        _logger.setLevel(logging.INFO)
+        _logger.propagate = False
+        handler = RotatingFileHandler(LOG_FILE, maxBytes=LOG_MAX_BYTES, backupCount=LOG_BACKUPS,
+                                      encoding="utf-8")
+        handler.setFormatter(logging.Formatter("%(asctime)s %(message)s"))
+        _logger.addHandler(handler)
+    _logger.info(mensaje)
+
+
+# --------------- Operaciones y fases ---------------
+
+class _Operation:
+    """Una operación medida; termina cuando se liberan todas sus partes pendientes."""
+
+    def __init__(self, name):
+        self.name = name
+        self.start = time.perf_counter()
+        self.phases = dict.fromkeys(PHASES, 0.0)
+        self._pending = 0
+        self._lock = threading.Lock()
+
+    def add(self, phase, ms):
+        with self._lock:
+            self.phases[phase] += ms
+
+    def retain(self):
+        with self._lock:
+            self._pending += 1
+
+    def release(self):
+        with self._lock:
+            self._pending -= 1
+            terminada = self._pending == 0
+        if terminada:
+            _finish(self)
+
+
+def _finish(op):
+    total = (time.perf_counter() - op.start) * 1000
+    fases = dict(op.phases)
+    fases["espera"] = max(0.0, total - sum(fases[f] for f in PHASES if f != "espera"))
+    fases["total"] = total
+    with _lock:
+        _results.setdefault(op.name, []).append(fases)
+    _log(f"{op.name}: total={total:.1f}ms " + " ".join(f"{f}={fases[f]:.1f}ms" for f in PHASES))
+
+
+def current():
+    """Operación en curso en este hilo (None si no hay o el perfilado está apagado)."""
+    frames = getattr(_local, "frames", None)
+    return frames[-1][0] if frames else None
+
+
+@contextmanager
+def _frame(op, phase):
+    """
+    Mide un tramo de 'op' en este hilo y lo suma a 'phase', descontando los tramos anidados
+    (que suman a su propia fase). En el hilo de Tk se guarda para atribuir las trabas.
+    """
+    frames = _local.__dict__.setdefault("frames", [])
+    frame = [op, 0.0]  # operación, ms de los tramos anidados
+    frames.append(frame)
+    inicio = time.perf_counter()
+    try:
+        yield op
+    finally:
+        fin = time.perf_counter()
+        frames.pop()
+        ms = (fin - inicio) * 1000
+        op.add(phase, ms - frame[1])
+        if frames:
+            frames[-1][1] += ms
+        if threading.current_thread() is threading.main_thread():
+            _tk_segments.append((op.name, inicio, fin))
+
+
+def phase(name, op=None):
+    """
+    Context manager: el bloque cuenta como la fase 'name' de la operación en curso
+    (o de 'op'). Sin operación en curso, o con el perfilado apagado, no hace nada.
+    """
+    op = op or (current() if _enabled else None)
+    if op is None:
+        return nullcontext()
+    return _frame(op, phase=name)
+
+
+@contextmanager
+def operation(name):
+    """Inicia una operación; lo que no se marque con otra fase dentro del bloque es 'widgets'."""
+    op = _Operation(name)
+    op.retain()
+    try:
+        with _frame(op, "widgets"):
+            yield op
+    finally:
+        op.release()
+
+
+def profiled(name, label=None):
+    """
+    Decorador: mide cada llamada como la operación 'name'. label es el nombre de un
+    atributo de la instancia que se agrega al nombre (p. ej. el título de la pestaña).
+    """
+    def decorator(fn):
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            if not _enabled:
+                return fn(*args, **kwargs)
+            nombre = f"{name}[{getattr(args[0], label, '?')}]" if label else name
+            with operation(nombre):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+# --------------- Integración con BackgroundLoader ---------------
+
+def attach(future, op):
+    """El pedido del loader pasa a ser parte de 'op'; si se cancela antes de correr, se libera."""
+    op.retain()
+    future.add_done_callback(lambda f: f.cancelled() and op.release())
+
+
+def resume(op):
+    """Context manager para el callback del loader en el hilo de Tk (cuenta como 'widgets')."""
+    return _frame(op, "widgets") if op is not None else nullcontext()
+
+
+# --------------- Trabas del loop de Tk ---------------
+
+def watch(root):
+    """Programa un latido con after(): si llega tarde más de STALL_MS, se registra una traba."""
+    if not _enabled:
+        return
+
+    def latido(esperado):
+        ahora = time.perf_counter()
+        demora = (ahora - esperado) * 1000
+        if demora >= STALL_MS:
+            _stall(demora, esperado, ahora)
+        try:
+            root.after(HEARTBEAT_MS, latido, time.perf_counter() + HEARTBEAT_MS / 1000)
+        except Exception:
+            pass  # la ventana se cerró
+
+    root.after(HEARTBEAT_MS, latido, time.perf_counter() + HEARTBEAT_MS / 1000)
+
+
+def _stall(ms, inicio, fin):
+    # culpables: operaciones que corrieron en el hilo de Tk durante la traba, por tiempo
+    solapado = {}
+    for nombre, desde, hasta in list(_tk_segments):
+        comun = min(fin, hasta) - max(inicio, desde)
+        if comun > 0:
+            solapado[nombre] = solapado.get(nombre, 0.0) + comun * 1000
+    culpables = sorted(solapado.items(), key=lambda item: item[1], reverse=True)
+    with _lock:
+        _stalls.append((ms, culpables))
+    detalle = ", ".join(f"{n} ({c:.0f}ms)" for n, c in culpables) or "fuera de las operaciones medidas"
+    _log(f"TRABA {ms:.0f}ms en el loop de Tk: {detalle}")
+
+
+# --------------- Resumen ---------------
+
+def summary_lines():
+    with _lock:
+        resultados = {nombre: list(filas) for nombre, filas in _results.items()}
+        trabas = list(_stalls)
+    if not resultados and not trabas:
+        return ["Sin operaciones medidas."]
+
+    lineas = [f"{'operación':<44}{'n':>5}{'p50 ms':>9}{'p95 ms':>9}{'max ms':>9}"
+              + "".join(f"{f + ' ms':>11}" for f in PHASES)]
+    for nombre, filas in sorted(resultados.items(), key=lambda item: -sum(f["total"] for f in item[1])):
+        totales = sorted(f["total"] for f in filas)
+        p95 = totales[min(len(totales) - 1, int(len(totales) * 0.95))]
+        # promedio de cada fase por llamada
+        fases = "".join(f"{statistics.fmean(f[fase] for f in filas):>11.1f}" for fase in PHASES)
+        lineas.append(f"{nombre[:43]:<44}{len(filas):>5}{statistics.median(totales):>9.1f}{p95:>9.1f}"
+                      f"{totales[-1]:>9.1f}{fases}")
+
+    if trabas:
+        culpables = {}
+        for _, lista in trabas:
+            for nombre, ms in lista:
+                culpables[nombre] = culpables.get(nombre, 0.0) + ms
+        peor = max(ms for ms, _ in trabas)
+        lineas.append(f"Trabas del loop de Tk (>= {STALL_MS:g} ms): {len(trabas)}, la peor de {peor:.0f} ms")
+        for nombre, ms in sorted(culpables.items(), key=lambda item: item[1], reverse=True)[:5]:
+            lineas.append(f"   {nombre}: {ms:.0f} ms trabados")
+    else:
+        lineas.append(f"Sin trabas del loop de Tk (>= {STALL_MS:g} ms).")
+    return lineas
+
+
+def report():
+    """Imprime la tabla resumen y la agrega al log (se llama al cerrar la interfaz)."""
+    if not _enabled:
+        return
+    lineas = summary_lines()
+    print("\n⏱️  Perfil de la interfaz (promedios por llamada; detalle en " + LOG_FILE + ")")
+    for linea in lineas:
+        print("   " + linea)
+    _log("RESUMEN\n" + "\n".join(lineas))